@@ -2,94 +2,95 @@
 -- 02_analytics.sql  
 -- ==========================================
 
--- • Este arquivo só cria VIEWS analíticas (não altera tabelas).
--- • Tudo parte da view public.pnad_covid_top20 criada no 01_views.sql.
--- • Sempre transformo respostas 1/2 em 0/1 com (NULLIF(col::text,'')::int = 1)::int.
+-- • Este arquivo só cria MATERIALIZED VIEWS analíticas (não altera tabelas).
+-- • Tudo parte da camada silver public.pnad_covid_2020_silver, montada pelo
+--   main.py na carga (uma partição por mês): as respostas 1/2 já chegam como
+--   flags smallint 0/1 (NULL = sem resposta), junto com tem_algum_sintoma,
+--   idoso, faixa e escolaridade_grp. Aqui sobram só agregações.
+-- • Os painéis ficam materializados: o dashboard lê poucas linhas prontas em vez
+--   de reagregar ~1 milhão de linhas do UNION ALL a cada consulta.
+-- • Cada painel tem um índice ÚNICO — é o que permite o main.py rodar
+--   REFRESH MATERIALIZED VIEW CONCURRENTLY depois do swap sem travar leitores.
+-- • Rodar este arquivo de novo recria tudo (DROP + CREATE).
 
 SET search_path TO public;
 
+-- =========================================================
+-- 0) Remove versões anteriores (eram VIEWs comuns; agora são materializadas)
+-- =========================================================
+DO $$
+DECLARE
+  r record;
+BEGIN
+  FOR r IN
+    SELECT c.relname, c.relkind
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = 'public'
+      AND c.relname IN ('pnad_covid_painel_mensal', 'pnad_covid_painel_uf',
+                        'pnad_covid_painel_faixa', 'pnad_covid_correlacoes',
+                        'pnad_covid_correlacoes_mes', 'pnad_covid_painel_sexo',
+                        'pnad_covid_painel_escolaridade')
+  LOOP
+    IF r.relkind = 'v' THEN
+      EXECUTE format('DROP VIEW public.%I', r.relname);
+    ELSIF r.relkind = 'm' THEN
+      EXECUTE format('DROP MATERIALIZED VIEW public.%I', r.relname);
+    END IF;
+  END LOOP;
+END $$;
+
 -- =========================================================
 -- 1) Painel mensal (métricas por mês)
 --    -> pnad_covid_painel_mensal
 -- =========================================================
-CREATE OR REPLACE VIEW public.pnad_covid_painel_mensal AS
-WITH base AS (
-  SELECT
-    referencia,
-    idade,
-    -- sintomas/uso como 0/1 (fáceis para média)
-    (NULLIF(sint_falta_ar::text,'')::int = 1)::int  AS falta_ar,
-    (NULLIF(sint_dor_peito::text,'')::int = 1)::int AS dor_peito,
-    (NULLIF(tem_algum_sintoma::text,'')::int = 1)::int AS algum_sintoma,
-    (NULLIF(procurou_servico::text,'')::int = 1)::int AS procurou,
-    (NULLIF(internacao::text,'')::int = 1)::int      AS internou,
-    (NULLIF(plano_saude::text,'')::int = 1)::int     AS plano
-  FROM public.pnad_covid_top20
-)
+CREATE MATERIALIZED VIEW public.pnad_covid_painel_mensal AS
 SELECT
   referencia,
   COUNT(*)                               AS n,
   AVG(falta_ar)::float                   AS prop_falta_ar,
   AVG(dor_peito)::float                  AS prop_dor_peito,
-  AVG(algum_sintoma)::float              AS prop_algum_sintoma,
+  AVG(tem_algum_sintoma)::float          AS prop_algum_sintoma,
   AVG(plano)::float                      AS prop_plano_saude,
-  AVG((idade >= 60)::int)::float         AS prop_60mais,
+  AVG(idoso)::float                      AS prop_60mais,
   CASE WHEN SUM(procurou) > 0
        THEN SUM((procurou=1 AND internou=1)::int)::float / NULLIF(SUM(procurou),0)
        ELSE NULL END                     AS prop_internou_entre_buscou
-FROM base
+FROM public.pnad_covid_2020_silver
 GROUP BY referencia
 ORDER BY referencia;
 
+CREATE UNIQUE INDEX pnad_covid_painel_mensal_pk
+  ON public.pnad_covid_painel_mensal (referencia);
+
 -- =========================================================
 -- 2) Painel por UF + mês
 --    -> pnad_covid_painel_uf
 -- =========================================================
-CREATE OR REPLACE VIEW public.pnad_covid_painel_uf AS
-WITH base AS (
-  SELECT
-    referencia,
-    uf,
-    (NULLIF(sint_falta_ar::text,'')::int = 1)::int  AS falta_ar,
-    (NULLIF(tem_algum_sintoma::text,'')::int = 1)::int AS algum_sintoma,
-    (NULLIF(procurou_servico::text,'')::int = 1)::int AS procurou,
-    (NULLIF(internacao::text,'')::int = 1)::int      AS internou
-  FROM public.pnad_covid_top20
-)
+CREATE MATERIALIZED VIEW public.pnad_covid_painel_uf AS
 SELECT
   referencia,
   uf,
   COUNT(*)                     AS n,
   AVG(falta_ar)::float         AS prop_falta_ar,
-  AVG(algum_sintoma)::float    AS prop_algum_sintoma,
+  AVG(tem_algum_sintoma)::float AS prop_algum_sintoma,
   CASE WHEN SUM(procurou) > 0
        THEN SUM((procurou=1 AND internou=1)::int)::float / NULLIF(SUM(procurou),0)
        ELSE NULL END           AS prop_internou_entre_buscou
-FROM base
+FROM public.pnad_covid_2020_silver
 GROUP BY referencia, uf
 ORDER BY referencia, uf;
 
+CREATE UNIQUE INDEX pnad_covid_painel_uf_pk
+  ON public.pnad_covid_painel_uf (referencia, uf);
+CREATE INDEX pnad_covid_painel_uf_uf
+  ON public.pnad_covid_painel_uf (uf);
+
 -- =========================================================
 -- 3) Painel por FAIXA ETÁRIA + mês
 --    -> pnad_covid_painel_faixa
 -- =========================================================
-CREATE OR REPLACE VIEW public.pnad_covid_painel_faixa AS
-WITH base AS (
-  SELECT
-    referencia,
-    CASE
-      WHEN idade < 20 THEN '<20'
-      WHEN idade BETWEEN 20 AND 39 THEN '20-39'
-      WHEN idade BETWEEN 40 AND 59 THEN '40-59'
-      WHEN idade >= 60 THEN '60+'
-      ELSE 'sem_idade'
-    END AS faixa,
-    (NULLIF(sint_falta_ar::text,'')::int = 1)::int  AS falta_ar,
-    (NULLIF(sint_dor_peito::text,'')::int = 1)::int AS dor_peito,
-    (NULLIF(procurou_servico::text,'')::int = 1)::int AS procurou,
-    (NULLIF(internacao::text,'')::int = 1)::int      AS internou
-  FROM public.pnad_covid_top20
-)
+CREATE MATERIALIZED VIEW public.pnad_covid_painel_faixa AS
 SELECT
   referencia,
   faixa,
@@ -99,106 +100,104 @@ SELECT
   CASE WHEN SUM(procurou) > 0
        THEN SUM((procurou=1 AND internou=1)::int)::float / NULLIF(SUM(procurou),0)
        ELSE NULL END        AS prop_internou_entre_buscou
-FROM base
+FROM public.pnad_covid_2020_silver
 GROUP BY referencia, faixa
 ORDER BY referencia, faixa;
 
+CREATE UNIQUE INDEX pnad_covid_painel_faixa_pk
+  ON public.pnad_covid_painel_faixa (referencia, faixa);
+
 -- =========================================================
 -- 4) Correlações GERAIS (todos os meses juntos)
 --    -> pnad_covid_correlacoes
 -- =========================================================
--- IMPORTANTE: aqui havia o erro – faltava o "FROM base".
-CREATE OR REPLACE VIEW public.pnad_covid_correlacoes AS
-WITH base AS (
-  SELECT
-    -- alvo
-    (NULLIF(internacao::text,'')::int = 1)::int      AS y,
-    -- sintomas
-    (NULLIF(sint_falta_ar::text,'')::int = 1)::int   AS x_falta_ar,
-    (NULLIF(sint_dor_peito::text,'')::int = 1)::int  AS x_dor_peito,
-    (NULLIF(tem_algum_sintoma::text,'')::int = 1)::int AS x_algum_sintoma,
-    (NULLIF(sint_0011::text,'')::int = 1)::int       AS x_0011,
-    (NULLIF(sint_0012::text,'')::int = 1)::int       AS x_0012,
-    (NULLIF(sint_0013::text,'')::int = 1)::int       AS x_0013,
-    (NULLIF(sint_0015::text,'')::int = 1)::int       AS x_0015,
-    (NULLIF(sint_0019::text,'')::int = 1)::int       AS x_0019,
-    (NULLIF(sint_00110::text,'')::int = 1)::int      AS x_00110,
-    (NULLIF(sint_00111::text,'')::int = 1)::int      AS x_00111,
-    (NULLIF(sint_00112::text,'')::int = 1)::int      AS x_00112,
-    -- uso
-    (NULLIF(procurou_servico::text,'')::int = 1)::int AS x_buscou,
-    (NULLIF(plano_saude::text,'')::int = 1)::int      AS x_plano,
-    -- demografia simplificada
-    (idade >= 60)::int                                 AS x_idoso,
-    (NULLIF(sexo::text,'')::int = 1)::int              AS x_sexo1,
-    (NULLIF(raca_cor::text,'')::int = 1)::int          AS x_raca1,
-    (NULLIF(escolaridade::text,'0')::int >= 3)::int    AS x_escola3mais,
-    (NULLIF(condicao_no_domicilio::text,'')::int = 1)::int AS x_ref_pessoa
-  FROM public.pnad_covid_top20
-)
+-- alvo y = internou; demografia simplificada vira 0/1 com comparações
+-- diretas sobre os códigos smallint da silver.
+CREATE MATERIALIZED VIEW public.pnad_covid_correlacoes AS
 SELECT
-  corr(x_falta_ar::float8 , y::float8)   AS corr_falta_ar,
-  corr(x_dor_peito::float8, y::float8)   AS corr_dor_peito,
-  corr(x_algum_sintoma::float8, y::float8) AS corr_algum_sintoma,
-  corr(x_0011::float8, y::float8)        AS corr_0011,
-  corr(x_0012::float8, y::float8)        AS corr_0012,
-  corr(x_0013::float8, y::float8)        AS corr_0013,
-  corr(x_0015::float8, y::float8)        AS corr_0015,
-  corr(x_0019::float8, y::float8)        AS corr_0019,
-  corr(x_00110::float8, y::float8)       AS corr_00110,
-  corr(x_00111::float8, y::float8)       AS corr_00111,
-  corr(x_00112::float8, y::float8)       AS corr_00112,
-  corr(x_buscou::float8, y::float8)      AS corr_buscou_servico,
-  corr(x_plano::float8 , y::float8)      AS corr_plano_saude,
-  corr(x_idoso::float8 , y::float8)      AS corr_idoso60,
-  corr(x_sexo1::float8 , y::float8)      AS corr_sexo_cat1,
-  corr(x_raca1::float8 , y::float8)      AS corr_raca_cat1,
-  corr(x_escola3mais::float8, y::float8) AS corr_escolaridade_3mais,
-  corr(x_ref_pessoa::float8, y::float8)  AS corr_condicao_ref_pessoa
-FROM base;
+  'todos'::text                          AS escopo,  -- chave da linha única (índice p/ REFRESH CONCURRENTLY)
+  corr(falta_ar, internou)               AS corr_falta_ar,
+  corr(dor_peito, internou)              AS corr_dor_peito,
+  corr(tem_algum_sintoma, internou)      AS corr_algum_sintoma,
+  corr(sint_0011, internou)              AS corr_0011,
+  corr(sint_0012, internou)              AS corr_0012,
+  corr(sint_0013, internou)              AS corr_0013,
+  corr(sint_0015, internou)              AS corr_0015,
+  corr(sint_0019, internou)              AS corr_0019,
+  corr(sint_00110, internou)             AS corr_00110,
+  corr(sint_00111, internou)             AS corr_00111,
+  corr(sint_00112, internou)             AS corr_00112,
+  corr(procurou, internou)               AS corr_buscou_servico,
+  corr(plano, internou)                  AS corr_plano_saude,
+  corr(idoso, internou)                  AS corr_idoso60,
+  corr((sexo = 1)::int, internou)        AS corr_sexo_cat1,
+  corr((raca_cor = 1)::int, internou)    AS corr_raca_cat1,
+  corr((NULLIF(escolaridade,0) >= 3)::int, internou) AS corr_escolaridade_3mais,
+  corr((condicao_no_domicilio = 1)::int, internou)   AS corr_condicao_ref_pessoa
+FROM public.pnad_covid_2020_silver;
+
+CREATE UNIQUE INDEX pnad_covid_correlacoes_pk
+  ON public.pnad_covid_correlacoes (escopo);
 
 -- =========================================================
 -- 5) Correlações POR MÊS
 --    -> pnad_covid_correlacoes_mes
 -- =========================================================
-CREATE OR REPLACE VIEW public.pnad_covid_correlacoes_mes AS
-WITH base AS (
-  SELECT
-    referencia,
-    (NULLIF(internacao::text,'')::int = 1)::int      AS y,
-    (NULLIF(sint_falta_ar::text,'')::int = 1)::int   AS x_falta_ar,
-    (NULLIF(sint_dor_peito::text,'')::int = 1)::int  AS x_dor_peito,
-    (NULLIF(tem_algum_sintoma::text,'')::int = 1)::int AS x_algum_sintoma,
-    (NULLIF(sint_0011::text,'')::int = 1)::int       AS x_0011,
-    (NULLIF(sint_0012::text,'')::int = 1)::int       AS x_0012,
-    (NULLIF(sint_0013::text,'')::int = 1)::int       AS x_0013,
-    (NULLIF(sint_0015::text,'')::int = 1)::int       AS x_0015,
-    (NULLIF(sint_0019::text,'')::int = 1)::int       AS x_0019,
-    (NULLIF(sint_00110::text,'')::int = 1)::int      AS x_00110,
-    (NULLIF(sint_00111::text,'')::int = 1)::int      AS x_00111,
-    (NULLIF(sint_00112::text,'')::int = 1)::int      AS x_00112,
-    (NULLIF(procurou_servico::text,'')::int = 1)::int AS x_buscou,
-    (NULLIF(plano_saude::text,'')::int = 1)::int      AS x_plano,
-    (idade >= 60)::int                                 AS x_idoso
-  FROM public.pnad_covid_top20
-)
+CREATE MATERIALIZED VIEW public.pnad_covid_correlacoes_mes AS
 SELECT
   referencia,
-  corr(x_falta_ar::float8 , y::float8)   AS corr_falta_ar,
-  corr(x_dor_peito::float8, y::float8)   AS corr_dor_peito,
-  corr(x_algum_sintoma::float8, y::float8) AS corr_algum_sintoma,
-  corr(x_0011::float8, y::float8)        AS corr_0011,
-  corr(x_0012::float8, y::float8)        AS corr_0012,
-  corr(x_0013::float8, y::float8)        AS corr_0013,
-  corr(x_0015::float8, y::float8)        AS corr_0015,
-  corr(x_0019::float8, y::float8)        AS corr_0019,
-  corr(x_00110::float8, y::float8)       AS corr_00110,
-  corr(x_00111::float8, y::float8)       AS corr_00111,
-  corr(x_00112::float8, y::float8)       AS corr_00112,
-  corr(x_buscou::float8, y::float8)      AS corr_buscou_servico,
-  corr(x_plano::float8 , y::float8)      AS corr_plano_saude,
-  corr(x_idoso::float8 , y::float8)      AS corr_idoso60
-FROM base
+  corr(falta_ar, internou)               AS corr_falta_ar,
+  corr(dor_peito, internou)              AS corr_dor_peito,
+  corr(tem_algum_sintoma, internou)      AS corr_algum_sintoma,
+  corr(sint_0011, internou)              AS corr_0011,
+  corr(sint_0012, internou)              AS corr_0012,
+  corr(sint_0013, internou)              AS corr_0013,
+  corr(sint_0015, internou)              AS corr_0015,
+  corr(sint_0019, internou)              AS corr_0019,
+  corr(sint_00110, internou)             AS corr_00110,
+  corr(sint_00111, internou)             AS corr_00111,
+  corr(sint_00112, internou)             AS corr_00112,
+  corr(procurou, internou)               AS corr_buscou_servico,
+  corr(plano, internou)                  AS corr_plano_saude,
+  corr(idoso, internou)                  AS corr_idoso60
+FROM public.pnad_covid_2020_silver
 GROUP BY referencia
 ORDER BY referencia;
 
+CREATE UNIQUE INDEX pnad_covid_correlacoes_mes_pk
+  ON public.pnad_covid_correlacoes_mes (referencia);
+
+-- =========================================================
+-- 6) Painel por SEXO + mês
+--    -> pnad_covid_painel_sexo
+-- =========================================================
+CREATE MATERIALIZED VIEW public.pnad_covid_painel_sexo AS
+SELECT
+  referencia,
+  sexo,
+  COUNT(*)                      AS n,
+  AVG(tem_algum_sintoma)::float AS prop_algum_sintoma
+FROM public.pnad_covid_2020_silver
+GROUP BY referencia, sexo
+ORDER BY referencia, sexo;
+
+CREATE UNIQUE INDEX pnad_covid_painel_sexo_pk
+  ON public.pnad_covid_painel_sexo (referencia, sexo);
+
+-- =========================================================
+-- 7) Painel por ESCOLARIDADE + mês
+--    -> pnad_covid_painel_escolaridade
+-- =========================================================
+CREATE MATERIALIZED VIEW public.pnad_covid_painel_escolaridade AS
+SELECT
+  referencia,
+  escolaridade_grp,
+  COUNT(*)                  AS n,
+  AVG(plano)::float         AS prop_plano_saude,
+  AVG(procurou)::float      AS prop_buscou
+FROM public.pnad_covid_2020_silver
+GROUP BY referencia, escolaridade_grp
+ORDER BY referencia, escolaridade_grp;
+
+CREATE UNIQUE INDEX pnad_covid_painel_escolaridade_pk
+  ON public.pnad_covid_painel_escolaridade (referencia, escolaridade_grp);
@@ -0,0 +1,372 @@
+# ============================================================
+# benchmark.py — Benchmark do loader (main.py) com dados sintéticos
+# ============================================================
+# Objetivo:
+# 1) Gerar CSVs com cara de PNAD COVID (códigos pequenos, brancos = NULL,
+#    pesos float, cabeçalho ASCII e texto latin1 com acento só DEPOIS da
+#    amostra do sniff, delimitador ';') no tamanho/largura pedidos — a saída
+#    confere que o fallback utf-8 -> latin1 do loader de fato rodou
+# 2) Medir cada etapa do loader — smart_read_csv, clean_columns,
+#    maybe_parse_datetimes, infer_sqlalchemy_dtypes, create_staging,
+#    copy_chunk, finalize_staging e swap — com linhas/s, MB/s e pico de RSS
+# 3) Postgres descartável: initdb + pg_ctl numa pasta temporária (porta
+#    livre, sem SSL) ou um banco indicado em --db-url / BENCH_DB_URL;
+#    sem nenhum dos dois, mede só as etapas de leitura
+# 4) Salvar o resultado em JSON (com o commit) para comparar entre versões
+# 5) --quente: mesma carga no layout --hot-cold do loader (arquivo frio zstd
+#    + tabela só com as colunas quentes); com banco, mede o tamanho da
+#    tabela do mês e uma varredura das colunas quentes nos dois layouts
+#
+# Roda numa pasta de trabalho temporária: caches (data/.cache) e marcador
+# de carga do projeto não são tocados.
+#
+# Uso:
+#   python benchmark.py --rows 500000 --cols 250
+#   python benchmark.py --rows 200000 --copy-format binary --json bench_binary.json
+#   python benchmark.py --db-url postgresql+psycopg2://u:p@localhost/bench
+#   python benchmark.py --comparar antes.json depois.json
+#   python benchmark.py --json largo.json && python benchmark.py --quente --json quente.json
+#   python benchmark.py --comparar largo.json quente.json
+# ============================================================
+
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import tempfile
+import argparse
+import subprocess
+from contextlib import contextmanager, ExitStack
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+
+import main
+from metricas import pico_rss
+
+# ------------------------------
+# Gerador de CSV sintético
+# ------------------------------
+UF_CODIGOS = [11, 12, 13, 14, 15, 16, 17, 21, 22, 23, 24, 25, 26, 27, 28, 29,
+              31, 32, 33, 35, 41, 42, 43, 50, 51, 52, 53]
+SINTOMAS = ["B0011", "B0012", "B0013", "B0014", "B0015", "B0016", "B0017", "B0018",
+            "B0019", "B00110", "B00111", "B00112", "B00113"]
+MUNICIPIOS_ASCII = ["Rio Branco", "Manaus", "Natal", "Recife", "Salvador", "Curitiba"]
+MUNICIPIOS_LATIN1 = ["São Paulo", "Belém", "Goiânia", "Maceió", "Vitória", "Florianópolis"]
+
+def _coded(rng, n, valores, p_branco=0.0):
+    """Coluna de códigos como texto ('' = NULL no CSV)."""
+    col = rng.choice(np.array(valores, dtype=object), n).astype(str).astype(object)
+    if p_branco:
+        col[rng.random(n) < p_branco] = ""
+    return col
+
+def _bloco(rng, n, inicio, cols, mes, acento_a_partir):
+    d = {
+        "Ano": np.full(n, "2020", dtype=object),
+        "UF": _coded(rng, n, UF_CODIGOS),
+        "CAPITAL": _coded(rng, n, UF_CODIGOS, p_branco=0.7),
+        "V1008": _coded(rng, n, range(1, 15)),
+        "V1012": _coded(rng, n, range(1, 5)),
+        "V1013": np.full(n, str(mes), dtype=object),
+        "Estrato": _coded(rng, n, range(1110011, 1110099)),
+        "UPA": (np.arange(inicio, inicio + n) // 12 + 110000016).astype(str).astype(object),
+        "V1032": np.round(rng.gamma(2.0, 150.0, n), 6).astype(str).astype(object),
+        "A001A": _coded(rng, n, range(1, 20)),
+        "A002": _coded(rng, n, range(0, 101)),
+        "A003": _coded(rng, n, [1, 2]),
+        "A004": _coded(rng, n, [1, 2, 3, 4, 5, 9]),
+        "A005": _coded(rng, n, range(1, 9)),
+    }
+    for c in SINTOMAS + ["B002", "B005", "B007"]:
+        d[c] = _coded(rng, n, [1, 2, 2, 2, 9], p_branco=0.1)
+    # acento latin1 só a partir de `acento_a_partir`: a amostra do sniff parece utf-8
+    # (o cabeçalho também fica ASCII, senão o sniff já detectaria latin1)
+    idx = np.arange(inicio, inicio + n)
+    d["Municipio"] = np.where(idx >= acento_a_partir,
+                              rng.choice(np.array(MUNICIPIOS_LATIN1, dtype=object), n),
+                              rng.choice(np.array(MUNICIPIOS_ASCII, dtype=object), n))
+    for i in range(max(cols - len(d), 0)):       # largura extra: blocos C0xx / D0xx / E0xx
+        d[f"{'CDE'[i % 3]}{i // 3 + 1:03d}"] = _coded(rng, n, [1, 2, 3, 9], p_branco=0.3)
+    return pd.DataFrame(d)
+
+def gerar_csv(path: str, rows: int, cols: int = 150, mes: int = 11, seed: int = 0,
+              bloco: int = 100_000) -> int:
+    """Grava o CSV sintético (';', latin1) em blocos; devolve o tamanho em bytes."""
+    rng = np.random.default_rng(seed)
+    # depois das SNIFF_ROWS linhas da amostra de dtypes, que já cobrem bem mais que
+    # SNIFF_BYTES; com rows <= SNIFF_ROWS o arquivo sai todo ASCII (sem fallback)
+    acento_a_partir = max(main.SNIFF_ROWS, rows // 2)
+    with open(path, "w", encoding="latin1", newline="") as f:
+        for inicio in range(0, rows, bloco):
+            df = _bloco(rng, min(bloco, rows - inicio), inicio, cols, mes, acento_a_partir)
+            df.to_csv(f, sep=";", index=False, header=inicio == 0)
+    return os.path.getsize(path)
+
+# ------------------------------
+# Medição (tempo + pico de RSS, mesmo amostrador do metricas.py)
+# ------------------------------
+def medir(etapas: list, nome: str, func, linhas: int, nbytes: int):
+    """Roda func(), registra a etapa em `etapas` e devolve o resultado de func."""
+    with pico_rss() as mem:
+        t0 = time.perf_counter()
+        res = func()
+        seg = time.perf_counter() - t0
+    etapas.append({"etapa": nome, "segundos": round(seg, 4),
+                   "linhas_s": round(linhas / seg) if seg > 0 else None,
+                   "mb_s": round(nbytes / 1e6 / seg, 2) if seg > 0 else None,
+                   "pico_rss_mb": mem["pico_rss_mb"]})
+    print(f"  {nome:<24} {seg:8.3f}s  {etapas[-1]['linhas_s'] or 0:>12,} linhas/s  "
+          f"{etapas[-1]['mb_s'] or 0:8.1f} MB/s  pico RSS {mem['pico_rss_mb']:,.0f} MB")
+    return res
+
+# ------------------------------
+# Postgres descartável
+# ------------------------------
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+@contextmanager
+def postgres_local(pg_bin: str = None):
+    """initdb + pg_ctl start numa pasta temporária; devolve a URL e apaga tudo no fim."""
+    def binario(nome):
+        path = os.path.join(pg_bin, nome) if pg_bin else shutil.which(nome)
+        if not path or not os.path.exists(path):
+            raise FileNotFoundError(f"{nome} não encontrado (instale o PostgreSQL ou use --pg-bin/--db-url)")
+        return path
+
+    initdb, pg_ctl = binario("initdb"), binario("pg_ctl")
+    pasta = tempfile.mkdtemp(prefix="pnad_bench_pg_")
+    dados = os.path.join(pasta, "dados")
+    porta = _porta_livre()
+    try:
+        subprocess.run([initdb, "-D", dados, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-locale"],
+                       check=True, capture_output=True)
+        subprocess.run([pg_ctl, "-D", dados, "-l", os.path.join(pasta, "postgres.log"), "-w",
+                        "-o", f"-p {porta} -k {pasta} -c listen_addresses=127.0.0.1", "start"],
+                       check=True, capture_output=True)
+        try:
+            yield f"postgresql+psycopg2://postgres@127.0.0.1:{porta}/postgres"
+        finally:
+            subprocess.run([pg_ctl, "-D", dados, "-m", "fast", "stop"], capture_output=True)
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+# ------------------------------
+# Execução
+# ------------------------------
+def checar_encoding(csv_path: str) -> dict:
+    """Encoding da amostra do sniff x encoding com que o loader terminou a leitura."""
+    sniff = main.sniff_dialect(csv_path)["encoding"]
+    leitura = main.get_dialect(csv_path)["encoding"]   # o fallback grava latin1 no cache
+    fallback = sniff != leitura
+    print(f"  encoding: sniff {sniff}, leitura {leitura} — "
+          f"{'fallback para latin1 ok' if fallback else 'AVISO: o fallback não rodou'}")
+    return {"sniff": sniff, "leitura": leitura, "fallback": fallback}
+
+def rodar(csv_path: str, linhas: int, engine=None, copy_format: str = main.COPY_FORMAT,
+          quente: bool = False) -> list:
+    """Uma passada pelo loader, etapa por etapa (as mesmas funções do main.py)."""
+    nbytes = os.path.getsize(csv_path)
+    final_table = main.discover_jobs(os.path.dirname(csv_path))[0][1]
+    staging = f"{final_table}_new"
+    etapas = []
+
+    df = medir(etapas, "smart_read_csv", lambda: main.smart_read_csv(csv_path), linhas, nbytes)
+    df = medir(etapas, "clean_columns", lambda: main.clean_columns(df), linhas, nbytes)
+    df = medir(etapas, "maybe_parse_datetimes", lambda: main.maybe_parse_datetimes(df), linhas, nbytes)
+    df.replace([np.inf, -np.inf], np.nan, inplace=True)
+    sql_types = medir(etapas, "infer_sqlalchemy_dtypes", lambda: main.infer_sqlalchemy_dtypes(df), linhas, nbytes)
+    if quente:   # como o --hot-cold do loader: largura total no arquivo frio, banco só com as quentes
+        frio = main.cold_archive_path(final_table)
+        medir(etapas, "arquivo_frio",
+              lambda: [None for _ in main.tee_cold_archive(main.iter_frame_chunks(df), frio)], linhas, nbytes)
+        quentes = main.hot_columns(df.columns)
+        df, sql_types = df[quentes], {c: sql_types[c] for c in quentes}
+    if engine is None:
+        return etapas
+
+    def copiar():
+        with engine.begin() as conn:
+            for chunk in main.iter_frame_chunks(df):
+                main.copy_chunk(conn, chunk, staging, copy_format=copy_format, sql_types=sql_types)
+
+    def swap():   # _swap_sql direto: mark_load não roda (é o marcador do projeto)
+        with engine.begin() as conn:
+            main._swap_sql(conn, final_table)
+
+    medir(etapas, "create_staging", lambda: main.create_staging(engine, staging, df.iloc[0:0], sql_types),
+          linhas, nbytes)
+    medir(etapas, "copy_chunk", copiar, linhas, nbytes)
+    medir(etapas, "finalize_staging", lambda: main.finalize_staging(engine, final_table), linhas, nbytes)
+    medir(etapas, "swap", swap, linhas, nbytes)
+    return etapas
+
+def medir_tabela(engine, final_table: str, repeticoes: int = 3) -> dict:
+    """Tamanho da tabela do mês e melhor tempo de uma varredura das colunas quentes."""
+    with engine.connect() as conn:
+        colunas = [c for c in main._columns(conn, final_table) if c in main.hot_column_set()]
+        contagens = ", ".join(f'count("{c}")' for c in colunas)
+        sql = text(f'SELECT count(*), {contagens} FROM public."{final_table}"')
+        tempos = []
+        for _ in range(repeticoes + 1):   # a 1ª só aquece o cache
+            t0 = time.perf_counter()
+            conn.execute(sql).all()
+            tempos.append(time.perf_counter() - t0)
+        tamanho = main._table_size(conn, final_table)
+    print(f"  {'tabela ' + final_table:<24} {tamanho/1e6:8.1f} MB  varredura de {len(colunas)} colunas "
+          f"{min(tempos[1:]):.3f}s")
+    return {"bytes": tamanho, "colunas_quentes": len(colunas), "varredura_s": round(min(tempos[1:]), 4)}
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def benchmark(rows: int, cols: int, repeat: int = 1, copy_format: str = main.COPY_FORMAT,
+              db_url: str = None, pg_bin: str = None, sem_db: bool = False, quente: bool = False) -> dict:
+    trabalho = tempfile.mkdtemp(prefix="pnad_bench_")
+    origem = os.getcwd()
+    os.chdir(trabalho)   # CACHE_DIR / DATA_DIR do main.py são relativos
+    try:
+        os.makedirs(main.DATA_DIR)
+        csv_path = os.path.join(main.DATA_DIR, "PNAD_COVID_112020.csv")
+        t0 = time.perf_counter()
+        nbytes = gerar_csv(csv_path, rows, cols)
+        print(f"CSV sintético: {rows:,} linhas x {cols} colunas, {nbytes/1e6:.1f} MB "
+              f"(gerado em {time.perf_counter()-t0:.1f}s)")
+
+        with _banco(db_url, pg_bin, sem_db) as url:
+            engine = create_engine(url) if url else None
+            execucoes, tabelas = [], []
+            final_table = main.discover_jobs(main.DATA_DIR)[0][1]
+            for i in range(repeat):
+                shutil.rmtree(main.CACHE_DIR, ignore_errors=True)   # sempre a frio
+                print(f"\nExecução {i+1}/{repeat}{'' if engine else ' (sem banco)'}:")
+                execucoes.append(rodar(csv_path, rows, engine, copy_format, quente))
+                encoding = checar_encoding(csv_path)
+                if engine is not None:
+                    tabelas.append(medir_tabela(engine, final_table))
+            frio = main.cold_archive_path(final_table)
+            frio_bytes = os.path.getsize(frio) if quente else None
+            usou_banco = engine is not None
+            if usou_banco:
+                engine.dispose()
+    finally:
+        os.chdir(origem)
+        shutil.rmtree(trabalho, ignore_errors=True)
+
+    melhor = {}
+    for etapas in execucoes:
+        for e in etapas:
+            if e["etapa"] not in melhor or e["segundos"] < melhor[e["etapa"]]["segundos"]:
+                melhor[e["etapa"]] = e
+    return {"commit": _commit(), "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "parametros": {"linhas": rows, "colunas": cols, "bytes": nbytes, "repeticoes": repeat,
+                           "copy_format": copy_format, "chunk_size": main.CHUNK_SIZE,
+                           "banco": usou_banco, "quente": quente},
+            "encoding": encoding,
+            "etapas": list(melhor.values()),
+            "tabela": min(tabelas, key=lambda t: t["varredura_s"]) if tabelas else None,
+            "arquivo_frio_bytes": frio_bytes,
+            "pico_rss_mb": max(e["pico_rss_mb"] for e in melhor.values())}
+
+@contextmanager
+def _banco(db_url, pg_bin, sem_db):
+    """URL do banco do benchmark: --db-url, senão Postgres local, senão None (só leitura)."""
+    if sem_db or db_url:
+        yield db_url if not sem_db else None
+        return
+    with ExitStack() as stack:
+        try:
+            url = stack.enter_context(postgres_local(pg_bin))
+        except (FileNotFoundError, subprocess.CalledProcessError) as exc:
+            print(f"[aviso] Postgres local indisponível ({exc}); medindo só as etapas de leitura.")
+            url = None
+        yield url
+
+def comparar(antes_path: str, depois_path: str):
+    """Tabela etapa a etapa entre dois JSONs do benchmark."""
+    with open(antes_path, encoding="utf-8") as f:
+        antes = json.load(f)
+    with open(depois_path, encoding="utf-8") as f:
+        depois = json.load(f)
+    a = {e["etapa"]: e for e in antes["etapas"]}
+    print(f"{'etapa':<24} {antes['commit'] or 'antes':>10} {depois['commit'] or 'depois':>10}   variação")
+    for e in depois["etapas"]:
+        base = a.get(e["etapa"])
+        if base is None:
+            print(f"{e['etapa']:<24} {'-':>10} {e['segundos']:>9.3f}s")
+            continue
+        delta = (e["segundos"] / base["segundos"] - 1) * 100 if base["segundos"] else 0.0
+        print(f"{e['etapa']:<24} {base['segundos']:>9.3f}s {e['segundos']:>9.3f}s   {delta:+6.1f}%")
+    print(f"{'pico RSS (MB)':<24} {antes['pico_rss_mb']:>10,.0f} {depois['pico_rss_mb']:>10,.0f}")
+
+    # layout da tabela (largo x --quente): tamanho, varredura e arquivo frio
+    ta, td = antes.get("tabela"), depois.get("tabela")
+    linhas = []
+    if ta and td:
+        linhas += [("tabela (MB)", ta["bytes"] / 1e6, td["bytes"] / 1e6),
+                   ("varredura quente (s)", ta["varredura_s"], td["varredura_s"])]
+    linhas.append(("arquivo frio (MB)", (antes.get("arquivo_frio_bytes") or 0) / 1e6,
+                   (depois.get("arquivo_frio_bytes") or 0) / 1e6))
+    linhas.append(("CSV (MB)", antes["parametros"]["bytes"] / 1e6, depois["parametros"]["bytes"] / 1e6))
+    for nome, a, d in linhas:
+        delta = f"{(d / a - 1) * 100:+6.1f}%" if a else ""
+        print(f"{nome:<24} {a:>10.3f} {d:>10.3f}   {delta}")
+
+# ============================================================
+# CLI
+# ============================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do loader PNAD COVID com CSV sintético")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--cols", type=int, default=150)
+    parser.add_argument("--repeat", type=int, default=1, help="execuções (fica o melhor tempo de cada etapa)")
+    parser.add_argument("--copy-format", choices=("csv", "binary"), default=main.COPY_FORMAT)
+    parser.add_argument("--db-url", default=os.getenv("BENCH_DB_URL"),
+                        help="Postgres já existente (senão sobe um local com initdb/pg_ctl)")
+    parser.add_argument("--pg-bin", help="pasta com initdb/pg_ctl, se não estiverem no PATH")
+    parser.add_argument("--sem-db", action="store_true", help="mede só as etapas de leitura")
+    parser.add_argument("--quente", action="store_true",
+                        help="layout --hot-cold do loader: arquivo frio zstd + tabela só com as colunas quentes")
+    parser.add_argument("--json", help="grava o resultado neste arquivo")
+    parser.add_argument("--comparar", nargs=2, metavar=("ANTES", "DEPOIS"),
+                        help="compara dois JSONs do benchmark e sai")
+    parser.add_argument("--gerar", metavar="CSV", help="só gera o CSV sintético neste caminho e sai")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:   # sem nenhuma execução não há etapas nem encoding para reportar
+        parser.error("--repeat precisa ser >= 1")
+    return args
+
+def run(argv=None):
+    args = parse_args(argv)
+    if args.comparar:
+        comparar(*args.comparar)
+        return 0
+    if args.gerar:
+        nbytes = gerar_csv(args.gerar, args.rows, args.cols)
+        print(f"{args.gerar}: {args.rows:,} linhas x {args.cols} colunas, {nbytes/1e6:.1f} MB")
+        return 0
+
+    resultado = benchmark(args.rows, args.cols, args.repeat, args.copy_format,
+                          args.db_url, args.pg_bin, args.sem_db, args.quente)
+    if resultado["arquivo_frio_bytes"]:
+        print(f"\nArquivo frio ({main.COLD_COMPRESSION}): {resultado['arquivo_frio_bytes']/1e6:.1f} MB "
+              f"(CSV {resultado['parametros']['bytes']/1e6:.1f} MB)")
+    print(f"\nPico de RSS: {resultado['pico_rss_mb']:,.0f} MB (commit {resultado['commit']})")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"Resultado salvo em {args.json}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
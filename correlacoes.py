@@ -0,0 +1,311 @@
+# ============================================================
+# correlacoes.py — Correlações por estatísticas suficientes
+# ============================================================
+# Objetivo:
+# 1) Uma passada vetorizada por mês sobre os indicadores 0/1 da silver
+#    acumula três matrizes k×k: N (linhas com os dois não nulos), S (somas)
+#    e P (produto cruzado / Gram)
+# 2) Guardar em public.pnad_covid_corr_stats (1 linha por mês): a carga de
+#    um mês só regrava as estatísticas DAQUELE mês (main.py, no swap)
+# 3) Qualquer matriz de correlação — por mês ou somando meses — sai dessas
+#    matrizes na hora, sem varrer a tabela de novo
+#
+# Pearson com NULL par a par (mesma regra do corr() do Postgres):
+#   X = indicadores com NULL -> 0, M = máscara de não nulos
+#   N = Mᵀ M, S = Xᵀ M, P = Xᵀ X      (0/1 -> Σx² = Σx = S)
+#   r_ij = (N_ij P_ij - S_ij S_ji) / sqrt((N_ij S_ij - S_ij²)(N_ij S_ji - S_ji²))
+#
+# Uso:
+#   python correlacoes.py                          # alvo internou, por mês + todos
+#   python correlacoes.py --alvo falta_ar --meses 2020-11-01
+#   python correlacoes.py --matriz                 # matriz completa (todos os meses)
+#   python correlacoes.py --offline                # direto dos CSVs (sem banco)
+#   python correlacoes.py --recalcular             # (re)grava os meses já carregados
+# ============================================================
+
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+STATS_TABLE = "pnad_covid_corr_stats"
+SILVER_TABLE = "pnad_covid_2020_silver"
+CHUNK_ROWS = 200_000   # linhas lidas do banco por vez
+
+# indicador -> expressão sobre a silver (mesmos recortes de 02_analytics.sql)
+INDICADORES = {
+    "falta_ar": "falta_ar",
+    "dor_peito": "dor_peito",
+    "tem_algum_sintoma": "tem_algum_sintoma",
+    "sint_0011": "sint_0011",
+    "sint_0012": "sint_0012",
+    "sint_0013": "sint_0013",
+    "sint_0015": "sint_0015",
+    "sint_0019": "sint_0019",
+    "sint_00110": "sint_00110",
+    "sint_00111": "sint_00111",
+    "sint_00112": "sint_00112",
+    "procurou": "procurou",
+    "plano": "plano",
+    "idoso": "idoso",
+    "sexo_cat1": "(sexo = 1)::int",
+    "raca_cat1": "(raca_cor = 1)::int",
+    "escolaridade_3mais": "(NULLIF(escolaridade, 0) >= 3)::int",
+    "condicao_ref_pessoa": "(condicao_no_domicilio = 1)::int",
+    "internou": "internou",
+}
+
+# indicador -> coluna de pnad_covid_correlacoes / pnad_covid_correlacoes_mes
+COLUNAS_VIEW = {
+    "falta_ar": "corr_falta_ar",
+    "dor_peito": "corr_dor_peito",
+    "tem_algum_sintoma": "corr_algum_sintoma",
+    "sint_0011": "corr_0011",
+    "sint_0012": "corr_0012",
+    "sint_0013": "corr_0013",
+    "sint_0015": "corr_0015",
+    "sint_0019": "corr_0019",
+    "sint_00110": "corr_00110",
+    "sint_00111": "corr_00111",
+    "sint_00112": "corr_00112",
+    "procurou": "corr_buscou_servico",
+    "plano": "corr_plano_saude",
+    "idoso": "corr_idoso60",
+    "sexo_cat1": "corr_sexo_cat1",
+    "raca_cat1": "corr_raca_cat1",
+    "escolaridade_3mais": "corr_escolaridade_3mais",
+    "condicao_ref_pessoa": "corr_condicao_ref_pessoa",
+}
+
+# ------------------------------
+# Acúmulo (1 passada)
+# ------------------------------
+def vazio(variaveis=None) -> dict:
+    variaveis = list(variaveis or INDICADORES)
+    k = len(variaveis)
+    return {"variaveis": variaveis, "linhas": 0,
+            "n": np.zeros((k, k)), "soma": np.zeros((k, k)), "produto": np.zeros((k, k))}
+
+def acumular(st: dict, X: np.ndarray) -> dict:
+    """Soma ao `st` as matrizes de um bloco X (linhas x indicadores, NaN = NULL)."""
+    M = (~np.isnan(X)).astype("float64")
+    X0 = np.nan_to_num(X)
+    st["linhas"] += len(X)
+    st["n"] += M.T @ M
+    st["soma"] += X0.T @ M
+    st["produto"] += X0.T @ X0
+    return st
+
+def combinar(lista) -> dict:
+    """Estatísticas somadas (ex.: todos os meses); alinha pelas variáveis."""
+    lista = list(lista)
+    variaveis = list(dict.fromkeys(v for st in lista for v in st["variaveis"]))
+    total = vazio(variaveis)
+    for st in lista:
+        idx = np.array([variaveis.index(v) for v in st["variaveis"]])
+        total["linhas"] += st["linhas"]
+        for m in ("n", "soma", "produto"):
+            total[m][np.ix_(idx, idx)] += st[m]
+    return total
+
+# ------------------------------
+# Correlações a partir das matrizes
+# ------------------------------
+def matriz(st: dict, variaveis=None) -> pd.DataFrame:
+    """Matriz de correlação (NaN onde o corr() do Postgres daria NULL)."""
+    N, S, P = st["n"], st["soma"], st["produto"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        num = N * P - S * S.T
+        var = N * S - S * S          # variância (x N²) da linha i nos pares com j
+        den = np.sqrt(var * var.T)
+        r = np.where((N > 0) & (var > 0) & (var.T > 0), num / den, np.nan)
+    df = pd.DataFrame(r, index=st["variaveis"], columns=st["variaveis"])
+    return df if variaveis is None else df.loc[variaveis, variaveis]
+
+def correlacoes_alvo(por_mes: dict, alvo: str = "internou") -> pd.DataFrame:
+    """
+    Uma linha por mês + 'todos' (meses somados) com corr(indicador, alvo),
+    no layout de pnad_covid_correlacoes_mes / pnad_covid_correlacoes.
+    """
+    linhas = []
+    for escopo, st in list(sorted(por_mes.items())) + [("todos", combinar(por_mes.values()))]:
+        r = matriz(st)[alvo].drop(alvo)
+        linha = {"escopo": str(escopo), "linhas": st["linhas"]}
+        linha.update({COLUNAS_VIEW.get(v, f"corr_{v}"): r[v] for v in r.index})
+        linhas.append(linha)
+    return pd.DataFrame(linhas)
+
+# ------------------------------
+# Banco: cálculo, gravação e leitura
+# ------------------------------
+DDL_STATS = f"""
+CREATE TABLE IF NOT EXISTS public.{STATS_TABLE} (
+  referencia    date NOT NULL,
+  pendente      boolean NOT NULL DEFAULT false,  -- true = da staging (_new), vira false no swap
+  variaveis     text[] NOT NULL,
+  linhas        bigint NOT NULL,
+  n             double precision[] NOT NULL,
+  soma          double precision[] NOT NULL,
+  produto       double precision[] NOT NULL,
+  atualizado_em timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (referencia, pendente)
+)
+"""
+
+def garantir_tabela(conn):
+    """
+    Cria a tabela sob advisory lock da transação: com --workers vários
+    processos chegam juntos e o IF NOT EXISTS sozinho ainda corre no
+    pg_type (duplicate key). O main.py chama uma vez antes dos workers.
+    """
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:t))"), {"t": f"public.{STATS_TABLE}"})
+    conn.execute(text(DDL_STATS))
+
+def _tabela_existe(conn) -> bool:
+    return conn.execute(text("SELECT to_regclass(:t)"), {"t": f"public.{STATS_TABLE}"}).scalar() is not None
+
+def estatisticas_tabela(conn, tabela: str, ref: str = None) -> dict:
+    """Uma passada (em blocos) sobre `tabela` — opcionalmente só o mês `ref`."""
+    cols = ", ".join(f"({expr})::float AS {nome}" for nome, expr in INDICADORES.items())
+    sql = f'SELECT {cols} FROM public."{tabela}"'
+    params = {}
+    if ref is not None:
+        sql += " WHERE referencia = CAST(:ref AS date)"
+        params["ref"] = ref
+    st = vazio()
+    stream = conn.execution_options(stream_results=True)
+    for bloco in pd.read_sql(text(sql), stream, params=params, chunksize=CHUNK_ROWS):
+        acumular(st, bloco.to_numpy(dtype="float64", na_value=np.nan))
+    return st
+
+def gravar(conn, ref: str, st: dict, pendente: bool = False):
+    """Regrava as estatísticas do mês (só a linha `pendente` indicada)."""
+    if not _tabela_existe(conn):
+        garantir_tabela(conn)
+    conn.execute(text(f"DELETE FROM public.{STATS_TABLE} WHERE referencia = CAST(:ref AS date) "
+                      "AND pendente = :p"), {"ref": ref, "p": pendente})
+    conn.execute(text(f"INSERT INTO public.{STATS_TABLE} "
+                      "(referencia, pendente, variaveis, linhas, n, soma, produto) "
+                      "VALUES (CAST(:ref AS date), :p, :v, :linhas, :n, :soma, :produto)"),
+                 {"ref": ref, "p": pendente, "v": st["variaveis"], "linhas": int(st["linhas"]),
+                  "n": st["n"].tolist(), "soma": st["soma"].tolist(), "produto": st["produto"].tolist()})
+
+def gravar_pendente(conn, silver_staging: str, ref: str) -> dict:
+    """Chamado pelo main.py depois da silver _new: estatísticas do mês, pendentes até o swap."""
+    st = estatisticas_tabela(conn, silver_staging)
+    gravar(conn, ref, st, pendente=True)
+    return st
+
+def promover(conn, ref: str):
+    """No swap (mesma transação): as estatísticas pendentes do mês passam a valer."""
+    if not _tabela_existe(conn):
+        return
+    conn.execute(text(f"DELETE FROM public.{STATS_TABLE} WHERE referencia = CAST(:ref AS date) "
+                      "AND NOT pendente"), {"ref": ref})
+    conn.execute(text(f"UPDATE public.{STATS_TABLE} SET pendente = false, atualizado_em = now() "
+                      "WHERE referencia = CAST(:ref AS date)"), {"ref": ref})
+
+def ler(conn, meses=None) -> dict:
+    """{referencia 'AAAA-MM-01': estatísticas} dos meses já promovidos."""
+    sql = (f"SELECT referencia::text AS referencia, variaveis, linhas, n, soma, produto "
+           f"FROM public.{STATS_TABLE} WHERE NOT pendente")
+    params = {}
+    if meses:
+        sql += " AND referencia = ANY(CAST(:meses AS date[]))"
+        params["meses"] = [str(m) for m in meses]
+    out = {}
+    for row in conn.execute(text(sql + " ORDER BY referencia"), params).mappings():
+        out[row["referencia"]] = {"variaveis": list(row["variaveis"]), "linhas": int(row["linhas"]),
+                                  **{m: np.array(row[m], dtype="float64") for m in ("n", "soma", "produto")}}
+    return out
+
+def recalcular(engine, meses=None) -> dict:
+    """(Re)grava as estatísticas dos meses já na silver — para cargas anteriores a este módulo."""
+    with engine.connect() as conn:
+        refs = [str(r) for r in conn.execute(text(
+            f"SELECT DISTINCT referencia FROM public.{SILVER_TABLE} ORDER BY 1")).scalars()]
+    refs = [r for r in refs if not meses or r in {str(m) for m in meses}]
+    out = {}
+    for ref in refs:
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            out[ref] = estatisticas_tabela(conn, SILVER_TABLE, ref)
+            gravar(conn, ref, out[ref])
+        print(f"[corr] {ref}: {out[ref]['linhas']:,} linhas em {time.perf_counter()-t0:.2f}s")
+    return out
+
+# ------------------------------
+# Sem banco (CSVs + painel_offline)
+# ------------------------------
+def indicadores_arrays(s: dict) -> np.ndarray:
+    """Matriz (linhas x INDICADORES) a partir de painel_offline.silver_arrays."""
+    def igual(x, v):
+        return np.where(np.isnan(x), np.nan, (x == v).astype("float64"))
+    esc = np.where(s["escolaridade"] == 0, np.nan, s["escolaridade"])
+    extra = {
+        "sexo_cat1": igual(s["sexo"], 1),
+        "raca_cat1": igual(s["raca_cor"], 1),
+        "escolaridade_3mais": np.where(np.isnan(esc), np.nan, (esc >= 3).astype("float64")),
+        "condicao_ref_pessoa": igual(s["condicao_no_domicilio"], 1),
+    }
+    return np.column_stack([extra[v] if v in extra else s[v] for v in INDICADORES])
+
+def calcular_offline(meses=None, data_dir: str = None) -> dict:
+    """{referencia: estatísticas} direto dos CSVs de data_dir."""
+    import main  # import tardio: só o modo offline depende do loader
+    from painel_offline import ler_mes, silver_arrays
+
+    meses = None if meses is None else {str(m) for m in meses}
+    out = {}
+    for csv, tabela in main.discover_jobs(data_dir or main.DATA_DIR):
+        ref = main.month_of(tabela)
+        if ref is None or (meses is not None and ref not in meses):
+            continue
+        X = indicadores_arrays(silver_arrays(ler_mes(csv)))
+        out[ref] = acumular(vazio(), X)
+    return out
+
+# ============================================================
+# CLI
+# ============================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Correlações da PNAD COVID a partir das estatísticas por mês")
+    parser.add_argument("--alvo", default="internou", choices=list(INDICADORES),
+                        help="indicador alvo das correlações (padrão: internou)")
+    parser.add_argument("--meses", nargs="+", metavar="AAAA-MM-01", help="só estes meses")
+    parser.add_argument("--matriz", action="store_true",
+                        help="mostra a matriz indicador x indicador (meses somados)")
+    parser.add_argument("--offline", action="store_true", help="calcula direto dos CSVs de data/")
+    parser.add_argument("--data-dir", help="pasta dos CSVs no modo --offline")
+    parser.add_argument("--recalcular", action="store_true",
+                        help="(re)grava no banco as estatísticas dos meses já carregados")
+    return parser.parse_args(argv)
+
+def run(argv=None):
+    args = parse_args(argv)
+    if args.offline:
+        por_mes = calcular_offline(args.meses, args.data_dir)
+    else:
+        from paineis import get_engine
+        engine = get_engine()
+        if args.recalcular:
+            por_mes = recalcular(engine, args.meses)
+        else:
+            with engine.connect() as conn:
+                por_mes = ler(conn, args.meses)
+    if not por_mes:
+        print("Nenhum mês com estatísticas (rode a carga, --recalcular ou --offline).")
+        return 1
+
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        if args.matriz:
+            print(matriz(combinar(por_mes.values())).round(4))
+        else:
+            print(correlacoes_alvo(por_mes, args.alvo).set_index("escopo").T.round(4))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
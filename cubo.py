@@ -0,0 +1,168 @@
+# ============================================================
+# cubo.py — Consultas no cubo de contagens (pnad_covid_2020_cubo)
+# ============================================================
+# Objetivo:
+# 1) Ler o cubo montado pelo main.py na carga (poucos milhares de células
+#    por mês) — com cache local igual ao do paineis.py
+# 2) Responder qualquer recorte dos painéis por roll-up (soma das células):
+#    prop_<flag> = Σ s_<flag> / Σ n_<flag>  (= AVG ignorando NULL)
+#    prop_internou_entre_buscou = Σ s_procurou_internou / Σ s_procurou
+# 3) Verificar o cubo contra as views pnad_covid_painel_*
+#
+# Uso:
+#   python cubo.py --por uf sexo --metricas prop_falta_ar
+#   python cubo.py --por escolaridade_grp --filtro faixa=60+ --meses 2020-11-01
+#   python cubo.py --verificar
+# ============================================================
+
+import os
+import sys
+import glob
+import time
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from paineis import CACHE_DIR, HAS_PARQUET, get_engine, load_marker
+
+CUBE_TABLE = "pnad_covid_2020_cubo"
+DIMENSOES = ["referencia", "uf", "faixa", "sexo", "escolaridade_grp"]
+
+# ------------------------------
+# Leitura (banco ou cache)
+# ------------------------------
+def _cache_path(marker: str, meses) -> str:
+    chave = hashlib.sha256("\n".join([marker, CUBE_TABLE, *meses]).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"cubo_{chave}.parquet")
+
+def carregar_cubo(meses=None, usar_cache: bool = True) -> pd.DataFrame:
+    """Células do cubo (todas, ou só dos `meses`); do cache local quando ainda vale."""
+    meses = sorted(str(m) for m in meses) if meses else []
+    marker = load_marker() if usar_cache and HAS_PARQUET else None
+    path = _cache_path(marker, meses) if marker is not None else None
+    if path and os.path.isfile(path):
+        return pd.read_parquet(path)
+
+    sql = f"SELECT * FROM public.{CUBE_TABLE}"
+    params = {}
+    if meses:
+        sql += " WHERE referencia = ANY(CAST(:meses AS date[]))"
+        params["meses"] = meses
+    with get_engine().connect() as conn:
+        cubo = pd.read_sql(text(sql), conn, params=params)
+    if path:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        for antigo in glob.glob(os.path.join(CACHE_DIR, "cubo_*.parquet")):
+            os.remove(antigo)
+        tmp = path + ".tmp"
+        cubo.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+    return cubo
+
+# ------------------------------
+# Roll-up
+# ------------------------------
+def flags(cubo: pd.DataFrame) -> list:
+    """Flags presentes no cubo (pares n_<flag> / s_<flag>)."""
+    return [c[2:] for c in cubo.columns if c.startswith("s_") and f"n_{c[2:]}" in cubo.columns]
+
+def consultar(cubo: pd.DataFrame, por=("referencia",), filtro: dict = None, metricas=None) -> pd.DataFrame:
+    """
+    Agrega o cubo nas dimensões `por` (NULL vira grupo próprio, como no
+    GROUP BY) e devolve n + proporções. `filtro` = {dimensão: valor ou lista}.
+    """
+    for dim, valor in (filtro or {}).items():
+        valores = valor if isinstance(valor, (list, tuple, set)) else [valor]
+        cubo = cubo[cubo[dim].isin(valores)]
+    medidas = [c for c in cubo.columns if c not in DIMENSOES]
+    por = list(por)
+    soma = (cubo.groupby(por, dropna=False, sort=True)[medidas].sum() if por
+            else cubo[medidas].sum().to_frame().T)
+
+    out = soma[["n"]].copy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for flag in flags(cubo):
+            n = soma[f"n_{flag}"].to_numpy(dtype="float64")
+            out[f"prop_{flag}"] = np.where(n > 0, soma[f"s_{flag}"] / n, np.nan)
+        if "s_procurou_internou" in soma:
+            den = soma["s_procurou"].to_numpy(dtype="float64")
+            out["prop_internou_entre_buscou"] = np.where(den > 0, soma["s_procurou_internou"] / den, np.nan)
+    # mesmos nomes das views / paineis.py
+    out = out.rename(columns={"prop_tem_algum_sintoma": "prop_algum_sintoma",
+                              "prop_plano": "prop_plano_saude", "prop_idoso": "prop_60mais",
+                              "prop_procurou": "prop_buscou"})
+    if metricas:
+        out = out[["n"] + [m for m in metricas if m != "n"]]
+    return out.reset_index(drop=not por)
+
+# ------------------------------
+# Verificação contra as views
+# ------------------------------
+VIEWS = {
+    "pnad_covid_painel_mensal": ["referencia"],
+    "pnad_covid_painel_uf": ["referencia", "uf"],
+    "pnad_covid_painel_faixa": ["referencia", "faixa"],
+}
+
+def verificar(meses=None) -> bool:
+    """Cada view pnad_covid_painel_* recalculada pelo cubo tem de bater exatamente."""
+    from painel_offline import comparar  # import tardio: puxa o loader
+
+    cubo = carregar_cubo(meses, usar_cache=False)
+    meses = sorted({str(r) for r in cubo["referencia"]})
+    problemas = []
+    with get_engine().connect() as conn:
+        for view, chave in VIEWS.items():
+            banco = pd.read_sql(text(f"SELECT * FROM public.{view} WHERE referencia = ANY(CAST(:meses AS date[]))"),
+                                conn, params={"meses": meses})
+            problemas += comparar(view, consultar(cubo, chave), banco, chave)
+    for p in problemas:
+        print(f"[DIFERENTE] {p}")
+    if not problemas:
+        print(f"[ok] Cubo confere com {', '.join(VIEWS)} ({len(cubo):,} células, {len(meses)} mês(es))")
+    return not problemas
+
+# ============================================================
+# CLI
+# ============================================================
+def _filtro(itens) -> dict:
+    out = {}
+    for item in itens or []:
+        dim, _, valor = item.partition("=")
+        if dim not in DIMENSOES or not valor:
+            raise SystemExit(f"--filtro inválido: {item!r} (use dimensão=valor; dimensões: {', '.join(DIMENSOES)})")
+        valores = [v if dim in ("faixa", "escolaridade_grp", "referencia") else int(v) for v in valor.split(",")]
+        if dim == "referencia":
+            valores = [pd.Timestamp(v).date() for v in valores]
+        out[dim] = valores
+    return out
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Consultas no cubo de contagens da PNAD COVID")
+    parser.add_argument("--por", nargs="*", default=["referencia"], choices=DIMENSOES,
+                        help="dimensões do resultado (padrão: referencia)")
+    parser.add_argument("--filtro", nargs="+", metavar="DIM=VALOR", help="ex.: uf=35 sexo=1,2 faixa=60+")
+    parser.add_argument("--metricas", nargs="+", help="ex.: prop_falta_ar prop_internou_entre_buscou")
+    parser.add_argument("--meses", nargs="+", metavar="AAAA-MM-01", help="só estes meses")
+    parser.add_argument("--sem-cache", action="store_true", help="ignora o cache local do cubo")
+    parser.add_argument("--verificar", action="store_true", help="compara com as views pnad_covid_painel_*")
+    return parser.parse_args(argv)
+
+def run(argv=None):
+    args = parse_args(argv)
+    if args.verificar:
+        return 0 if verificar(args.meses) else 1
+    cubo = carregar_cubo(args.meses, usar_cache=not args.sem_cache)
+    t0 = time.perf_counter()
+    res = consultar(cubo, args.por, _filtro(args.filtro), args.metricas)
+    ms = (time.perf_counter() - t0) * 1000
+    with pd.option_context("display.width", 200, "display.max_columns", None):
+        print(res.to_string(index=False, max_rows=60))
+    print(f"\n{len(res)} linha(s) a partir de {len(cubo):,} células em {ms:.1f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
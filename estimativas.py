@@ -0,0 +1,249 @@
+# ============================================================
+# estimativas.py — Proporções ponderadas (V1032) com erro padrão por réplicas
+# ============================================================
+# Objetivo:
+# 1) Estimar as proporções dos painéis (mês, UF, faixa, sexo, escolaridade)
+#    ponderadas pelo peso amostral V1032 — as views e o painel_offline.py
+#    fazem AVG simples sobre as linhas da amostra
+# 2) Erro padrão por réplicas: EP = sqrt(Σ_r (θ_r − θ)² / R)
+#    - pesos replicados do arquivo (v1032001, v1032002, ...) quando existem
+#    - senão, R réplicas bootstrap de Rao-Wu sobre o desenho (Estrato/UPA):
+#      em cada estrato sorteiam-se n_h − 1 UPAs com reposição e o peso da
+#      UPA é multiplicado por n_h/(n_h − 1) × nº de vezes sorteada
+# 3) Uma passada pelos dados: cada mês é somado por (grupo, unidade) com
+#    bincount e as R+1 réplicas de todos os indicadores saem de UM produto
+#    de matrizes por grupo — (indicadores × unidades) @ (unidades × réplicas)
+#    — em vez de uma varredura por réplica
+# 4) Resultado no formato dos painéis (prop_<x>, prop_<x>_ep) para o
+#    graficos.py desenhar com barras de erro (--estimativas)
+#
+# Uso:
+#   python estimativas.py                              # resumo dos CSVs de data/
+#   python estimativas.py --meses 2020-11-01 --replicas 500 --saida est.parquet
+#   python graficos.py --estimativas --figs E1 E2
+# ============================================================
+
+import re
+import sys
+import time
+import argparse
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+import main
+from paineis import PAINEIS, SEXO_LABEL
+from painel_offline import COLUNAS_ORIGEM, MEDIAS, silver_arrays, _chave, _numero
+
+PESO = "v1032"
+ESTRATO = "estrato"
+UPA = "upa"
+REPLICA_RE = re.compile(r"^v1032\d{3}$")   # pesos replicados, quando o arquivo traz
+REPLICAS = 200        # réplicas bootstrap geradas quando o arquivo não traz as suas
+SEMENTE = 2020
+Z95 = 1.959963984540054
+
+# ------------------------------
+# Leitura
+# ------------------------------
+def _colunas(disponiveis) -> list:
+    desenho = set(COLUNAS_ORIGEM) | {PESO, ESTRATO, UPA}
+    return [c for c in disponiveis if c in desenho or REPLICA_RE.match(c)]
+
+def ler_mes(csv_path: str) -> pd.DataFrame:
+    """Colunas dos painéis + peso/desenho (+ réplicas) do mês, do cache Parquet quando válido."""
+    opts = main._cache_opts(main.TYPE_INFERENCE, main.COMPACT_TYPES)
+    meta = main._cache_meta(csv_path, opts)
+    if meta is not None:
+        df = main.read_source_frame(csv_path, columns=_colunas(meta["tipos_sql"]))
+    else:
+        df = main.read_source_frame(csv_path)   # 1ª leitura: parseia tudo e grava o cache
+        df = df[_colunas(df.columns)]
+    if PESO not in df.columns:
+        raise SystemExit(f"{csv_path}: sem a coluna de peso {PESO.upper()}.")
+    return df
+
+# ------------------------------
+# Réplicas: (unidade de cada linha, fatores (R+1) × unidades)
+# ------------------------------
+# O peso da linha i na réplica r é w_i × M[r, unidade_i]; a linha 0 de M é
+# só 1 (estimativa principal).
+def replicas_arquivo(df: pd.DataFrame, w: np.ndarray, colunas: list):
+    """Pesos replicados do arquivo: cada linha é a sua própria unidade."""
+    W = df[colunas].to_numpy(dtype="float64", na_value=0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fatores = np.where(w[:, None] > 0, W / w[:, None], 0.0)
+    M = np.vstack([np.ones(len(df)), fatores.T])
+    return np.arange(len(df)), M
+
+def replicas_bootstrap(estrato: np.ndarray, upa: np.ndarray, replicas: int = REPLICAS,
+                       semente: int = SEMENTE):
+    """Rao-Wu sobre as UPAs de cada estrato (estrato com 1 UPA não contribui)."""
+    pares = np.column_stack([np.nan_to_num(estrato, nan=-1), np.nan_to_num(upa, nan=-1)])
+    upas, unidade = np.unique(pares, axis=0, return_inverse=True)   # ordenadas por estrato
+    unidade = unidade.ravel()
+    _, estrato_u, n_h = np.unique(upas[:, 0], return_inverse=True, return_counts=True)
+    inicio = np.concatenate([[0], np.cumsum(n_h)[:-1]])
+
+    # n_h − 1 sorteios por estrato, todas as réplicas de uma vez: (R, sorteios)
+    h = np.repeat(np.arange(len(n_h)), np.maximum(n_h - 1, 0))
+    rng = np.random.default_rng(semente)
+    sorteada = inicio[h] + np.floor(rng.random((replicas, len(h))) * n_h[h]).astype(np.int64)
+    n_u = len(upas)
+    vezes = np.bincount((np.arange(replicas)[:, None] * n_u + sorteada).ravel(),
+                        minlength=replicas * n_u).reshape(replicas, n_u)
+
+    n_hu = n_h[estrato_u]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fator = np.where(n_hu > 1, vezes * (n_hu / (n_hu - 1)), 1.0)
+    return unidade, np.vstack([np.ones(n_u), fator])
+
+# ------------------------------
+# Somas por grupo e estimativas
+# ------------------------------
+def indicadores(s: dict) -> dict:
+    """Métrica do painel -> (numerador, denominador) por linha, com a semântica das views."""
+    out = {}
+    for metrica, col in MEDIAS.items():      # AVG(flag) ignorando NULL
+        x = s[col]
+        ok = ~np.isnan(x)
+        out[metrica] = (np.where(ok, x, 0.0), ok.astype("float64"))
+    # SUM((procurou = 1 AND internou = 1)::int) / SUM(procurou)
+    out["prop_internou_entre_buscou"] = (((s["procurou"] == 1) & (s["internou"] == 1)).astype("float64"),
+                                         np.nan_to_num(s["procurou"]))
+    return out
+
+def somar(chave: np.ndarray, n_grupos: int, unidade: np.ndarray, M: np.ndarray,
+          Bw: np.ndarray) -> np.ndarray:
+    """
+    Σ_i Bw[i, c] · M[r, unidade_i] por grupo -> (grupos, colunas de Bw, R+1).
+    As linhas viram células (grupo, unidade) e cada grupo é um produto de matrizes.
+    """
+    n_u = M.shape[1]
+    celulas, inv = np.unique(chave.astype(np.int64) * n_u + unidade, return_inverse=True)
+    inv = inv.ravel()
+    T = np.column_stack([np.bincount(inv, weights=Bw[:, c], minlength=len(celulas))
+                         for c in range(Bw.shape[1])])
+    grupo, u = celulas // n_u, celulas % n_u
+    limites = np.searchsorted(grupo, np.arange(n_grupos + 1))
+    out = np.zeros((n_grupos, Bw.shape[1], M.shape[0]))
+    for g in range(n_grupos):
+        a, b = limites[g], limites[g + 1]
+        if b > a:
+            out[g] = T[a:b].T @ M[:, u[a:b]].T
+    return out
+
+def estimar(num: np.ndarray, den: np.ndarray):
+    """Razão em cada réplica (última dimensão; 0 = principal) -> (estimativa, erro padrão)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        theta = np.where(den > 0, num / den, np.nan)
+        desvio = theta[..., 1:] - theta[..., :1]
+        validas = np.sum(~np.isnan(desvio), axis=-1)
+        var = np.where(validas > 0, np.nansum(desvio ** 2, axis=-1) / validas, np.nan)
+    return theta[..., 0], np.sqrt(var)
+
+def estimativas_mes(df: pd.DataFrame, ref: str, replicas: int = REPLICAS, semente: int = SEMENTE):
+    """Linhas de todos os painéis de um mês (formato do painel_offline) + descrição das réplicas."""
+    s = silver_arrays(df)
+    w = np.nan_to_num(_numero(df, PESO))
+    colunas_rep = sorted(c for c in df.columns if REPLICA_RE.match(c))
+    if colunas_rep:
+        unidade, M = replicas_arquivo(df, w, colunas_rep)
+        origem = f"{len(colunas_rep)} pesos replicados do arquivo"
+    else:
+        unidade, M = replicas_bootstrap(_numero(df, ESTRATO), _numero(df, UPA), replicas, semente)
+        origem = f"bootstrap Rao-Wu, {replicas} réplicas sobre {M.shape[1]:,} UPAs"
+
+    ind = indicadores(s)
+    # colunas: (num, den) de cada indicador + 1 (população estimada = Σ w)
+    Bw = np.column_stack([v for par in ind.values() for v in par] + [np.ones(len(df))]) * w[:, None]
+
+    partes = []
+    for grupo, chave_cols, _ in PAINEIS.values():
+        coluna = chave_cols[0] if chave_cols else None
+        chave, rotulos = _chave(s, coluna)
+        tot = somar(chave, len(rotulos), unidade, M, Bw)
+        m = {"n": np.bincount(chave, minlength=len(rotulos)), "populacao": tot[:, -1, 0]}
+        for j, metrica in enumerate(ind):
+            m[metrica], m[f"{metrica}_ep"] = estimar(tot[:, 2 * j], tot[:, 2 * j + 1])
+        presentes = m["n"] > 0
+        parte = pd.DataFrame({k: v[presentes] for k, v in m.items()})
+        parte.insert(0, "grupo", grupo)
+        parte.insert(1, "referencia", dt.date.fromisoformat(ref))
+        for col in ("uf", "faixa", "sexo", "escolaridade_grp"):
+            vazio = np.nan if col in ("uf", "sexo") else None
+            parte.insert(parte.columns.get_loc("n"), col,
+                         rotulos[presentes] if col == coluna else vazio)
+        partes.append(parte)
+    return pd.concat(partes, ignore_index=True), origem
+
+def calcular_estimativas(meses=None, data_dir: str = main.DATA_DIR, replicas: int = REPLICAS,
+                         semente: int = SEMENTE) -> pd.DataFrame:
+    """Resultado longo (uma linha por grupo de cada painel) a partir dos CSVs de data_dir."""
+    meses = None if meses is None else [str(m) for m in meses]
+    jobs = [(csv, main.month_of(t)) for csv, t in main.discover_jobs(data_dir)]
+    jobs = [(csv, ref) for csv, ref in jobs if ref and (meses is None or ref in meses)]
+    faltando = sorted(set(meses or []) - {ref for _, ref in jobs})
+    if faltando:
+        print(f"[estimativas] Sem CSV em {data_dir} para: {', '.join(faltando)}")
+
+    partes = []
+    for csv, ref in jobs:
+        t0 = time.perf_counter()
+        df = ler_mes(csv)
+        t1 = time.perf_counter()
+        parte, origem = estimativas_mes(df, ref, replicas, semente)
+        partes.append(parte)
+        print(f"[estimativas] {ref}: {len(df):,} linhas ({origem}) — leitura {t1-t0:.2f}s, "
+              f"estimação {time.perf_counter()-t1:.3f}s")
+    if not partes:
+        raise SystemExit(f"Nenhum CSV PNAD_COVID_MMYYYY.csv em {data_dir} para os meses pedidos.")
+    return pd.concat(partes, ignore_index=True)
+
+def split_estimativas(df: pd.DataFrame) -> dict:
+    """Separa o resultado longo por painel (mesmos nomes do paineis.py)."""
+    medidas = [c for c in df.columns if c == "n" or c == "populacao" or c.startswith("prop_")]
+    out = {}
+    for nome, (grupo, chave, _) in PAINEIS.items():
+        parte = df[df["grupo"] == grupo][["referencia"] + chave + medidas]
+        if nome == "sexo":
+            parte = parte.assign(sexo=parte["sexo"].map(SEXO_LABEL).fillna("Sem info"))
+        out[nome] = parte.sort_values(["referencia"] + chave).reset_index(drop=True)
+    return out
+
+def carregar_estimativas(meses, data_dir: str = main.DATA_DIR, replicas: int = REPLICAS) -> dict:
+    """Painéis ponderados (com prop_<x>_ep) no formato de paineis.carregar_paineis."""
+    return split_estimativas(calcular_estimativas(meses, data_dir, replicas))
+
+# ============================================================
+# CLI
+# ============================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Proporções ponderadas da PNAD COVID com erro padrão por réplicas")
+    parser.add_argument("--data-dir", default=main.DATA_DIR, help="pasta com os PNAD_COVID_MMYYYY.csv")
+    parser.add_argument("--meses", nargs="+", metavar="AAAA-MM-01",
+                        help="meses de referência (padrão: todos os CSVs encontrados)")
+    parser.add_argument("--replicas", type=int, default=REPLICAS,
+                        help="réplicas bootstrap quando o arquivo não traz pesos replicados")
+    parser.add_argument("--semente", type=int, default=SEMENTE, help="semente do bootstrap")
+    parser.add_argument("--saida", help="grava o resultado longo em Parquet (ou .csv)")
+    return parser.parse_args(argv)
+
+def run(argv=None):
+    args = parse_args(argv)
+    longo = calcular_estimativas(args.meses, args.data_dir, args.replicas, args.semente)
+    if args.saida:
+        if args.saida.endswith(".csv"):
+            longo.to_csv(args.saida, index=False)
+        else:
+            longo.to_parquet(args.saida, index=False)
+        print(f"[estimativas] Resultado salvo em {args.saida}")
+    for nome, df in split_estimativas(longo).items():
+        print(f"\n== {nome} ({len(df)} linhas)")
+        with pd.option_context("display.width", 200, "display.max_columns", None):
+            print(df.to_string(index=False, max_rows=20))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
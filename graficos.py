@@ -1,34 +1,50 @@
 # graficos.py — versão padronizada (azul + profissional)
 # ---------------------------------------------
 # Notas:
-# - Apenas LEITURA do banco.
+# - Apenas LEITURA do banco (ou dos CSVs, com --offline).
 # - Gráficos claros em % quando aplicável.
 # - “Bottom 10” -> “10 MENORES”; “Top 10” -> “10 MAIORES”.
+# - Cada figura é uma função independente (registro FIGURAS) renderizada
+#   em um pool de processos com backend Agg; pyplot/seaborn só são
+#   importados nos processos que desenham.
+#
+# Uso:
+#   python graficos.py                      # todas as figuras
+#   python graficos.py --figs A1 A3 S2      # só esses IDs
+#   python graficos.py --meses 2020-11      # só as figuras mensais de 2020-11
+#   python graficos.py --workers 1          # sem pool (sequencial)
+#   python graficos.py --list               # lista os IDs
+#   python graficos.py --force              # redesenha mesmo o que não mudou
+#   python graficos.py --offline            # painéis calculados dos CSVs (sem banco)
+#   python graficos.py --estimativas        # + figuras E* (ponderadas, IC 95%; lê os CSVs)
+#
+# Rebuild incremental: cada figura tem um hash (fatia de dados que ela usa
+# + código/estilo do desenho); se bate com figs/.manifest.json e o PNG
+# existe, a figura não é redesenhada.
 # ---------------------------------------------
 
 import os
+import sys
+import json
 import math
+import logging
+import time
+import hashlib
+import inspect
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import numpy as np
 import pandas as pd
 import matplotlib as mpl
-import matplotlib.pyplot as plt
-import seaborn as sns
-from matplotlib.cm import get_cmap
-from sqlalchemy import create_engine, text, inspect
-from dotenv import load_dotenv
+
+from paineis import carregar_paineis
 
 # ------------------------------
 # 0) Setup visual (tema azul)
 # ------------------------------
-sns.set_theme(style="whitegrid")
-plt.rcParams["figure.dpi"] = 120
-plt.rcParams["savefig.dpi"] = 120
-plt.rcParams["axes.titlesize"] = 11
-plt.rcParams["axes.labelsize"] = 10
-plt.rcParams["xtick.labelsize"] = 9
-plt.rcParams["ytick.labelsize"] = 9
-
-_CMAP = get_cmap("Blues")
+_CMAP = mpl.colormaps["Blues"]
 def blues_n(n):
     return [_CMAP(0.35 + 0.5*i/max(1, n-1)) for i in range(n)]
 
@@ -40,41 +56,47 @@ AZUL = {
     "grade": (0.1, 0.1, 0.1, .08)
 }
 
-mpl.rcParams["axes.edgecolor"] = "#1f2937"
-mpl.rcParams["grid.color"] = AZUL["grade"]
-mpl.rcParams["axes.prop_cycle"] = mpl.cycler(color=blues_n(6))
+plt = None   # pyplot, carregado por setup_visual() no processo que desenha
+
+def setup_visual():
+    """Backend não interativo + tema azul. Chamado uma vez por processo de render."""
+    global plt
+    if plt is not None:
+        return
+    mpl.use("Agg")
+    import matplotlib.pyplot as pyplot
+    import seaborn as sns
+    plt = pyplot
+
+    sns.set_theme(style="whitegrid")
+    plt.rcParams["figure.dpi"] = 120
+    plt.rcParams["savefig.dpi"] = 120
+    plt.rcParams["axes.titlesize"] = 11
+    plt.rcParams["axes.labelsize"] = 10
+    plt.rcParams["xtick.labelsize"] = 9
+    plt.rcParams["ytick.labelsize"] = 9
+
+    mpl.rcParams["axes.edgecolor"] = "#1f2937"
+    mpl.rcParams["grid.color"] = AZUL["grade"]
+    mpl.rcParams["axes.prop_cycle"] = mpl.cycler(color=blues_n(6))
 
 # ------------------------------
-# 1) Acesso ao banco (.env)
+# 1) Acesso ao banco
 # ------------------------------
-load_dotenv()
-DB_HOST = os.getenv("DB_HOST")
-DB_PORT = int(os.getenv("DB_PORT", "5432"))
-DB_NAME = os.getenv("DB_NAME", "bd_relacional")
-DB_USER = os.getenv("DB_USER", "postgres")
-DB_PASS = os.getenv("DB_PASS")
-
-def make_engine():
-    url = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=require"
-    return create_engine(url, pool_pre_ping=True)
-
-engine = make_engine()
+# Conexão e consultas ficam no paineis.py (engine só quando precisa
+# consultar; sem carga nova, os dados vêm do cache local em data/.cache).
 
 # ------------------------------
 # 2) Utilitários
 # ------------------------------
 OUT_DIR = "figs"
-os.makedirs(OUT_DIR, exist_ok=True)
 
-def savefig(name: str):
+def savefig(name: str) -> str:
     path = os.path.join(OUT_DIR, f"{name}.png")
     plt.tight_layout()
     plt.savefig(path, bbox_inches="tight")
-    print(f"[OK] Figura salva em: {path}")
-
-def df_sql(sql: str) -> pd.DataFrame:
-    with engine.begin() as conn:
-        return pd.read_sql(text(sql), conn)
+    plt.close()
+    return path
 
 UF_SIGLA = {
     11:"RO",12:"AC",13:"AM",14:"RR",15:"PA",16:"AP",17:"TO",
@@ -95,90 +117,28 @@ def uf_to_sigla(x):
 MESES_2020 = ("2020-05-01","2020-08-01","2020-11-01")
 
 # ---------------------------------------------------------
-# 3) Consultas base (usam as VIEWS criadas no 02_analytics.sql)
-# ---------------------------------------------------------
-SQL_MENSAL = f"""
-SELECT
-  referencia,
-  prop_falta_ar,
-  prop_dor_peito,
-  prop_algum_sintoma,
-  prop_plano_saude,
-  prop_60mais,
-  prop_internou_entre_buscou
-FROM public.pnad_covid_painel_mensal
-WHERE referencia IN (DATE '{MESES_2020[0]}', DATE '{MESES_2020[1]}', DATE '{MESES_2020[2]}')
-ORDER BY referencia;
-"""
-
-SQL_UF = f"""
-SELECT
-  referencia,
-  uf,
-  prop_falta_ar,
-  prop_algum_sintoma,
-  prop_internou_entre_buscou
-FROM public.pnad_covid_painel_uf
-WHERE referencia IN (DATE '{MESES_2020[0]}', DATE '{MESES_2020[1]}', DATE '{MESES_2020[2]}')
-ORDER BY referencia, uf;
-"""
-
-SQL_FAIXA = f"""
-SELECT
-  referencia,
-  faixa,
-  prop_falta_ar,
-  prop_dor_peito,
-  prop_internou_entre_buscou
-FROM public.pnad_covid_painel_faixa
-WHERE referencia IN (DATE '{MESES_2020[0]}', DATE '{MESES_2020[1]}', DATE '{MESES_2020[2]}')
-ORDER BY referencia, faixa;
-"""
-
-SQL_SEXO = f"""
-SELECT
-  referencia,
-  CASE
-    WHEN NULLIF(sexo::text,'')::int = 1 THEN 'Homem'
-    WHEN NULLIF(sexo::text,'')::int = 2 THEN 'Mulher'
-    ELSE 'Sem info'
-  END AS sexo,
-  AVG((tem_algum_sintoma = 1)::int)::float AS prop_algum_sintoma
-FROM public.pnad_covid_top20
-WHERE referencia IN (DATE '{MESES_2020[0]}', DATE '{MESES_2020[1]}', DATE '{MESES_2020[2]}')
-GROUP BY referencia, sexo
-ORDER BY referencia, sexo;
-"""
-
-SQL_ESCOLAR = f"""
-SELECT
-  referencia,
-  CASE
-    WHEN NULLIF(escolaridade::text,'')::int BETWEEN 1 AND 2 THEN 'Fundamental'
-    WHEN NULLIF(escolaridade::text,'')::int BETWEEN 3 AND 4 THEN 'Médio'
-    WHEN NULLIF(escolaridade::text,'')::int >= 5 THEN 'Superior+'
-    ELSE 'Sem info'
-  END AS escolaridade_grp,
-  AVG((plano_saude = 1)::int)::float   AS prop_plano,
-  AVG((procurou_servico = 1)::int)::float AS prop_buscou
-FROM public.pnad_covid_top20
-WHERE referencia IN (DATE '{MESES_2020[0]}', DATE '{MESES_2020[1]}', DATE '{MESES_2020[2]}')
-GROUP BY referencia, escolaridade_grp
-ORDER BY referencia, escolaridade_grp;
-"""
-
-# ---------------------------------------------------------
-# 4) Carregar dados
-# ---------------------------------------------------------
-df_mensal = df_sql(SQL_MENSAL)
-df_uf     = df_sql(SQL_UF)
-df_fx     = df_sql(SQL_FAIXA)
-df_sexo   = df_sql(SQL_SEXO)
-df_escol  = df_sql(SQL_ESCOLAR)
-
-for df in (df_mensal, df_uf, df_fx, df_sexo, df_escol):
-    df["ref_str"] = pd.to_datetime(df["referencia"]).dt.strftime("%Y-%m")
-df_uf["uf_sigla"] = df_uf["uf"].apply(uf_to_sigla)
+# 3) Consultas base: uma consulta só (views de painel) — ver paineis.py
+# 4) Carregar dados (cache local enquanto não houver carga nova)
+# ---------------------------------------------------------
+def carregar_dados(meses=MESES_2020, offline: bool = False, estimativas: bool = False) -> dict:
+    """
+    Painéis + colunas auxiliares (ref_str, uf_sigla) — compartilhados por todas as figuras.
+    Com `estimativas`, também os painéis ponderados (est_<painel>, com prop_<x>_ep).
+    """
+    if offline:
+        from painel_offline import carregar_paineis_offline  # import tardio: puxa o loader
+        dfs = carregar_paineis_offline(meses)
+    else:
+        dfs = carregar_paineis(meses)
+    if estimativas:
+        from estimativas import carregar_estimativas  # import tardio: lê os CSVs
+        dfs.update({f"est_{nome}": df for nome, df in carregar_estimativas(meses).items()})
+    for df in dfs.values():
+        df["ref_str"] = pd.to_datetime(df["referencia"]).dt.strftime("%Y-%m")
+    for nome in ("uf", "est_uf"):
+        if nome in dfs:
+            dfs[nome]["uf_sigla"] = dfs[nome]["uf"].apply(uf_to_sigla)
+    return dfs
 
 # ---------------------------------------------------------
 # 5) Funções de plot (azul)
@@ -206,139 +166,144 @@ def barras_rank(ax, df_rank, titulo, xlabel):
     ax.set_xlim(0, max(5.0, math.ceil(df_rank["pct"].max() / 5) * 5))
     ax.grid(True, axis="x", alpha=.3)
 
+def barras_agrupadas(tab, titulo, legenda):
+    plt.figure(figsize=(7.5,4.2)); ax = plt.gca()
+    cols = list(tab.columns); n = len(cols); colors = blues_n(n)
+    width = 0.8 / n; x = np.arange(len(tab.index))
+    for i, c in enumerate(cols):
+        vals = (tab[c]*100).values
+        ax.bar(x + i*width, vals, width=width, label=c, color=colors[i])
+        for xi, yi in zip(x + i*width, vals):
+            ax.text(xi, yi+0.2, f"{yi:.1f}%", ha="center", va="bottom", fontsize=8, color=AZUL["escuro"])
+    ax.set_xticks(x + width*(n-1)/2); ax.set_xticklabels(tab.index)
+    ax.set_title(titulo); ax.set_xlabel("Mês de referência (2020)")
+    ax.set_ylabel("% da amostra"); ax.legend(title=legenda); ax.grid(True, axis="y", alpha=.3)
+
+def linha_mes_ic(ax, x, y, ep, titulo, ylabel):
+    """Linha por mês com barra de erro = IC 95% (y e ep já em %)."""
+    ic = 1.96 * ep
+    ax.errorbar(x, y, yerr=ic, marker="o", linewidth=2.2, capsize=4,
+                color=AZUL["linha"], ecolor="#1f2937")
+    for xi, yi, ei in zip(x, y, ic):
+        ax.text(xi, yi + ei, f"{yi:.1f}%", ha="center", va="bottom", fontsize=8, color=AZUL["escuro"])
+    ax.set_title(titulo)
+    ax.set_xlabel("Mês de referência (2020)")
+    ax.set_ylabel(ylabel)
+    ax.set_ylim(0, max(5.0, math.ceil(max(y + ic) / 5) * 5))
+    ax.grid(True, alpha=.3)
+
+def pivot_mes(df, columns, values):
+    tab = df.pivot_table(index="ref_str", columns=columns, values=values, aggfunc="mean")
+    return tab.reindex(sorted(tab.index, key=lambda s: pd.to_datetime(s)))
+
 # ---------------------------------------------------------
 # 6) A1 – % com “Algum Sintoma” (linha)
 # ---------------------------------------------------------
-plt.figure(figsize=(7,4))
-y = to_pct(df_mensal["prop_algum_sintoma"])
-linha_mes(plt.gca(), df_mensal["ref_str"], y,
-          titulo="% de pessoas com ALGUM SINTOMA (amostra PNAD COVID-2020)",
-          ylabel="% da amostra")
-savefig("A1_algum_sintoma_mensal"); plt.close()
+def fig_a1(d, lab=None):
+    df_mensal = d["mensal"]
+    plt.figure(figsize=(7,4))
+    y = to_pct(df_mensal["prop_algum_sintoma"])
+    linha_mes(plt.gca(), df_mensal["ref_str"], y,
+              titulo="% de pessoas com ALGUM SINTOMA (amostra PNAD COVID-2020)",
+              ylabel="% da amostra")
+    return [savefig("A1_algum_sintoma_mensal")]
 
 # ---------------------------------------------------------
 # 7) A2 – % com Falta de Ar (linha)
 # ---------------------------------------------------------
-plt.figure(figsize=(7,4))
-y = to_pct(df_mensal["prop_falta_ar"])
-linha_mes(plt.gca(), df_mensal["ref_str"], y,
-          titulo="% com FALTA DE AR (sintoma chave) ao longo dos meses",
-          ylabel="% da amostra")
-savefig("A2_falta_ar_mensal"); plt.close()
+def fig_a2(d, lab=None):
+    df_mensal = d["mensal"]
+    plt.figure(figsize=(7,4))
+    y = to_pct(df_mensal["prop_falta_ar"])
+    linha_mes(plt.gca(), df_mensal["ref_str"], y,
+              titulo="% com FALTA DE AR (sintoma chave) ao longo dos meses",
+              ylabel="% da amostra")
+    return [savefig("A2_falta_ar_mensal")]
 
 # ---------------------------------------------------------
-# 8) A3 – Rankings por UF (10 MAIORES e 10 MENORES) para cada mês
+# 8) A3 – Rankings por UF (10 MAIORES e 10 MENORES) de um mês
 # ---------------------------------------------------------
-for ref in MESES_2020:
-    lab = pd.to_datetime(ref).strftime("%Y-%m")
+def fig_a3(d, lab):
+    df_uf = d["uf"]
     base = df_uf[df_uf["ref_str"] == lab].copy()
     base["pct"] = to_pct(base["prop_falta_ar"])
     base = base.dropna(subset=["pct"])
-    if base.empty: continue
+    if base.empty:
+        return []
 
     dez_maiores = base.nlargest(10, "pct").sort_values("pct", ascending=True)
     plt.figure(figsize=(7,4.5))
     barras_rank(plt.gca(), dez_maiores,
                 titulo=f"10 MAIORES UFs por % de FALTA DE AR — {lab}",
                 xlabel="% com falta de ar")
-    savefig(f"A3_10maiores_falta_ar_{lab}"); plt.close()
+    saved = [savefig(f"A3_10maiores_falta_ar_{lab}")]
 
     dez_menores = base.nsmallest(10, "pct").sort_values("pct", ascending=True)
     plt.figure(figsize=(7,4.5))
     barras_rank(plt.gca(), dez_menores,
                 titulo=f"10 MENORES UFs por % de FALTA DE AR — {lab}",
                 xlabel="% com falta de ar")
-    savefig(f"A3_10menores_falta_ar_{lab}"); plt.close()
+    saved.append(savefig(f"A3_10menores_falta_ar_{lab}"))
+    return saved
 
 # ---------------------------------------------------------
 # 9) B1 – Heatmap: Falta de Ar por Faixa Etária e Mês (Blues)
 # ---------------------------------------------------------
-ord_faixa = pd.CategoricalDtype(['<20','20-39','40-59','60+'], ordered=True)
-df_fx = df_fx[df_fx["faixa"].isin(ord_faixa.categories)].copy()
-df_fx["faixa"] = df_fx["faixa"].astype(ord_faixa)
-
-tab = df_fx.pivot_table(index="faixa", columns="ref_str",
-                        values="prop_falta_ar", aggfunc="mean")
-tab = tab.reindex(sorted(tab.columns, key=lambda s: pd.to_datetime(s)), axis=1)
-
-plt.figure(figsize=(6.4,4.2))
-sns.heatmap(tab * 100, annot=True, fmt=".1f", cmap="Blues")
-plt.title("% com FALTA DE AR por FAIXA ETÁRIA e mês")
-plt.xlabel("Mês de referência (2020)"); plt.ylabel("Faixa etária")
-savefig("B1_heatmap_falta_ar_faixa"); plt.close()
+def fig_b1(d, lab=None):
+    import seaborn as sns
+    ord_faixa = pd.CategoricalDtype(['<20','20-39','40-59','60+'], ordered=True)
+    df_fx = d["faixa"]
+    df_fx = df_fx[df_fx["faixa"].isin(ord_faixa.categories)].copy()
+    df_fx["faixa"] = df_fx["faixa"].astype(ord_faixa)
+
+    tab = df_fx.pivot_table(index="faixa", columns="ref_str",
+                            values="prop_falta_ar", aggfunc="mean", observed=False)
+    tab = tab.reindex(sorted(tab.columns, key=lambda s: pd.to_datetime(s)), axis=1)
+
+    plt.figure(figsize=(6.4,4.2))
+    sns.heatmap(tab * 100, annot=True, fmt=".1f", cmap="Blues")
+    plt.title("% com FALTA DE AR por FAIXA ETÁRIA e mês")
+    plt.xlabel("Mês de referência (2020)"); plt.ylabel("Faixa etária")
+    return [savefig("B1_heatmap_falta_ar_faixa")]
 
 # ---------------------------------------------------------
 # 10) B2 – % com “Algum Sintoma” por Sexo (barras agrupadas azuis)
 # ---------------------------------------------------------
-tab_sexo = df_sexo.pivot_table(index="ref_str", columns="sexo",
-                               values="prop_algum_sintoma", aggfunc="mean")
-tab_sexo = tab_sexo.reindex(sorted(tab_sexo.index, key=lambda s: pd.to_datetime(s)))
-
-plt.figure(figsize=(7.5,4.2)); ax = plt.gca()
-cols = list(tab_sexo.columns); n = len(cols); colors = blues_n(n)
-width = 0.8 / n; x = np.arange(len(tab_sexo.index))
-for i, c in enumerate(cols):
-    vals = (tab_sexo[c]*100).values
-    ax.bar(x + i*width, vals, width=width, label=c, color=colors[i])
-    for xi, yi in zip(x + i*width, vals):
-        ax.text(xi, yi+0.2, f"{yi:.1f}%", ha="center", va="bottom", fontsize=8, color=AZUL["escuro"])
-ax.set_xticks(x + width*(n-1)/2); ax.set_xticklabels(tab_sexo.index)
-ax.set_title("% com ALGUM SINTOMA por SEXO"); ax.set_xlabel("Mês de referência (2020)")
-ax.set_ylabel("% da amostra"); ax.legend(title="Sexo"); ax.grid(True, axis="y", alpha=.3)
-savefig("B2_algum_sintoma_sexo"); plt.close()
+def fig_b2(d, lab=None):
+    tab_sexo = pivot_mes(d["sexo"], "sexo", "prop_algum_sintoma")
+    barras_agrupadas(tab_sexo, "% com ALGUM SINTOMA por SEXO", "Sexo")
+    return [savefig("B2_algum_sintoma_sexo")]
 
 # ---------------------------------------------------------
 # 11) C1 – % com Plano de Saúde por Escolaridade (barras)
 # ---------------------------------------------------------
-tab_escola_plano = df_escol.pivot_table(index="ref_str", columns="escolaridade_grp",
-                                        values="prop_plano", aggfunc="mean")
-tab_escola_plano = tab_escola_plano.reindex(sorted(tab_escola_plano.index, key=lambda s: pd.to_datetime(s)))
-
-plt.figure(figsize=(7.5,4.2)); ax = plt.gca()
-cols = list(tab_escola_plano.columns); n = len(cols); colors = blues_n(n)
-width = 0.8 / n; x = np.arange(len(tab_escola_plano.index))
-for i, c in enumerate(cols):
-    vals = (tab_escola_plano[c]*100).values
-    ax.bar(x + i*width, vals, width=width, label=c, color=colors[i])
-    for xi, yi in zip(x + i*width, vals):
-        ax.text(xi, yi+0.2, f"{yi:.1f}%", ha="center", va="bottom", fontsize=8, color=AZUL["escuro"])
-ax.set_xticks(x + width*(n-1)/2); ax.set_xticklabels(tab_escola_plano.index)
-ax.set_title("% com PLANO DE SAÚDE por ESCOLARIDADE"); ax.set_xlabel("Mês de referência (2020)")
-ax.set_ylabel("% da amostra"); ax.legend(title="Escolaridade"); ax.grid(True, axis="y", alpha=.3)
-savefig("C1_plano_saude_escolaridade"); plt.close()
+def fig_c1(d, lab=None):
+    tab_escola_plano = pivot_mes(d["escolar"], "escolaridade_grp", "prop_plano")
+    barras_agrupadas(tab_escola_plano, "% com PLANO DE SAÚDE por ESCOLARIDADE", "Escolaridade")
+    return [savefig("C1_plano_saude_escolaridade")]
 
 # ---------------------------------------------------------
 # 12) C2 – % que Procurou Serviço por Escolaridade (barras)
 # ---------------------------------------------------------
-tab_escola_busca = df_escol.pivot_table(index="ref_str", columns="escolaridade_grp",
-                                        values="prop_buscou", aggfunc="mean")
-tab_escola_busca = tab_escola_busca.reindex(sorted(tab_escola_busca.index, key=lambda s: pd.to_datetime(s)))
-
-plt.figure(figsize=(7.5,4.2)); ax = plt.gca()
-cols = list(tab_escola_busca.columns); n = len(cols); colors = blues_n(n)
-width = 0.8 / n; x = np.arange(len(tab_escola_busca.index))
-for i, c in enumerate(cols):
-    vals = (tab_escola_busca[c]*100).values
-    ax.bar(x + i*width, vals, width=width, label=c, color=colors[i])
-    for xi, yi in zip(x + i*width, vals):
-        ax.text(xi, yi+0.2, f"{yi:.1f}%", ha="center", va="bottom", fontsize=8, color=AZUL["escuro"])
-ax.set_xticks(x + width*(n-1)/2); ax.set_xticklabels(tab_escola_busca.index)
-ax.set_title("% que PROCUROU SERVIÇO DE SAÚDE por ESCOLARIDADE"); ax.set_xlabel("Mês de referência (2020)")
-ax.set_ylabel("% da amostra"); ax.legend(title="Escolaridade"); ax.grid(True, axis="y", alpha=.3)
-savefig("C2_procurou_servico_escolaridade"); plt.close()
+def fig_c2(d, lab=None):
+    tab_escola_busca = pivot_mes(d["escolar"], "escolaridade_grp", "prop_buscou")
+    barras_agrupadas(tab_escola_busca, "% que PROCUROU SERVIÇO DE SAÚDE por ESCOLARIDADE", "Escolaridade")
+    return [savefig("C2_procurou_servico_escolaridade")]
 
 # ---------------------------------------------------------
 # 13) A4 – Taxa de internação entre quem buscou atendimento (linha)
 # ---------------------------------------------------------
-plt.figure(figsize=(7,4))
-y = to_pct(df_mensal["prop_internou_entre_buscou"].fillna(0))
-linha_mes(plt.gca(), df_mensal["ref_str"], y,
-          titulo="TAXA DE INTERNAÇÃO entre quem buscou atendimento",
-          ylabel="% entre os que buscaram")
-savefig("A4_taxa_internacao_entre_que_buscou"); plt.close()
+def fig_a4(d, lab=None):
+    df_mensal = d["mensal"]
+    plt.figure(figsize=(7,4))
+    y = to_pct(df_mensal["prop_internou_entre_buscou"].fillna(0))
+    linha_mes(plt.gca(), df_mensal["ref_str"], y,
+              titulo="TAXA DE INTERNAÇÃO entre quem buscou atendimento",
+              ylabel="% entre os que buscaram")
+    return [savefig("A4_taxa_internacao_entre_que_buscou")]
 
 # ---------------------------------------------------------
-# 14) S1 – CORRELAÇÃO entre indicadores por UF (por mês) — heatmap (Blues)
+# 14) S1 – CORRELAÇÃO entre indicadores por UF (do mês) — heatmap (Blues)
 # ---------------------------------------------------------
 indic_cols = ["prop_algum_sintoma", "prop_falta_ar", "prop_internou_entre_buscou"]
 indic_labels = {
@@ -346,16 +311,19 @@ indic_labels = {
     "prop_falta_ar": "% com FALTA DE AR",
     "prop_internou_entre_buscou": "% INTERNOU entre quem BUSCOU"
 }
-for lab, grupo in df_uf.groupby("ref_str"):
+def fig_s1(d, lab):
+    import seaborn as sns
+    grupo = d["uf"][d["uf"]["ref_str"] == lab]
     g = grupo[indic_cols].dropna()
-    if g.shape[0] < 3: continue
+    if g.shape[0] < 3:
+        return []
     corr_mat = g.corr(method="pearson").rename(index=indic_labels, columns=indic_labels)
     plt.figure(figsize=(6.4, 4.6))
     sns.heatmap(corr_mat, vmin=-1, vmax=1, center=0, cmap="Blues",
                 annot=True, fmt=".2f", cbar_kws={"label": "Correlação (Pearson)"})
     plt.title(f"Correlação entre indicadores por UF — {lab}")
     plt.xlabel("Indicadores"); plt.ylabel("Indicadores")
-    savefig(f"S1_correlacao_heatmap_{lab}"); plt.close()
+    return [savefig(f"S1_correlacao_heatmap_{lab}")]
 
 # ---------------------------------------------------------
 # 15) S2 – Dispersão: ALGUM SINTOMA × INTERNOU ENTRE QUEM BUSCOU (por UF)
@@ -365,9 +333,11 @@ def nice_axis_limit(series_pct):
     m = float(series_pct.max() if len(series_pct) else 0)
     return max(5.0, math.ceil(m / 5.0) * 5.0)
 
-for lab, grupo in df_uf.groupby("ref_str"):
+def fig_s2(d, lab):
+    grupo = d["uf"][d["uf"]["ref_str"] == lab]
     g = grupo.dropna(subset=["prop_algum_sintoma", "prop_internou_entre_buscou"]).copy()
-    if g.empty: continue
+    if g.empty:
+        return []
     g["pct_sintomas"] = (g["prop_algum_sintoma"] * 100).round(1)
     g["pct_internou_busca"] = (g["prop_internou_entre_buscou"] * 100).round(1)
 
@@ -388,7 +358,252 @@ for lab, grupo in df_uf.groupby("ref_str"):
     ax.set_xlim(0, nice_axis_limit(g["pct_sintomas"]))
     ax.set_ylim(0, nice_axis_limit(g["pct_internou_busca"]))
     ax.grid(True, alpha=.3)
-    savefig(f"S2_disp_sintoma_vs_internou_{lab}"); plt.close()
+    return [savefig(f"S2_disp_sintoma_vs_internou_{lab}")]
 
+# ---------------------------------------------------------
+# 16) E1 – % com “Algum Sintoma” ponderado (V1032) com IC 95% (linha)
+# ---------------------------------------------------------
+def fig_e1(d, lab=None):
+    df_mensal = d["est_mensal"]
+    plt.figure(figsize=(7,4))
+    linha_mes_ic(plt.gca(), df_mensal["ref_str"], to_pct(df_mensal["prop_algum_sintoma"]),
+                 df_mensal["prop_algum_sintoma_ep"] * 100,
+                 titulo="% com ALGUM SINTOMA — estimativa ponderada (V1032), IC 95%",
+                 ylabel="% da população")
+    return [savefig("E1_algum_sintoma_ponderado_mensal")]
 
-print("\nPronto! Gráficos salvos na pasta ./figs")
+# ---------------------------------------------------------
+# 17) E2 – Falta de Ar por UF ponderado com IC 95% (barras) de um mês
+# ---------------------------------------------------------
+def fig_e2(d, lab):
+    base = d["est_uf"][d["est_uf"]["ref_str"] == lab].dropna(subset=["prop_falta_ar"])
+    if base.empty:
+        return []
+    base = base.sort_values("prop_falta_ar")
+    pct, ic = base["prop_falta_ar"] * 100, base["prop_falta_ar_ep"].fillna(0) * 100 * 1.96
+    plt.figure(figsize=(7,6.5)); ax = plt.gca()
+    ax.barh(base["uf_sigla"], pct, xerr=ic, color=blues_n(len(base)),
+            error_kw={"ecolor": "#1f2937", "capsize": 2, "elinewidth": 1})
+    ax.set_title(f"% com FALTA DE AR por UF — ponderado (V1032), IC 95% — {lab}")
+    ax.set_xlabel("% da população com falta de ar")
+    ax.set_ylabel("UF")
+    ax.set_xlim(0, nice_axis_limit(pct + ic))
+    ax.grid(True, axis="x", alpha=.3)
+    return [savefig(f"E2_falta_ar_uf_ponderado_{lab}")]
+
+# ---------------------------------------------------------
+# 18) Registro das figuras: ID -> (uma por mês?, função, fatia de dados)
+# ---------------------------------------------------------
+def fatia(painel, *cols):
+    """Entrada de uma figura: colunas `cols` do painel (só o mês, se houver)."""
+    def entrada(d, lab):
+        df = d[painel]
+        if lab is not None:
+            df = df[df["ref_str"] == lab]
+        return df[list(cols)]
+    entrada.painel = painel
+    return entrada
+
+FIGURAS = {
+    "A1": (False, fig_a1, fatia("mensal", "ref_str", "prop_algum_sintoma")),
+    "A2": (False, fig_a2, fatia("mensal", "ref_str", "prop_falta_ar")),
+    "A3": (True,  fig_a3, fatia("uf", "uf_sigla", "prop_falta_ar")),
+    "B1": (False, fig_b1, fatia("faixa", "ref_str", "faixa", "prop_falta_ar")),
+    "B2": (False, fig_b2, fatia("sexo", "ref_str", "sexo", "prop_algum_sintoma")),
+    "C1": (False, fig_c1, fatia("escolar", "ref_str", "escolaridade_grp", "prop_plano")),
+    "C2": (False, fig_c2, fatia("escolar", "ref_str", "escolaridade_grp", "prop_buscou")),
+    "A4": (False, fig_a4, fatia("mensal", "ref_str", "prop_internou_entre_buscou")),
+    "S1": (True,  fig_s1, fatia("uf", *indic_cols)),
+    "S2": (True,  fig_s2, fatia("uf", "uf", "prop_algum_sintoma", "prop_internou_entre_buscou")),
+    "E1": (False, fig_e1, fatia("est_mensal", "ref_str", "prop_algum_sintoma", "prop_algum_sintoma_ep")),
+    "E2": (True,  fig_e2, fatia("est_uf", "uf_sigla", "prop_falta_ar", "prop_falta_ar_ep")),
+}
+
+def listar_tarefas(d, figs=None, meses=None):
+    """
+    Lista (ID, mês) a renderizar. --meses filtra as figuras mensais e, se
+    nenhuma figura foi pedida por ID, deixa de fora as que cobrem todos os meses.
+    """
+    explicitas = bool(figs)
+    figs = [f.upper() for f in figs] if figs else list(FIGURAS)
+    desconhecidas = [f for f in figs if f not in FIGURAS]
+    if desconhecidas:
+        raise SystemExit(f"figuras desconhecidas: {', '.join(desconhecidas)} (use --list)")
+    sem_dados = [f for f in figs if FIGURAS[f][2].painel not in d]   # E* sem --estimativas
+    if sem_dados and explicitas:
+        raise SystemExit(f"figuras {', '.join(sem_dados)} precisam de --estimativas")
+    figs = [f for f in figs if f not in sem_dados]
+    labs = sorted(d["uf"]["ref_str"].unique())
+    if meses:
+        labs = [lab for lab in labs if lab in meses]
+    tarefas = []
+    for fig_id in figs:
+        por_mes = FIGURAS[fig_id][0]
+        if por_mes:
+            tarefas += [(fig_id, lab) for lab in labs]
+        elif not meses or explicitas:
+            tarefas.append((fig_id, None))
+    return tarefas
+
+# ---------------------------------------------------------
+# 19) Rebuild incremental (hash de dados + estilo por figura)
+# ---------------------------------------------------------
+MANIFEST = os.path.join(OUT_DIR, ".manifest.json")
+
+# tudo que muda a aparência sem mudar os dados: helpers de desenho,
+# tema (setup_visual: dpi, fontes), paleta AZUL/blues_n e versões das libs
+_HELPERS_ESTILO = (setup_visual, savefig, to_pct, linha_mes, linha_mes_ic, barras_rank,
+                   barras_agrupadas, pivot_mes, nice_axis_limit, uf_to_sigla)
+
+def _versoes() -> str:
+    from importlib.metadata import version, PackageNotFoundError
+    out = []
+    for lib in ("matplotlib", "seaborn"):
+        try:
+            out.append(f"{lib}={version(lib)}")
+        except PackageNotFoundError:
+            out.append(f"{lib}=?")
+    return ",".join(out)
+
+def hash_estilo() -> str:
+    h = hashlib.sha256()
+    for func in _HELPERS_ESTILO:
+        h.update(inspect.getsource(func).encode("utf-8"))
+    h.update(repr(sorted(AZUL.items())).encode("utf-8"))
+    h.update(repr(blues_n(12)).encode("utf-8"))
+    h.update(repr(indic_labels).encode("utf-8"))
+    h.update(_versoes().encode("utf-8"))
+    return h.hexdigest()
+
+def hash_figura(d, fig_id, lab, estilo: str) -> str:
+    """Hash da fatia de dados da figura + código da função de desenho + estilo comum."""
+    _, func, entrada = FIGURAS[fig_id]
+    df = entrada(d, lab)
+    h = hashlib.sha256()
+    h.update(f"{fig_id}|{lab}|{estilo}|".encode("utf-8"))
+    h.update(inspect.getsource(func).encode("utf-8"))
+    h.update(repr(list(df.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+def _chave(fig_id, lab) -> str:
+    return fig_id if lab is None else f"{fig_id}|{lab}"
+
+def ler_manifest() -> dict:
+    try:
+        with open(MANIFEST, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def salvar_manifest(manifest: dict):
+    os.makedirs(OUT_DIR, exist_ok=True)
+    tmp = MANIFEST + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, MANIFEST)
+
+def separar_pendentes(d, tarefas, manifest: dict, force: bool = False):
+    """Divide as tarefas em (pendentes, puladas) e devolve também os hashes calculados."""
+    estilo = hash_estilo()
+    hashes, pendentes, puladas = {}, [], []
+    for fig_id, lab in tarefas:
+        hashes[(fig_id, lab)] = hash_figura(d, fig_id, lab, estilo)
+        anterior = manifest.get(_chave(fig_id, lab))
+        em_dia = (anterior is not None and anterior["hash"] == hashes[(fig_id, lab)]
+                  and all(os.path.isfile(p) for p in anterior["arquivos"]))
+        (puladas if em_dia and not force else pendentes).append((fig_id, lab))
+    return pendentes, puladas, hashes
+
+# ---------------------------------------------------------
+# 20) Render (processo atual ou pool)
+# ---------------------------------------------------------
+_DADOS = None
+
+def _init_worker(dados):
+    global _DADOS
+    _DADOS = dados
+    setup_visual()
+
+def _render(tarefa):
+    fig_id, lab = tarefa
+    t0 = time.perf_counter()
+    paths = FIGURAS[fig_id][1](_DADOS, lab)
+    return fig_id, lab, paths, time.perf_counter() - t0
+
+def renderizar(dados, tarefas, workers: int):
+    """Renderiza as tarefas e devolve [(ID, mês, arquivos, segundos)] na ordem pedida."""
+    if workers <= 1 or len(tarefas) <= 1:
+        _init_worker(dados)
+        return [_render(t) for t in tarefas]
+    ordem = {t: i for i, t in enumerate(tarefas)}
+    resultados = []
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(tarefas)), mp_context=ctx,
+                             initializer=_init_worker, initargs=(dados,)) as pool:
+        for fut in as_completed([pool.submit(_render, t) for t in tarefas]):
+            resultados.append(fut.result())
+    return sorted(resultados, key=lambda r: ordem[(r[0], r[1])])
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Gera as figuras da PNAD COVID em ./figs")
+    parser.add_argument("--figs", nargs="+", metavar="ID",
+                        help=f"IDs das figuras ({', '.join(FIGURAS)}); padrão: todas")
+    parser.add_argument("--meses", nargs="+", metavar="AAAA-MM",
+                        help="só as figuras mensais destes meses (ex.: 2020-05 2020-11)")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="processos de render (1 = sequencial)")
+    parser.add_argument("--list", action="store_true", help="lista os IDs e sai")
+    parser.add_argument("--force", action="store_true",
+                        help="redesenha todas as figuras, mesmo as que não mudaram")
+    parser.add_argument("--offline", action="store_true",
+                        help="calcula os painéis direto dos CSVs de data/ (sem banco)")
+    parser.add_argument("--estimativas", action="store_true",
+                        help="inclui as figuras E* (proporções ponderadas por V1032 com IC 95%%, "
+                             "calculadas dos CSVs de data/ — ver estimativas.py)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.list:
+        for fig_id, (por_mes, func, _) in FIGURAS.items():
+            print(f"{fig_id}  {'por mês ' if por_mes else 'geral   '} {func.__name__}")
+        return
+
+    t0 = time.perf_counter()
+    dados = carregar_dados(MESES_2020, offline=args.offline, estimativas=args.estimativas)
+    tarefas = listar_tarefas(dados, args.figs, args.meses)
+    t_dados = time.perf_counter() - t0
+    if not tarefas:
+        print("Nenhuma figura para os filtros informados.")
+        return
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    manifest = ler_manifest()
+    pendentes, puladas, hashes = separar_pendentes(dados, tarefas, manifest, force=args.force)
+
+    t1 = time.perf_counter()
+    resultados = renderizar(dados, pendentes, args.workers) if pendentes else []
+    t_render = time.perf_counter() - t1
+
+    for fig_id, lab, paths, secs in resultados:
+        nome = fig_id if lab is None else f"{fig_id} {lab}"
+        for path in paths or ["(sem dados)"]:
+            print(f"[OK] {nome:<11} {secs:6.2f}s  {path}")
+        manifest[_chave(fig_id, lab)] = {"hash": hashes[(fig_id, lab)], "arquivos": paths}
+    for fig_id, lab in puladas:
+        nome = fig_id if lab is None else f"{fig_id} {lab}"
+        print(f"[=]  {nome:<11}   sem mudança")
+    if resultados:
+        salvar_manifest(manifest)
+
+    total = sum(len(r[2]) for r in resultados)
+    processos = max(1, min(args.workers, len(pendentes))) if pendentes else 0
+    print(f"\nPronto! {len(pendentes)} figura(s) redesenhada(s) ({total} PNGs), "
+          f"{len(puladas)} sem mudança — dados {t_dados:.2f}s, render {t_render:.2f}s "
+          f"({processos} processo(s)). Saída em ./{OUT_DIR}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s",
+                        datefmt="%H:%M:%S")   # mensagens do paineis.py (cache x banco)
+    sys.exit(main())
@@ -3,23 +3,57 @@
 # ============================================================
 # Objetivo:
 # 1) Ler os CSVs originais
-# 2) Criar tabelas de staging (_new) no PostgreSQL
-# 3) Inserir dados usando COPY 
+# 2) Criar tabelas de staging (_new, UNLOGGED) no PostgreSQL
+# 3) Inserir dados usando COPY; depois índices + ANALYZE + SET LOGGED
+#    (--copy-connections N: chunks do mesmo arquivo em N conexões; commit das
+#    N juntas — no fim ou, com manifesto, a cada COPY_CHECKPOINT_CHUNKS. Não
+#    é atômico entre conexões: falha no meio deixa a staging sem staging_ok
+#    e a conferência de linhas do manifesto manda recarregar do zero)
 # 4) Promover staging -> oficial (swap) e manter backup (_old)
+# 5) Anexar cada mês como partição de pnad_covid_2020 (LIST por referencia)
+# 6) Montar a camada silver (flags tipadas) de cada mês em pnad_covid_2020_silver
+# 7) Gravar as estatísticas suficientes das correlações do mês (correlacoes.py)
+# 8) Montar o cubo de contagens do mês em pnad_covid_2020_cubo (consultas em cubo.py)
+# 9) --hot-cold: banco só com as colunas quentes; largura total em data/frio (zstd)
 # ============================================================
 
 import os
+import re
 import sys
+import csv
+import json
+import hashlib
 import time
 import logging
-from io import StringIO
+import queue
+import argparse
+import tempfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import StringIO, BytesIO
 
 import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import URL
-from sqlalchemy.types import Integer, BigInteger, Float, Text, Boolean, DateTime
+from sqlalchemy.types import SmallInteger, Integer, BigInteger, Float, Text, Boolean, DateTime
+
+import metricas
+from pgcopy import encode_pgcopy_buffer
+
+try:  # opcional: cache Parquet dos CSVs já parseados
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+try:  # lock dos caches JSON compartilhados pelos processos do --workers
+    import fcntl
+except ImportError:   # Windows: sem lock (use --workers 1)
+    fcntl = None
 
 # ============================================================
 # CONFIGURA LOG — mostra no terminal o que está acontecendo
@@ -36,12 +70,66 @@ log = logging.getLogger(__name__)
 # ============================================================
 CHUNK_SIZE = 200_000   # linhas por chunk ao carregar
 TRY_DAYFIRST_DATES = True
+STREAM_LOAD = False    # True = lê/limpa/tipa/copia chunk a chunk (memória constante)
+CSV_ENGINE = "c"       # "c" ou "pyarrow" (pyarrow só no modo não-streaming)
+SNIFF_BYTES = 64 * 1024  # amostra usada para detectar delimitador/encoding/cabeçalho
+SNIFF_ROWS = 10_000      # linhas lidas para fixar o dtype das colunas (cache no dialetos.json)
+PIPELINE = False       # True = serializa o chunk N+1 enquanto o chunk N está no COPY
+PIPELINE_DEPTH = 2     # nº máximo de chunks serializados esperando o COPY
+COPY_CONNECTIONS = 1   # >1 = chunks do MESMO arquivo em N conexões (COPY paralelo na staging)
+COPY_CHECKPOINT_CHUNKS = 8  # com manifesto: commit das N conexões + progresso a cada N chunks
+COPY_FORMAT = "csv"    # "csv" (StringIO) ou "binary" (PGCOPY direto dos arrays NumPy)
+TYPE_INFERENCE = "sample"  # "sample" = tipos por amostra (cache por layout); "full" = varre o arquivo
+INFER_SAMPLE_ROWS = 50_000 # linhas da amostra usada para decidir os tipos
+COMPACT_TYPES = False  # True = Int8/Int16/category em memória e SMALLINT na staging
+CATEGORY_MAX_DISTINCT = 256  # texto com até N valores distintos vira category
+PARQUET_CACHE = pq is not None  # grava/relê data/.cache/<csv>.parquet (precisa de pyarrow)
+HOT_COLD = False       # True = staging só com as colunas quentes; largura total no arquivo frio
+COLD_DIR = os.path.join("data", "frio")  # <tabela>.parquet com todas as colunas do mês
+COLD_COMPRESSION = "zstd"
+USE_MANIFEST = True    # pula CSV inalterado e retoma staging interrompida (pnad_load_manifest)
+MANIFEST_TABLE = "pnad_load_manifest"
+REFRESH_PANELS = True  # REFRESH das materialized views pnad_covid_* (02_analytics.sql) após o swap
+PARTITIONED_TABLE = "pnad_covid_2020"  # tabela-mãe particionada por referencia (LIST)
+SILVER_TABLE = "pnad_covid_2020_silver"  # mãe da camada silver (flags tipadas, 1 partição por mês)
+CUBE_TABLE = "pnad_covid_2020_cubo"  # mãe do cubo de contagens (1 partição por mês)
+METRICS_JSONL = None   # arquivo JSON lines com 1 registro por etapa (--metrics-jsonl)
+METRICS_PROM = None    # textfile do Prometheus, agregado por etapa/tabela (--metrics-prom)
+CORR_STATS = True  # N/S/P dos indicadores por mês em pnad_covid_corr_stats (correlacoes.py)
+STAGING_UNLOGGED = True  # staging UNLOGGED durante o COPY (sem WAL); vira LOGGED antes do swap
+# índices criados na staging DEPOIS da carga: sufixo -> colunas (nomes já limpos)
+STAGING_INDEXES = {
+    "uf": ["uf"],
+    "idade": ["a002"],
+}
+
+CACHE_DIR = os.path.join("data", ".cache")
+DIALECT_CACHE = os.path.join(CACHE_DIR, "dialetos.json")
+SCHEMA_CACHE = os.path.join(CACHE_DIR, "esquemas.json")
+LOAD_MARKER = os.path.join(CACHE_DIR, "ultima_carga.json")  # muda a cada swap (chave do paineis.py sem manifesto)
+
+# jobs descobertos pelo nome do arquivo: data/PNAD_COVID_MMYYYY.csv -> pnad_covid_MMYYYY
+DATA_DIR = "data"
+CSV_NAME_RE = re.compile(r"^PNAD_COVID_(\d{2})(\d{4})\.csv$", re.IGNORECASE)
+TABLE_MONTH_RE = re.compile(r"^pnad_covid_(\d{2})(\d{4})$")
 
-CSV_JOBS = [
-    ("data/PNAD_COVID_052020.csv", "pnad_covid_052020"),
-    ("data/PNAD_COVID_082020.csv", "pnad_covid_082020"),
-    ("data/PNAD_COVID_112020.csv", "pnad_covid_112020"),
-]
+def discover_jobs(data_dir: str = DATA_DIR):
+    """Lista (csv, tabela) de todos os meses encontrados em data_dir, em ordem cronológica."""
+    found = []
+    for name in os.listdir(data_dir) if os.path.isdir(data_dir) else []:
+        m = CSV_NAME_RE.match(name)
+        if m:
+            mm, yyyy = m.groups()
+            found.append(((int(yyyy), int(mm)), os.path.join(data_dir, name), f"pnad_covid_{mm}{yyyy}"))
+    return [(path, table) for _, path, table in sorted(found)]
+
+def month_of(final_table: str):
+    """'pnad_covid_052020' -> '2020-05-01' (None se a tabela não for mensal)."""
+    m = TABLE_MONTH_RE.match(final_table)
+    if m is None:
+        return None
+    mm, yyyy = m.groups()
+    return f"{yyyy}-{mm}-01"
 
 # ============================================================
 # CONEXÃO COM POSTGRES
@@ -53,9 +141,11 @@ DB_NAME = os.getenv("DB_NAME", "bd_relacional")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASS = os.getenv("DB_PASS")
 
-if not all([DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASS]):
-    log.error("❌ Faltam variáveis no .env (DB_HOST/DB_PORT/DB_NAME/DB_USER/DB_PASS).")
-    sys.exit(1)
+def check_db_env():
+    """Aborta se faltar alguma variável de conexão no .env."""
+    if not all([DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASS]):
+        log.error("❌ Faltam variáveis no .env (DB_HOST/DB_PORT/DB_NAME/DB_USER/DB_PASS).")
+        sys.exit(1)
 
 def make_engine(db_name: str):
     """Cria engine SQLAlchemy para conexão ao PostgreSQL."""
@@ -73,25 +163,185 @@ def make_engine(db_name: str):
 # ============================================================
 # FUNÇÕES AUXILIARES PARA LIMPEZA E TIPOS
 # ============================================================
-def clean_columns(df: pd.DataFrame) -> pd.DataFrame:
+def clean_column_names(columns) -> list:
     """Padroniza nomes de colunas para snake_case e sem caracteres especiais."""
     new_cols = []
-    for c in df.columns:
+    for c in columns:
         c2 = str(c).strip().lower()
         c2 = c2.replace(" ", "_").replace("-", "_").replace("/", "_")
         c2 = "".join(ch for ch in c2 if ch.isalnum() or ch == "_")
         if not c2:
             c2 = "coluna_sem_nome"
         new_cols.append(c2)
-    df.columns = new_cols
+    return new_cols
+
+def clean_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica clean_column_names nas colunas do DataFrame."""
+    df.columns = clean_column_names(df.columns)
     return df
 
-def smart_read_csv(path: str) -> pd.DataFrame:
-    """Tenta ler CSV com utf-8, se falhar tenta latin1."""
+# ============================================================
+# DETECÇÃO DE DIALETO (delimitador, encoding, cabeçalho)
+# ============================================================
+# Antes: pd.read_csv(sep=None, engine="python") com fallback para latin1
+# relendo o arquivo inteiro. Agora a detecção roda UMA vez sobre uma
+# amostra de bytes, fica em cache (data/.cache/dialetos.json) e a leitura
+# completa usa o parser C.
+def file_fingerprint(path: str) -> dict:
+    """Tamanho + mtime do arquivo (muda quando o CSV é substituído)."""
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def _load_json(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_json(path: str, data: dict):
+    """Grava num temporário exclusivo da chamada e troca de forma atômica."""
+    pasta = os.path.dirname(path)
+    os.makedirs(pasta, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=pasta, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+@contextmanager
+def _update_json(path: str):
+    """
+    Lê-modifica-grava o JSON sob flock em <path>.lock: com --workers vários
+    processos atualizam os mesmos caches e nenhuma entrada pode se perder.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)   # liberado ao fechar o arquivo
+        data = _load_json(path)
+        yield data
+        _save_json(path, data)
+
+def sniff_dialect(path: str) -> dict:
+    """Detecta delimitador, encoding e cabeçalho a partir dos primeiros SNIFF_BYTES."""
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_BYTES)
+    if len(sample) == SNIFF_BYTES and b"\n" in sample:
+        sample = sample[:sample.rfind(b"\n")]   # descarta a última linha incompleta
+
+    try:
+        sample_text = sample.decode("utf-8")
+        encoding = "utf-8"
+    except UnicodeDecodeError:
+        sample_text = sample.decode("latin1")
+        encoding = "latin1"
+
+    sniffer = csv.Sniffer()
+    try:
+        dialect = sniffer.sniff(sample_text, delimiters=",;\t|")
+        sep, quotechar = dialect.delimiter, dialect.quotechar
+    except csv.Error:
+        sep, quotechar = ",", '"'
+    try:
+        has_header = sniffer.has_header(sample_text)
+    except csv.Error:
+        has_header = True
+
+    return {"sep": sep, "quotechar": quotechar, "encoding": encoding,
+            "header": 0 if has_header else None}
+
+def get_dialect(path: str) -> dict:
+    """Dialeto do arquivo, detectado uma vez e reaproveitado enquanto o CSV não mudar."""
+    key = os.path.abspath(path)
+    cache = _load_json(DIALECT_CACHE)
+    entry = cache.get(key)
+    if entry and entry.get("fingerprint") == file_fingerprint(path):
+        log.info("Dialeto de %s (cache): %s", path, entry["dialeto"])
+        return entry["dialeto"]
+
+    dialect = sniff_dialect(path)
+    _remember_dialect(path, dialect)
+    log.info("Dialeto de %s detectado: %s", path, dialect)
+    return dialect
+
+def _remember_dialect(path: str, dialect: dict, dtypes: dict = None):
+    entry = {"fingerprint": file_fingerprint(path), "dialeto": dialect}
+    if dtypes is not None:
+        # lista de pares: com header=None as colunas são inteiros (chave JSON viraria texto)
+        entry["dtypes"] = [[col, dt] for col, dt in dtypes.items()]
+    with _update_json(DIALECT_CACHE) as cache:
+        cache[os.path.abspath(path)] = entry
+
+def read_csv_kwargs(dialect: dict) -> dict:
+    """Parâmetros do pd.read_csv para o dialeto detectado."""
+    return {"sep": dialect["sep"], "quotechar": dialect["quotechar"],
+            "encoding": dialect["encoding"], "header": dialect["header"]}
+
+def with_encoding_fallback(path: str, dialect: dict, reader):
+    """
+    Executa reader(dialect). Se aparecer byte inválido fora da amostra,
+    troca para latin1, grava no cache e tenta de novo (só acontece uma vez por arquivo).
+    """
     try:
-        return pd.read_csv(path, sep=None, engine="python", encoding="utf-8")
-    except Exception:
-        return pd.read_csv(path, sep=None, engine="python", encoding="latin1")
+        return reader(dialect)
+    except UnicodeDecodeError:
+        if dialect["encoding"] == "latin1":
+            raise
+        log.warning("%s: byte inválido em utf-8 fora da amostra, usando latin1.", path)
+        dialect = dict(dialect, encoding="latin1")
+        _remember_dialect(path, dialect)
+        return reader(dialect)
+
+def _is_text_dtype(dt: str) -> bool:
+    return pd.api.types.is_string_dtype(pd.api.types.pandas_dtype(dt))
+
+def sample_dtypes(path: str, dialect: dict) -> dict:
+    """
+    Dtype de cada coluna (texto, inteiro, float, bool) visto em SNIFF_ROWS
+    linhas lidas com o parser C: com tudo fixado o parser não infere nada no
+    arquivo inteiro. Fica no dialetos.json junto do dialeto — a amostra só é
+    relida quando o CSV (ou o dialeto) muda.
+    """
+    entry = _load_json(DIALECT_CACHE).get(os.path.abspath(path))
+    if (entry and "dtypes" in entry and entry.get("dialeto") == dialect
+            and entry.get("fingerprint") == file_fingerprint(path)):
+        return {col: dt for col, dt in entry["dtypes"]}
+
+    sample = pd.read_csv(path, engine="c", nrows=SNIFF_ROWS, **read_csv_kwargs(dialect))
+    dtypes = {col: str(sample[col].dtype) for col in sample.columns
+              if pd.api.types.is_string_dtype(sample[col].dtype)
+              or pd.api.types.is_numeric_dtype(sample[col].dtype)}
+    _remember_dialect(path, dialect, dtypes)
+    return dtypes
+
+def smart_read_csv(path: str) -> pd.DataFrame:
+    """Lê o CSV inteiro com o dialeto detectado e o parser C (ou pyarrow)."""
+    def read(dialect, dtype):
+        kwargs = read_csv_kwargs(dialect)
+        if CSV_ENGINE == "pyarrow":
+            return pd.read_csv(path, engine="pyarrow", dtype=dtype, **kwargs)
+        return pd.read_csv(path, engine="c", low_memory=False, dtype=dtype, **kwargs)
+
+    def reader(dialect):
+        dtype = sample_dtypes(path, dialect)
+        try:
+            return read(dialect, dtype)
+        except UnicodeDecodeError:
+            raise   # with_encoding_fallback troca o encoding
+        except (ValueError, TypeError, OverflowError) as exc:
+            # a amostra enganou (NA ou texto numa coluna numérica mais adiante):
+            # fixa só as colunas texto, como antes, e grava isso no cache
+            log.warning("%s: dtypes da amostra não valem no arquivo inteiro (%s); "
+                        "fixando só as colunas texto.", path, exc)
+            dtype = {col: dt for col, dt in dtype.items() if _is_text_dtype(dt)}
+            _remember_dialect(path, dialect, dtype)
+            return read(dialect, dtype)
+    return with_encoding_fallback(path, get_dialect(path), reader)
 
 def maybe_parse_datetimes(df: pd.DataFrame) -> pd.DataFrame:
     """Converte colunas texto em datetime se fizer sentido (mais de 70% parseável)."""
@@ -112,7 +362,9 @@ def infer_sqlalchemy_dtypes(df: pd.DataFrame):
     dtype_map = {}
     for col in df.columns:
         s = df[col]
-        if pd.api.types.is_integer_dtype(s):
+        if pd.api.types.is_integer_dtype(s) and s.dtype.itemsize <= 2:
+            dtype_map[col] = SmallInteger()
+        elif pd.api.types.is_integer_dtype(s):
             try:
                 max_abs = pd.to_numeric(s, errors="coerce").abs().max()
                 dtype_map[col] = BigInteger() if (pd.notna(max_abs) and max_abs > 2**31-1) else Integer()
@@ -128,44 +380,1088 @@ def infer_sqlalchemy_dtypes(df: pd.DataFrame):
             dtype_map[col] = Text()
     return dtype_map
 
+# ============================================================
+# MODO STREAMING — esquema do arquivo inteiro sem carregá-lo
+# ============================================================
+# O caminho padrão lê o CSV todo e só então decide os tipos. No modo
+# streaming com --infer full a carga é uma passada só (iter_csv_chunks_widening,
+# mais abaixo). Com --copy-connections > 1 ou --hot-cold os tipos precisam
+# estar fechados antes do primeiro COPY, então ficam as duas passadas:
+#   1) profile_csv: descobre o tipo final de cada coluna (mesmas regras
+#      do pandas no arquivo inteiro + regra dos 70% de datas)
+#   2) iter_csv_chunks: relê com dtype fixo, limpa e entrega chunk a chunk
+# Nos dois casos o pico de memória fica em ~1 chunk.
+SQL_TYPES_BY_KIND = {
+    "int8": SmallInteger,
+    "int16": SmallInteger,
+    "int32": Integer,
+    "int64": BigInteger,
+    "float": lambda: Float(asdecimal=False),
+    "bool": Boolean,
+    "datetime": DateTime,
+    "text": Text,
+    "category": Text,
+}
+READ_DTYPES_BY_KIND = {
+    "int8": "Int64",
+    "int16": "Int64",
+    "int32": "Int64",   # nullable: um NaN fora da amostra não quebra a leitura
+    "int64": "Int64",
+    "float": "float64",
+    "bool": "boolean",
+    "datetime": object,
+    "text": object,
+    "category": "category",
+}
+EMPTY_DTYPES_BY_KIND = {
+    "int8": "Int8",
+    "int16": "Int16",
+    "int32": "Int32",
+    "int64": "Int64",
+    "float": "float64",
+    "bool": "boolean",
+    "datetime": "datetime64[ns]",
+    "text": object,
+    "category": "category",
+}
+# faixa que cada tipo inteiro aceita (o parser não avisa overflow em dtypes menores)
+INT_RANGES = {
+    "int8": (-2**7, 2**7-1),
+    "int16": (-2**15, 2**15-1),
+    "int32": (-2**31, 2**31-1),
+}
+NULLABLE_INT_DTYPES = {"int8": "Int8", "int16": "Int16", "int32": "Int32"}
+
+class SchemaMismatch(ValueError):
+    """O CSV tem valores que não cabem no esquema (ex.: inferido só por amostra)."""
+
+def _series_kind(s: pd.Series) -> str:
+    """Classifica a coluna de um chunk do jeito que infer_sqlalchemy_dtypes faria."""
+    if pd.api.types.is_bool_dtype(s):
+        return "bool"
+    if pd.api.types.is_integer_dtype(s):
+        return "int"
+    if pd.api.types.is_float_dtype(s):
+        return "float"
+    return "text"
+
+def _merge_kind(a, b):
+    """Combina o tipo visto em chunks diferentes (int+float = float; resto vira texto)."""
+    if a is None or a == b:
+        return b
+    if {a, b} == {"int", "float"}:
+        return "float"
+    return "text"
+
+def _column_stats(s: pd.Series) -> dict:
+    """Faixa dos numéricos (e se são inteiros) ou valores distintos do texto — base do modo compacto."""
+    if pd.api.types.is_bool_dtype(s):
+        return {}
+    if pd.api.types.is_numeric_dtype(s):
+        valid = s.dropna()
+        if valid.empty:
+            return {"min": None, "max": None, "inteira": True}
+        inteira = bool(pd.api.types.is_integer_dtype(s) or (valid % 1 == 0).all())
+        return {"min": valid.min().item(), "max": valid.max().item(), "inteira": inteira}
+    distinct = s.dropna().unique()
+    if len(distinct) > CATEGORY_MAX_DISTINCT:
+        return {"distintos": None}
+    return {"distintos": sorted(map(str, distinct))}
+
+def _merge_stats(a: dict, b: dict) -> dict:
+    """Junta as estatísticas de dois chunks da mesma coluna."""
+    if a is None:
+        return b
+    if "distintos" in a and "distintos" in b:
+        if a["distintos"] is None or b["distintos"] is None:
+            return {"distintos": None}
+        merged = sorted(set(a["distintos"]) | set(b["distintos"]))
+        return {"distintos": merged if len(merged) <= CATEGORY_MAX_DISTINCT else None}
+    if "min" in a and "min" in b:
+        mins = [v for v in (a["min"], b["min"]) if v is not None]
+        maxs = [v for v in (a["max"], b["max"]) if v is not None]
+        return {"min": min(mins) if mins else None, "max": max(maxs) if maxs else None,
+                "inteira": a["inteira"] and b["inteira"]}
+    return {}
+
+def _narrow_int_kind(mn, mx) -> str:
+    for kind in ("int8", "int16", "int32"):
+        lo, hi = INT_RANGES[kind]
+        if lo <= mn and mx <= hi:
+            return kind
+    return "int64"
+
+def compact_schema(schema: dict) -> dict:
+    """
+    Modo compacto: usa as faixas do esquema para trocar inteiros (e floats
+    que só têm valores inteiros + NaN) por Int8/Int16 (SMALLINT na staging)
+    e texto de poucos valores por category (continua TEXT no banco).
+    """
+    tipos = dict(schema["tipos"])
+    for col, st in schema.get("stats", {}).items():
+        kind = tipos.get(col)
+        if "min" in st and st["min"] is not None and (
+                kind in ("int32", "int64") or (kind == "float" and st["inteira"])):
+            narrow = _narrow_int_kind(st["min"], st["max"])
+            if narrow != "int64":
+                tipos[col] = narrow
+        elif kind == "text" and st.get("distintos") is not None:
+            tipos[col] = "category"
+    return dict(schema, tipos=tipos)
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Equivalente de compact_schema para um DataFrame já carregado (caminho --infer full)."""
+    for col in df.columns:
+        kind = _series_kind(df[col])
+        st = _column_stats(df[col])
+        if kind in ("int", "float") and st.get("min") is not None and st["inteira"]:
+            narrow = _narrow_int_kind(st["min"], st["max"])
+            if narrow != "int64":
+                df[col] = df[col].astype(NULLABLE_INT_DTYPES[narrow])
+        elif kind == "text" and st.get("distintos") is not None \
+                and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].astype("category")
+    return df
+
+def memory_report(df: pd.DataFrame):
+    """(bytes atuais, bytes que o mesmo chunk ocuparia com int64/float64/object)."""
+    atual = int(df.memory_usage(deep=True, index=False).sum())
+    largo = 0
+    for col in df.columns:
+        s = df[col]
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            largo += int(s.astype(object).memory_usage(deep=True, index=False))
+        elif pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s):
+            largo += 8 * len(s)
+        else:
+            largo += int(s.memory_usage(deep=True, index=False))
+    return atual, largo
+
+def _read_csv_chunks(path: str, dialect: dict, dtype=None, skiprows=None):
+    return pd.read_csv(path, engine="c", dtype=dtype, chunksize=CHUNK_SIZE, skiprows=skiprows,
+                       **read_csv_kwargs(dialect))
+
+def profile_csv(path: str, with_stats: bool = False) -> dict:
+    """
+    Primeira passada do modo streaming: percorre o CSV em chunks e devolve
+    o esquema {"dialeto", "colunas", "tipos"} que o arquivo inteiro teria.
+    """
+    def reader(dialect):
+        kinds, max_abs, date_hits, stats, total = {}, {}, {}, {}, 0
+        for chunk in _read_csv_chunks(path, dialect):
+            total += len(chunk)
+            for col in chunk.columns:
+                s = chunk[col]
+                kinds[col] = _merge_kind(kinds.get(col), _series_kind(s))
+                if with_stats:
+                    stats[col] = _merge_stats(stats.get(col), _column_stats(s))
+                if pd.api.types.is_integer_dtype(s) and len(s):
+                    max_abs[col] = max(max_abs.get(col, 0), int(s.abs().max()))
+                elif TRY_DAYFIRST_DATES and s.dtype == object:
+                    try:
+                        parsed = pd.to_datetime(s, errors="coerce", dayfirst=True)
+                        date_hits[col] = date_hits.get(col, 0) + int(parsed.notna().sum())
+                    except Exception:
+                        pass
+        return dialect, kinds, max_abs, date_hits, stats, total
+
+    dialect, kinds, max_abs, date_hits, stats, total = with_encoding_fallback(
+        path, get_dialect(path), reader)
+
+    tipos = {}
+    for col, kind in kinds.items():
+        if kind == "int":
+            kind = "int64" if max_abs.get(col, 0) > 2**31-1 else "int32"
+        elif kind == "text" and total and date_hits.get(col, 0) / total > 0.7:
+            kind = "datetime"
+        tipos[col] = kind
+    return {"dialeto": dialect, "colunas": list(kinds), "tipos": tipos,
+            "stats": {col: st for col, st in stats.items() if st}}
+
+def schema_frame(schema: dict) -> pd.DataFrame:
+    """DataFrame vazio com nomes limpos e dtypes finais (para criar a staging)."""
+    data = {col: pd.Series(dtype=EMPTY_DTYPES_BY_KIND[schema["tipos"][col]])
+            for col in schema["colunas"]}
+    return clean_columns(pd.DataFrame(data))
+
+def schema_sql_dtypes(schema: dict) -> dict:
+    """Tipos SQLAlchemy da staging a partir do esquema (equivale a infer_sqlalchemy_dtypes)."""
+    names = clean_column_names(schema["colunas"])
+    return {name: SQL_TYPES_BY_KIND[schema["tipos"][col]]()
+            for name, col in zip(names, schema["colunas"])}
+
+def apply_schema(df: pd.DataFrame, schema: dict) -> pd.DataFrame:
+    """
+    Finaliza um chunk/DataFrame lido com o dtype do esquema: converte as
+    colunas de data numa passada só, confere a faixa dos inteiros e limpa nomes.
+    """
+    tipos = schema["tipos"]
+    date_cols = [col for col, kind in tipos.items() if kind == "datetime"]
+    if date_cols:
+        df[date_cols] = df[date_cols].apply(
+            lambda s: pd.to_datetime(s, errors="coerce", dayfirst=True))
+    for col, kind in tipos.items():
+        if kind in INT_RANGES and len(df):
+            lo, hi = INT_RANGES[kind]
+            mn, mx = df[col].min(), df[col].max()
+            if pd.notna(mn) and (mn < lo or mx > hi):
+                raise SchemaMismatch(f"coluna {col!r} fora da faixa de {kind} ({mn}..{mx})")
+            df[col] = df[col].astype(NULLABLE_INT_DTYPES[kind])
+    df.columns = clean_column_names(schema["colunas"])
+    df.replace([np.inf, -np.inf], np.nan, inplace=True)
+    return df
+
+def schema_read_dtypes(schema: dict) -> dict:
+    return {col: READ_DTYPES_BY_KIND[kind] for col, kind in schema["tipos"].items()}
+
+def iter_csv_chunks(path: str, schema: dict, start_row: int = 0):
+    """Segunda passada do modo streaming: chunks já limpos e com os tipos do esquema."""
+    skip = None
+    if start_row:
+        first = 1 if schema["dialeto"]["header"] == 0 else 0
+        skip = range(first, first + start_row)
+    reader = _read_csv_chunks(path, schema["dialeto"], dtype=schema_read_dtypes(schema), skiprows=skip)
+    while True:
+        try:
+            chunk = next(reader, None)
+        except UnicodeDecodeError as exc:
+            _remember_dialect(path, dict(schema["dialeto"], encoding="latin1"))
+            raise SchemaMismatch(f"encoding: {exc}") from exc
+        except (ValueError, TypeError, OverflowError) as exc:
+            raise SchemaMismatch(str(exc)) from exc
+        if chunk is None:
+            break
+        yield apply_schema(chunk, schema)
+
+# ------------------------------
+# Passada única (--stream --infer full)
+# ------------------------------
+# O esquema começa pela amostra (INFER_SAMPLE_ROWS linhas) e só ALARGA:
+# int8 < int16 < int32 < int64 < float < text (bool/data + outro = text).
+# O chunk que pede um tipo maior leva em chunk.attrs["alargar"] as colunas
+# a alterar; quem faz o COPY roda o ALTER (widen_staging) na mesma conexão,
+# logo antes do COPY desse chunk — e o ALTER reescreve o que já está na
+# staging. Diferença para as duas passadas: linhas anteriores de uma
+# coluna que vira texto ficam no formato do Postgres (05 -> 5, datas).
+KIND_RANK = {"int8": 0, "int16": 1, "int32": 2, "int64": 3, "float": 4}
+PG_TYPES_BY_KIND = {
+    "int8": "smallint",
+    "int16": "smallint",
+    "int32": "integer",
+    "int64": "bigint",
+    "float": "double precision",
+    "bool": "boolean",
+    "datetime": "timestamp without time zone",
+    "text": "text",
+    "category": "text",
+}
+KINDS_BY_PG_TYPE = {"smallint": "int16", "integer": "int32", "bigint": "int64",
+                    "double precision": "float", "boolean": "bool",
+                    "timestamp without time zone": "datetime", "text": "text"}
+
+def _chunk_kind(s: pd.Series, compact: bool) -> str:
+    """Menor tipo que a coluna deste chunk pede (regras de profile_csv + compact_schema)."""
+    if pd.api.types.is_bool_dtype(s):
+        return "bool"
+    if not pd.api.types.is_numeric_dtype(s):
+        return "text"
+    valid = s.dropna()
+    inteira = pd.api.types.is_integer_dtype(s) or (compact and len(valid) > 0 and (valid % 1 == 0).all())
+    if not inteira:
+        return "float"
+    if valid.empty:
+        return "int8" if compact else "int32"
+    mn, mx = valid.min(), valid.max()
+    if compact:
+        kind = _narrow_int_kind(mn, mx)
+        return "float" if kind == "int64" and not pd.api.types.is_integer_dtype(s) else kind
+    return "int64" if max(abs(mn), abs(mx)) > 2**31-1 else "int32"
+
+def _widen_kind(a: str, b: str) -> str:
+    if a == b:
+        return a
+    if a in KIND_RANK and b in KIND_RANK:
+        return a if KIND_RANK[a] >= KIND_RANK[b] else b
+    if {a, b} == {"category", "text"}:
+        return "category"
+    return "text"
+
+def iter_csv_chunks_widening(path: str, schema: dict, dtypes: dict, db_kinds: dict,
+                             start_row: int = 0, compact: bool = False):
+    """
+    Passada única do modo streaming: chunks limpos no esquema corrente, que
+    alarga quando um chunk pede. `dtypes` (tipos SQL por nome limpo) é
+    atualizado no lugar; `db_kinds` = tipo de cada coluna hoje na staging.
+    Byte inválido em utf-8 no meio do arquivo: continua do mesmo ponto em latin1.
+    """
+    tipos = schema["tipos"]
+    dialect = schema["dialeto"]
+    names = dict(zip(schema["colunas"], clean_column_names(schema["colunas"])))
+    pins = {raw: object for raw in read_header(path, dialect)
+            if tipos.get(str(raw)) in ("text", "category", "datetime")}
+    done, reader = start_row, None
+    while True:
+        if reader is None:
+            first = 1 if dialect["header"] == 0 else 0
+            skip = range(first, first + done) if done else None
+            reader = _read_csv_chunks(path, dialect, dtype=pins, skiprows=skip)
+        try:
+            chunk = next(reader, None)
+        except UnicodeDecodeError:
+            if dialect["encoding"] == "latin1":
+                raise
+            log.warning("%s: byte inválido em utf-8 depois da linha %d, seguindo em latin1.", path, done)
+            dialect = dict(dialect, encoding="latin1")
+            _remember_dialect(path, dialect)
+            reader = None
+            continue
+        if chunk is None:
+            return
+        chunk.columns = [str(c) for c in chunk.columns]
+
+        for col in chunk.columns:
+            atual = tipos[col]
+            if atual == "datetime":
+                s = chunk[col]
+                parsed = pd.to_datetime(s, errors="coerce", dayfirst=True)
+                novo = "datetime" if parsed.notna().sum() >= 0.7 * s.notna().sum() else "text"
+            else:
+                novo = _widen_kind(atual, _chunk_kind(chunk[col], compact))
+            if novo != atual:
+                log.info("%s: coluna %s alargada de %s para %s (linha %d).", path, col, atual, novo, done)
+                tipos[col] = novo
+                dtypes[names[col]] = SQL_TYPES_BY_KIND[novo]()
+            dt = READ_DTYPES_BY_KIND[tipos[col]]
+            if tipos[col] != "datetime" and chunk[col].dtype != dt:
+                chunk[col] = chunk[col].astype(dt)
+        done += len(chunk)
+
+        alargar = {}
+        for col, nome in names.items():
+            pg_type = PG_TYPES_BY_KIND[tipos[col]]
+            if pg_type != PG_TYPES_BY_KIND[db_kinds[nome]]:
+                alargar[nome] = pg_type
+                db_kinds[nome] = tipos[col]
+        chunk = apply_schema(chunk, dict(schema, dialeto=dialect, tipos=tipos))
+        if alargar:
+            chunk.attrs["alargar"] = alargar
+        yield chunk
+
+def widen_staging(conn, staging: str, alargar: dict):
+    """ALTER pedido pela passada única (chunk.attrs["alargar"]), antes do COPY do chunk."""
+    if alargar:
+        conn.execute(text(f'ALTER TABLE public."{staging}" ' + ", ".join(
+            f'ALTER COLUMN "{col}" TYPE {t} USING "{col}"::{t}' for col, t in alargar.items()) + ";"))
+        log.info("%s: staging alargada (%s).", staging,
+                 ", ".join(f"{col} {t}" for col, t in alargar.items()))
+
+def single_pass_schema(engine, path: str, staging: str, compact: bool, resume: bool):
+    """
+    Esquema inicial da passada única: amostra (compactada, se for o caso) e,
+    na retomada, nunca mais estreito que a staging que já existe.
+    Devolve (esquema, tipos hoje na staging por nome limpo).
+    """
+    schema = infer_schema_from_sample(path, get_dialect(path))
+    if compact:
+        schema = compact_schema(schema)
+    tipos = dict(schema["tipos"])
+    names = dict(zip(schema["colunas"], clean_column_names(schema["colunas"])))
+    if not resume:
+        return dict(schema, tipos=tipos), {names[c]: k for c, k in tipos.items()}
+    with engine.connect() as conn:
+        db_kinds = {col: KINDS_BY_PG_TYPE.get(t, "text") for col, t in _columns(conn, staging).items()}
+    for col, nome in names.items():
+        tipos[col] = _widen_kind(tipos[col], db_kinds.get(nome, tipos[col]))
+    return dict(schema, tipos=tipos), db_kinds
+
+def iter_frame_chunks(df: pd.DataFrame, start_row: int = 0):
+    """Fatia um DataFrame já carregado em pedaços de CHUNK_SIZE linhas."""
+    for start in range(start_row, len(df), CHUNK_SIZE):
+        yield df.iloc[start:start + CHUNK_SIZE]
+
+# ============================================================
+# INFERÊNCIA DE TIPOS POR AMOSTRA (esquema cacheado por layout)
+# ============================================================
+# Em vez de tentar pd.to_datetime em cada coluna texto inteira e depois
+# reescanear os inteiros (maybe_parse_datetimes + infer_sqlalchemy_dtypes),
+# decidimos o tipo de cada coluna com INFER_SAMPLE_ROWS linhas e lemos o
+# arquivo já com dtype explícito. O esquema fica em data/.cache/esquemas.json
+# indexado pelo layout (delimitador + cabeçalho): outro mês com as mesmas
+# colunas nem roda a inferência. Se algum valor não couber no esquema
+# (texto numa coluna numérica, inteiro grande demais...), a carga é refeita
+# com a inferência completa.
+def layout_key(dialect: dict, columns) -> str:
+    """Hash do layout do arquivo: delimitador + nomes das colunas."""
+    raw = dialect["sep"] + "\x1f" + "\x1f".join(map(str, columns))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def read_header(path: str, dialect: dict) -> list:
+    return list(pd.read_csv(path, engine="c", nrows=0, **read_csv_kwargs(dialect)).columns)
+
+def infer_schema_from_sample(path: str, dialect: dict) -> dict:
+    """Decide o tipo de cada coluna olhando só as primeiras INFER_SAMPLE_ROWS linhas."""
+    def reader(dialect):
+        return dialect, pd.read_csv(path, engine="c", nrows=INFER_SAMPLE_ROWS,
+                                    low_memory=False, **read_csv_kwargs(dialect))
+    dialect, sample = with_encoding_fallback(path, dialect, reader)
+
+    tipos, stats = {}, {}
+    for col in sample.columns:
+        s = sample[col]
+        kind = _series_kind(s)
+        if kind == "int":
+            max_abs = s.abs().max() if len(s) else 0
+            kind = "int64" if max_abs > 2**31-1 else "int32"
+        elif kind == "text" and TRY_DAYFIRST_DATES and s.dtype == object:
+            try:
+                parsed = pd.to_datetime(s, errors="coerce", dayfirst=True)
+                if parsed.notna().mean() > 0.7:
+                    kind = "datetime"
+            except Exception:
+                pass
+        tipos[str(col)] = kind
+        if kind != "datetime":
+            st = _column_stats(s)
+            if st:
+                stats[str(col)] = st
+    return {"dialeto": dialect, "colunas": [str(c) for c in sample.columns],
+            "tipos": tipos, "stats": stats}
+
+def get_schema(path: str) -> dict:
+    """Esquema do CSV: do cache (mesmo layout) ou inferido pela amostra."""
+    dialect = get_dialect(path)
+    header = read_header(path, dialect)
+    key = layout_key(dialect, header)
+    cached = _load_json(SCHEMA_CACHE).get(key)
+    if cached and cached.get("colunas") == header:
+        log.info("Esquema de %s (cache, layout %s).", path, key[:8])
+        return {"dialeto": dialect, "colunas": header, "tipos": cached["tipos"],
+                "stats": cached.get("stats", {})}
+
+    t0 = time.time()
+    schema = infer_schema_from_sample(path, dialect)
+    with _update_json(SCHEMA_CACHE) as cache:
+        cache[key] = {"colunas": schema["colunas"], "tipos": schema["tipos"], "stats": schema["stats"]}
+    log.info("Esquema de %s inferido por amostra em %.2fs (layout %s).", path, time.time()-t0, key[:8])
+    return schema
+
+def forget_schema(path: str):
+    """Remove do cache o esquema do layout deste CSV (ele não serviu)."""
+    dialect = get_dialect(path)
+    key = layout_key(dialect, read_header(path, dialect))
+    with _update_json(SCHEMA_CACHE) as cache:
+        cache.pop(key, None)
+
+def read_csv_with_schema(path: str, schema: dict) -> pd.DataFrame:
+    """Lê o CSV inteiro com os dtypes do esquema (parser C) e aplica as conversões."""
+    try:
+        df = pd.read_csv(path, engine="c", low_memory=False, dtype=schema_read_dtypes(schema),
+                         **read_csv_kwargs(schema["dialeto"]))
+    except UnicodeDecodeError as exc:
+        _remember_dialect(path, dict(schema["dialeto"], encoding="latin1"))
+        raise SchemaMismatch(f"encoding: {exc}") from exc
+    except (ValueError, TypeError, OverflowError) as exc:
+        raise SchemaMismatch(str(exc)) from exc
+    return apply_schema(df, schema)
+
 # ============================================================
 # CARGA USANDO COPY
 # ============================================================
-def copy_chunk(conn, df_chunk: pd.DataFrame, table_name: str):
+def serialize_chunk(df_chunk: pd.DataFrame, copy_format: str = COPY_FORMAT, sql_types=None):
     """
-    Usa COPY FROM STDIN para inserir chunk de dados de forma rápida.
-    - Converte o DataFrame para CSV em memória (StringIO)
-    - Usa NULL '' para representar valores nulos
+    Converte o chunk para o buffer do COPY:
+    - "csv": CSV em memória (StringIO), com NULL ''
+    - "binary": PGCOPY (BytesIO) a partir dos tipos SQL da staging;
+      se algum tipo não for suportado, cai para CSV neste chunk
     """
+    if copy_format == "binary":
+        try:
+            return encode_pgcopy_buffer(df_chunk, sql_types or {})
+        except (TypeError, ValueError) as exc:
+            log.warning("COPY binário indisponível (%s); usando CSV.", exc)
     buf = StringIO()
     df_chunk.to_csv(buf, index=False, header=False, sep=",", na_rep="")
     buf.seek(0)
+    return buf
 
-    cols = ",".join([f'"{c}"' for c in df_chunk.columns])
-    sql = f'COPY public."{table_name}" ({cols}) FROM STDIN WITH (FORMAT CSV, DELIMITER \',\', NULL \'\')'
+def copy_buffer(conn, buf, columns, table_name: str):
+    """Envia um buffer já pronto via COPY FROM STDIN (BytesIO = binário, StringIO = CSV)."""
+    cols = ",".join([f'"{c}"' for c in columns])
+    if isinstance(buf, BytesIO):
+        options = "FORMAT BINARY"
+    else:
+        options = "FORMAT CSV, DELIMITER \',\', NULL \'\'"
+    sql = f'COPY public."{table_name}" ({cols}) FROM STDIN WITH ({options})'
 
     raw = conn.connection
     with raw.cursor() as cur:
         cur.copy_expert(sql, buf)
 
-def load_csv_into_table(engine, csv_path: str, final_table: str):
-    """Fluxo de carga com staging + COPY + swap."""
-    if not os.path.isfile(csv_path):
-        log.error("CSV não encontrado: %s", csv_path)
+def copy_chunk(conn, df_chunk: pd.DataFrame, table_name: str,
+               copy_format: str = COPY_FORMAT, sql_types=None):
+    """
+    Usa COPY FROM STDIN para inserir chunk de dados de forma rápida.
+    - Converte o DataFrame para CSV em memória (StringIO) ou PGCOPY (BytesIO)
+    - Usa NULL '' para representar valores nulos no CSV
+    """
+    with metricas.etapa("serialize_chunk", table_name, linhas=len(df_chunk)) as m:
+        buf = serialize_chunk(df_chunk, copy_format, sql_types)
+        m["bytes"] = _buffer_size(buf)
+    with metricas.etapa("copy_buffer", table_name, linhas=len(df_chunk), nbytes=m["bytes"]):
+        copy_buffer(conn, buf, df_chunk.columns, table_name)
+
+def _buffer_size(buf) -> int:
+    """Tamanho do buffer do COPY (caracteres no CSV, bytes no binário), sem copiá-lo."""
+    size = buf.seek(0, 2)
+    buf.seek(0)
+    return size
+
+_END = object()
+_COMMIT = object()   # copy_chunks_parallel: checkpoint (commit + barreira)
+
+def copy_chunks_pipelined(conn, chunks, table_name: str, depth: int = PIPELINE_DEPTH,
+                          copy_format: str = COPY_FORMAT, sql_types=None,
+                          start_rows: int = 0, after_chunk=None) -> int:
+    """
+    Produtor/consumidor: uma thread lê+serializa os chunks e enfileira os
+    buffers (fila limitada a `depth`); a thread atual faz o COPY. Loga o
+    tempo ocupado de cada lado para mostrar quem é o gargalo.
+    """
+    q = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    busy = {"serializacao": 0.0, "copy": 0.0}
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
         return False
 
-    # 1) Lê CSV completo
-    df = smart_read_csv(csv_path)
-    df = clean_columns(df)
-    df = maybe_parse_datetimes(df)
-    df.replace([np.inf, -np.inf], np.nan, inplace=True)
+    def producer():
+        try:
+            it = iter(chunks)
+            while not stop.is_set():
+                t = time.perf_counter()
+                chunk = next(it, None)
+                if chunk is None:
+                    break
+                with metricas.etapa("serialize_chunk", table_name, linhas=len(chunk)) as m:
+                    buf = serialize_chunk(chunk, copy_format, sql_types)
+                    m["bytes"] = _buffer_size(buf)
+                busy["serializacao"] += time.perf_counter() - t
+                if not put((buf, list(chunk.columns), len(chunk), chunk.attrs.get("alargar"))):
+                    return
+            put(_END)
+        except BaseException as exc:
+            put(exc)
 
-    staging = f"{final_table}_new"
-    dtypes = infer_sqlalchemy_dtypes(df)
+    worker = threading.Thread(target=producer, name=f"serialize-{table_name}", daemon=True)
+    t0 = time.perf_counter()
+    worker.start()
+    inserted = 0
+    try:
+        while True:
+            item = q.get()
+            if item is _END:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            buf, columns, n, alargar = item
+            t = time.perf_counter()
+            widen_staging(conn, table_name, alargar)
+            with metricas.etapa("copy_buffer", table_name, linhas=n, nbytes=_buffer_size(buf)):
+                copy_buffer(conn, buf, columns, table_name)
+            inserted += n
+            if after_chunk:
+                after_chunk(start_rows + inserted)
+            busy["copy"] += time.perf_counter() - t
+            log.info("%s inseridas %d linhas", table_name, start_rows + inserted)
+    finally:
+        stop.set()
+        worker.join()
+
+    wall = time.perf_counter() - t0
+    gargalo = max(busy, key=busy.get)
+    log.info("Pipeline %s: %.1fs total | leitura+serialização ocupada %.1fs (%.0f%%) | "
+             "COPY ocupado %.1fs (%.0f%%) | gargalo: %s",
+             table_name, wall,
+             busy["serializacao"], 100 * busy["serializacao"] / max(wall, 1e-9),
+             busy["copy"], 100 * busy["copy"] / max(wall, 1e-9), gargalo)
+    return inserted
+
+def copy_chunks_parallel(engine, chunks, table_name: str, connections: int = COPY_CONNECTIONS,
+                         copy_format: str = COPY_FORMAT, sql_types=None, start_rows: int = 0,
+                         on_checkpoint=None, checkpoint_chunks: int = COPY_CHECKPOINT_CHUNKS) -> int:
+    """
+    COPY de um arquivo só em N conexões: a thread atual (coordenador) lê os
+    chunks e distribui por uma fila; cada worker tem conexão e transação
+    próprias, serializa e faz o COPY na MESMA staging (UNLOGGED aceita
+    COPYs concorrentes).
+
+    Sem `on_checkpoint`, o coordenador só confirma as N transações no fim.
+    Com `on_checkpoint(linhas, chunks)` (manifesto ligado), a cada
+    `checkpoint_chunks` chunks ele põe N marcas _COMMIT na fila: cada worker
+    confirma, abre outra transação e espera na barreira; com todos parados,
+    tudo o que foi enviado está confirmado e o progresso é registrado — a
+    carga retoma dali.
+
+    Não é atômico entre conexões (sem 2PC): se um commit falhar depois de
+    outros, ou o processo cair entre o commit e o registro do progresso, a
+    staging fica com linhas a mais que o manifesto. Ela nunca recebe
+    staging_ok, e o plan_load compara count(*) com linhas_ok e recarrega do
+    zero. Em erro, as transações abertas sofrem rollback e a exceção sobe.
+    """
+    q = queue.Queue(maxsize=connections * 2)
+    stop = threading.Event()
+    barrier = threading.Barrier(connections + 1)
+    errors = []
+    rows = [0] * connections
+    busy = [0.0] * connections
+    transactions = [None] * connections
+
+    def fail(exc):
+        errors.append(exc)
+        stop.set()
+        barrier.abort()   # libera quem está esperando um checkpoint
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(i, conn):
+        try:
+            while True:
+                try:
+                    item = q.get(timeout=0.5)
+                except queue.Empty:
+                    if stop.is_set():
+                        return
+                    continue
+                if item is _END or stop.is_set():   # outro worker falhou: descarta o que está na fila
+                    return
+                if item is _COMMIT:
+                    transactions[i].commit()
+                    transactions[i] = conn.begin()
+                    barrier.wait()   # não pega a marca de outro worker
+                    continue
+                t = time.perf_counter()
+                copy_chunk(conn, item, table_name, copy_format=copy_format, sql_types=sql_types)
+                busy[i] += time.perf_counter() - t
+                rows[i] += len(item)
+        except threading.BrokenBarrierError:
+            return   # a causa já está em errors
+        except BaseException as exc:
+            fail(exc)
+
+    def checkpoint(sent, n_chunks):
+        for _ in range(connections):
+            if not put(_COMMIT):
+                return False
+        barrier.wait()
+        on_checkpoint(start_rows + sent, n_chunks)
+        log.info("%s: checkpoint em %d linhas (%d chunks, %d conexões confirmadas)",
+                 table_name, start_rows + sent, n_chunks, connections)
+        return True
+
+    conns, threads = [], []
+    t0 = time.perf_counter()
+    sent = n_chunks = 0
+    try:
+        for i in range(connections):
+            conn = engine.connect()
+            conns.append(conn)
+            transactions[i] = conn.begin()
+            th = threading.Thread(target=worker, args=(i, conn), name=f"copy-{table_name}-{i}", daemon=True)
+            th.start()
+            threads.append(th)
+
+        for chunk in chunks:
+            if not put(chunk):
+                break
+            sent += len(chunk)
+            n_chunks += 1
+            log.info("%s enviadas %d linhas para %d conexões", table_name, start_rows + sent, connections)
+            if on_checkpoint and n_chunks % checkpoint_chunks == 0 and not checkpoint(sent, n_chunks):
+                break
+        for _ in threads:
+            put(_END)
+    except threading.BrokenBarrierError:
+        stop.set()   # um worker falhou durante o checkpoint
+    except BaseException as exc:   # erro lendo o arquivo (ex.: SchemaMismatch) ou abrindo conexão
+        fail(exc)
+    finally:
+        for th in threads:
+            th.join()
+
+    try:
+        open_trans = [t for t in transactions if t is not None]
+        if errors:
+            for trans in open_trans:
+                trans.rollback()
+            log.error("COPY paralelo em %s abortado (%d conexões, rollback do que não passou "
+                      "por checkpoint): %s", table_name, connections, errors[0])
+            raise errors[0]
+        committed = 0
+        try:
+            for trans in open_trans:
+                trans.commit()
+                committed += 1
+        except Exception:
+            for trans in open_trans[committed + 1:]:
+                trans.rollback()
+            if committed:
+                log.error("%s: commit falhou após %d/%d conexões; a staging ficou parcial e "
+                          "será recarregada do zero na próxima execução.",
+                          table_name, committed, connections)
+            raise
+        if on_checkpoint:
+            on_checkpoint(start_rows + sent, n_chunks)
+    finally:
+        for conn in conns:
+            conn.close()
+
+    wall = time.perf_counter() - t0
+    inserted = sum(rows)
+    log.info("COPY paralelo %s: %d linhas em %.1fs | %d conexões | linhas por conexão %s | "
+             "ocupação %s", table_name, inserted, wall, connections, rows,
+             " ".join(f"{100 * b / max(wall, 1e-9):.0f}%" for b in busy))
+    return inserted
 
-    # 2) Cria tabela staging vazia
+# ============================================================
+# CACHE PARQUET DOS CSVs PARSEADOS
+# ============================================================
+# Depois do primeiro parse, o DataFrame já limpo e tipado vai para
+# data/.cache/<arquivo>.csv.parquet (+ .json com o fingerprint do CSV e os
+# tipos SQL). As próximas cargas — e análises ad hoc via read_source_frame —
+# leem o Parquet com memory map e só as colunas pedidas. Se o CSV mudar
+# (tamanho/mtime) ou as opções de tipagem forem outras, o cache é ignorado
+# e regravado.
+SQL_TYPE_CLASSES = {cls.__name__: cls for cls in
+                    (SmallInteger, Integer, BigInteger, Float, Boolean, DateTime, Text)}
+
+def parquet_cache_path(csv_path: str) -> str:
+    return os.path.join(CACHE_DIR, os.path.basename(csv_path) + ".parquet")
+
+def _cache_opts(infer: str, compact: bool) -> dict:
+    return {"infer": infer, "compact": bool(compact)}
+
+def _sql_types_from_names(names: dict) -> dict:
+    return {col: (Float(asdecimal=False) if name == "Float" else SQL_TYPE_CLASSES[name]())
+            for col, name in names.items()}
+
+def _cache_meta(csv_path: str, cache_opts: dict):
+    """Metadados do cache se ele ainda vale para este CSV/opções; senão None."""
+    if pq is None:
+        return None
+    path = parquet_cache_path(csv_path)
+    meta = _load_json(path + ".json")
+    if (meta and os.path.isfile(path) and meta.get("fingerprint") == file_fingerprint(csv_path)
+            and meta.get("opcoes") == cache_opts):
+        return meta
+    return None
+
+def read_parquet_cache(csv_path: str, cache_opts: dict, columns=None):
+    """(DataFrame, tipos SQL) do cache, ou None se não houver cache válido."""
+    meta = _cache_meta(csv_path, cache_opts)
+    if meta is None:
+        return None
+    t0 = time.time()
+    table = pq.read_table(parquet_cache_path(csv_path), columns=columns, memory_map=True)
+    df = table.to_pandas()
+    sql_types = _sql_types_from_names({c: meta["tipos_sql"][c] for c in df.columns})
+    log.info("Cache Parquet de %s lido em %.3fs (%d colunas).", csv_path, time.time()-t0, df.shape[1])
+    return df, sql_types
+
+def iter_parquet_chunks(csv_path: str, start_row: int = 0):
+    """Lê o cache em lotes de CHUNK_SIZE linhas (modo streaming)."""
+    pf = pq.ParquetFile(parquet_cache_path(csv_path), memory_map=True)
+    lidas = 0   # os lotes quebram nos row groups: nem todos têm CHUNK_SIZE linhas
+    for batch in pf.iter_batches(batch_size=CHUNK_SIZE):
+        if lidas + batch.num_rows <= start_row:
+            lidas += batch.num_rows
+            continue
+        inicio = max(start_row - lidas, 0)
+        lidas += batch.num_rows
+        if inicio:
+            batch = batch.slice(inicio)
+        yield pa.Table.from_batches([batch]).to_pandas()
+
+def _write_cache_meta(csv_path: str, sql_types: dict, cache_opts: dict):
+    meta = {"fingerprint": file_fingerprint(csv_path), "opcoes": cache_opts,
+            "tipos_sql": {col: type(t).__name__ for col, t in sql_types.items()}}
+    _save_json(parquet_cache_path(csv_path) + ".json", meta)
+
+def write_parquet_cache(csv_path: str, df: pd.DataFrame, sql_types: dict, cache_opts: dict):
+    """Grava o DataFrame tipado no cache (falha aqui não derruba a carga)."""
+    if pq is None:
+        return
+    path = parquet_cache_path(csv_path)
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_parquet(f"{path}.tmp", engine="pyarrow", index=False)
+        os.replace(f"{path}.tmp", path)
+        _write_cache_meta(csv_path, sql_types, cache_opts)
+    except Exception as exc:
+        log.warning("Não foi possível gravar o cache Parquet de %s: %s", csv_path, exc)
+
+def tee_parquet_cache(chunks, csv_path: str, sql_types: dict, cache_opts: dict):
+    """
+    Repassa os chunks do modo streaming e grava cada um no cache em
+    sequência; o arquivo só é publicado se todos os chunks passarem.
+    """
+    path = parquet_cache_path(csv_path)
+    writer, schema = None, None
+    try:
+        for chunk in chunks:
+            try:
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    os.makedirs(CACHE_DIR, exist_ok=True)
+                    schema = table.schema
+                    writer = pq.ParquetWriter(f"{path}.tmp", schema)
+                writer.write_table(table.cast(schema))
+            except Exception as exc:
+                if writer is not None:
+                    writer.close()
+                    writer = None
+                log.warning("Cache Parquet de %s abandonado: %s", csv_path, exc)
+                yield from _passthrough(chunk, chunks)
+                return
+            yield chunk
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(f"{path}.tmp", path)
+            _write_cache_meta(csv_path, sql_types, cache_opts)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def _passthrough(first, rest):
+    yield first
+    yield from rest
+
+def read_source_frame(csv_path: str, columns=None, infer: str = TYPE_INFERENCE,
+                      compact: bool = COMPACT_TYPES) -> pd.DataFrame:
+    """
+    DataFrame limpo e tipado de um CSV de origem, para análises fora do
+    loader: usa o cache Parquet (só as `columns` pedidas) ou parseia e grava.
+    """
+    cache_opts = _cache_opts(infer, compact)
+    cached = read_parquet_cache(csv_path, cache_opts, columns=columns)
+    if cached is not None:
+        return cached[0]
+    if infer == "sample":
+        try:
+            schema = get_schema(csv_path)
+            if compact:
+                schema = compact_schema(schema)
+            df = read_csv_with_schema(csv_path, schema)
+            sql_types = schema_sql_dtypes(schema)
+        except SchemaMismatch:
+            forget_schema(csv_path)
+            return read_source_frame(csv_path, columns, infer="full", compact=compact)
+    else:
+        df = smart_read_csv(csv_path)
+        df = clean_columns(df)
+        df = maybe_parse_datetimes(df)
+        df.replace([np.inf, -np.inf], np.nan, inplace=True)
+        if compact:
+            df = compact_frame(df)
+        sql_types = infer_sqlalchemy_dtypes(df)
+    write_parquet_cache(csv_path, df, sql_types, cache_opts)
+    return df[columns] if columns is not None else df
+
+# ============================================================
+# CAMADA QUENTE + ARQUIVO FRIO (--hot-cold)
+# ============================================================
+# As views (pnad_covid_top20 e a silver, de onde saem os painéis) usam ~25
+# das ~150 colunas da PNAD, mas a partição do mês guarda todas — e toda
+# varredura arrasta as páginas das que ninguém lê. Com HOT_COLD a mesma
+# leitura gera duas saídas: a staging (logo, a partição) recebe só as
+# colunas quentes, derivadas das declarações da silver e dos índices, e a
+# largura total vai para COLD_DIR/<tabela>.parquet (zstd) para as análises
+# eventuais. Colunas frias que a mãe já tem ficam NULL no mês: o ADD COLUMN
+# do alinhamento não reescreve a tabela, então não ocupam espaço nas linhas.
+HOT_EXTRA_COLUMNS = []   # colunas que devem ficar no banco além das da silver/índices
+
+def hot_column_set() -> set:
+    cols = set(SILVER_CODES.values()) | set(SILVER_FLAGS.values()) | set(HOT_EXTRA_COLUMNS)
+    for columns in STAGING_INDEXES.values():
+        cols.update(columns)
+    return cols
+
+def hot_columns(columns) -> list:
+    """Colunas quentes presentes no arquivo, na ordem original."""
+    hot = hot_column_set()
+    return [c for c in columns if c in hot]
+
+def cold_archive_path(final_table: str) -> str:
+    return os.path.join(COLD_DIR, f"{final_table}.parquet")
+
+def tee_cold_archive(chunks, path: str):
+    """
+    Repassa os chunks gravando a largura total em Parquet (COLD_COMPRESSION).
+    Diferente do cache, erro aqui derruba a carga: é a única cópia das
+    colunas frias. O arquivo só é publicado se todos os chunks passarem.
+    """
+    if pq is None:
+        raise RuntimeError("--hot-cold precisa do pyarrow (arquivo frio em Parquet).")
+    writer, schema = None, None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                # coluna toda vazia no 1º chunk vira texto (senão o cast dos próximos falha)
+                schema = pa.schema([f.with_type(pa.string()) if pa.types.is_null(f.type) else f
+                                    for f in table.schema], metadata=table.schema.metadata)
+                writer = pq.ParquetWriter(f"{path}.tmp", schema, compression=COLD_COMPRESSION)
+            writer.write_table(table.cast(schema))
+            yield chunk
+        if writer is not None:
+            writer.close()
+            writer = None
+            os.replace(f"{path}.tmp", path)
+    finally:
+        if writer is not None:
+            writer.close()
+
+# ============================================================
+# MANIFESTO DE CARGA (pular inalterados / retomar do último chunk)
+# ============================================================
+# Uma linha por tabela oficial em public.pnad_load_manifest com o hash,
+# tamanho, mtime e nº de linhas do CSV de origem e quantos chunks da
+# staging já foram confirmados. Cada chunk é COPYado e registrado na MESMA
+# transação, então o manifesto nunca "mente" sobre o que está na staging.
+# status: carregando -> staging_ok -> ok (após o swap)
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def _table_exists(conn, table: str) -> bool:
+    return conn.execute(text("SELECT to_regclass(:t) IS NOT NULL"),
+                        {"t": f'public."{table}"'}).scalar()
+
+def ensure_manifest(engine):
+    """Cria a tabela de controle, se ainda não existir."""
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS public.{MANIFEST_TABLE} (
+              tabela        text PRIMARY KEY,
+              arquivo       text NOT NULL,
+              sha256        text NOT NULL,
+              tamanho       bigint NOT NULL,
+              mtime_ns      bigint NOT NULL,
+              opcoes        text NOT NULL,
+              chunk_size    integer NOT NULL,
+              chunks_ok     integer NOT NULL DEFAULT 0,
+              linhas_ok     bigint NOT NULL DEFAULT 0,
+              linhas        bigint,
+              status        text NOT NULL,
+              atualizado_em timestamptz NOT NULL DEFAULT now()
+            )"""))
+
+def manifest_get(conn, final_table: str):
+    row = conn.execute(text(f"SELECT * FROM public.{MANIFEST_TABLE} WHERE tabela = :t"),
+                       {"t": final_table}).mappings().first()
+    return dict(row) if row else None
+
+def _manifest_opts(opts: dict) -> str:
+    """Opções que mudam o conteúdo/tipos da staging (retomar exige as mesmas)."""
+    keys = ("infer", "compact", "stream")
+    out = {k: opts.get(k) for k in keys}
+    if opts.get("hot_cold"):   # só quando ligado: manifestos antigos continuam retomáveis
+        out["hot_cold"] = True
+    return json.dumps(out, sort_keys=True)
+
+def plan_load(engine, csv_path: str, final_table: str, opts: dict, force: bool = False) -> dict:
+    """
+    Decide o que fazer com o CSV:
+    - "pular":    mesmo arquivo já está na tabela oficial (tamanho+mtime iguais = O(1))
+    - "swap":     staging completa do mesmo arquivo esperando o swap
+    - "retomar":  staging interrompida do mesmo arquivo — continua do último chunk
+    - "carregar": carga do zero
+    """
+    fp = file_fingerprint(csv_path)
+    plan = {"acao": "carregar", "arquivo": csv_path, "tamanho": fp["size"],
+            "mtime_ns": fp["mtime_ns"], "opcoes": _manifest_opts(opts),
+            "linhas_ok": 0, "chunks_ok": 0}
+    with engine.connect() as conn:
+        entry = None if force else manifest_get(conn, final_table)
+        final_exists = _table_exists(conn, final_table)
+        staging_exists = _table_exists(conn, f"{final_table}_new")
+
+    same_stat = bool(entry) and entry["tamanho"] == fp["size"] and entry["mtime_ns"] == fp["mtime_ns"]
+    if same_stat and entry["status"] == "ok" and final_exists:
+        plan.update(acao="pular", sha256=entry["sha256"])
+        return plan
+
+    plan["sha256"] = entry["sha256"] if same_stat else file_sha256(csv_path)
+    if not entry or entry["sha256"] != plan["sha256"]:
+        return plan
+
+    if entry["status"] == "ok" and final_exists:
+        plan["acao"] = "pular"
+        with engine.begin() as conn:   # arquivo só foi "tocado": atualiza mtime p/ próxima vez ser O(1)
+            conn.execute(text(f"UPDATE public.{MANIFEST_TABLE} SET mtime_ns = :m, atualizado_em = now() "
+                              "WHERE tabela = :t"), {"m": fp["mtime_ns"], "t": final_table})
+    elif entry["status"] == "staging_ok" and staging_exists:
+        plan["acao"] = "swap"
+    elif (entry["status"] == "carregando" and staging_exists and entry["chunks_ok"] > 0
+          and entry["chunk_size"] == CHUNK_SIZE and entry["opcoes"] == plan["opcoes"]):
+        # staging UNLOGGED é esvaziada pelo Postgres na recuperação de um crash:
+        # só retoma se ela ainda tem exatamente as linhas que o manifesto registrou
+        with engine.connect() as conn:
+            linhas = conn.execute(text(f'SELECT count(*) FROM public."{final_table}_new"')).scalar()
+        if linhas == entry["linhas_ok"]:
+            plan.update(acao="retomar", linhas_ok=entry["linhas_ok"], chunks_ok=entry["chunks_ok"])
+        else:
+            log.warning("%s_new tem %d linhas, o manifesto registra %d (staging UNLOGGED "
+                        "esvaziada por crash?): carga do zero.", final_table, linhas, entry["linhas_ok"])
+    return plan
+
+def manifest_begin(engine, final_table: str, plan: dict):
+    """Registra o início de uma staging nova (zera o progresso)."""
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            INSERT INTO public.{MANIFEST_TABLE}
+              (tabela, arquivo, sha256, tamanho, mtime_ns, opcoes, chunk_size, chunks_ok, linhas_ok, linhas, status)
+            VALUES (:t, :arquivo, :sha256, :tamanho, :mtime_ns, :opcoes, :cs, 0, 0, NULL, 'carregando')
+            ON CONFLICT (tabela) DO UPDATE SET
+              arquivo = EXCLUDED.arquivo, sha256 = EXCLUDED.sha256, tamanho = EXCLUDED.tamanho,
+              mtime_ns = EXCLUDED.mtime_ns, opcoes = EXCLUDED.opcoes, chunk_size = EXCLUDED.chunk_size,
+              chunks_ok = 0, linhas_ok = 0, linhas = NULL, status = 'carregando', atualizado_em = now()
+        """), {"t": final_table, "cs": CHUNK_SIZE, **{k: plan[k] for k in
+               ("arquivo", "sha256", "tamanho", "mtime_ns", "opcoes")}})
+
+def manifest_progress(conn, final_table: str, linhas_ok: int, chunks_ok: int):
+    """Chamado na mesma transação do COPY do chunk."""
+    conn.execute(text(f"UPDATE public.{MANIFEST_TABLE} SET linhas_ok = :l, chunks_ok = :c, "
+                      "atualizado_em = now() WHERE tabela = :t"),
+                 {"l": linhas_ok, "c": chunks_ok, "t": final_table})
+
+def manifest_staged(engine, final_table: str, linhas: int):
     with engine.begin() as conn:
-        df.iloc[0:0].to_sql(
+        conn.execute(text(f"UPDATE public.{MANIFEST_TABLE} SET linhas = :l, status = 'staging_ok', "
+                          "atualizado_em = now() WHERE tabela = :t"), {"l": linhas, "t": final_table})
+
+def create_staging(engine, staging: str, df_empty: pd.DataFrame, dtypes: dict,
+                   unlogged: bool = STAGING_UNLOGGED):
+    """Cria (ou recria) a tabela staging vazia com os tipos informados (UNLOGGED por padrão)."""
+    with engine.begin() as conn:
+        df_empty.to_sql(
             name=staging,
             con=conn,
             schema="public",
@@ -173,42 +1469,915 @@ def load_csv_into_table(engine, csv_path: str, final_table: str):
             index=False,
             dtype=dtypes
         )
+        if unlogged:   # tabela vazia: a troca é instantânea
+            conn.execute(text(f'ALTER TABLE public."{staging}" SET UNLOGGED;'))
+
+def _index_name(table: str, suffix: str) -> str:
+    return f"{table}_{suffix}_idx"
+
+def finalize_staging(engine, final_table: str):
+    """
+    Depois do COPY: cria os índices declarados, roda ANALYZE e passa a staging
+    para LOGGED — tudo antes do swap, para a tabela já entrar com estatísticas
+    e índices. Loga a duração de cada fase.
+    """
+    staging = f"{final_table}_new"
+    ref = month_of(final_table)
+    if ref is not None:
+        t0 = time.time()
+        with engine.begin() as conn:
+            prepare_partition(conn, staging, ref)
+        log.info("⏱️  %s pronta para partição %s em %.2fs", staging, ref, time.time()-t0)
+
+    with engine.connect() as conn:
+        cols = {r[0] for r in conn.execute(text(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = 'public' AND table_name = :t"), {"t": staging})}
+        persistence = conn.execute(text(
+            "SELECT relpersistence FROM pg_class WHERE oid = to_regclass(:t)"),
+            {"t": f'public."{staging}"'}).scalar()
+
+    t0 = time.time()
+    built = []
+    for suffix, columns in STAGING_INDEXES.items():
+        missing = [c for c in columns if c not in cols]
+        if missing:
+            log.warning("%s: índice %s ignorado (sem a(s) coluna(s) %s).", staging, suffix, ", ".join(missing))
+            continue
+        collist = ", ".join(f'"{c}"' for c in columns)
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP INDEX IF EXISTS public."{_index_name(staging, suffix)}";'))
+            conn.execute(text(f'CREATE INDEX "{_index_name(staging, suffix)}" '
+                              f'ON public."{staging}" ({collist});'))
+        built.append(suffix)
+    log.info("⏱️  %s índices (%s) em %.2fs", staging, ", ".join(built) or "nenhum", time.time()-t0)
 
-    # 3) Insere em chunks com COPY
-    inserted = 0
     t0 = time.time()
     with engine.begin() as conn:
-        for start in range(0, len(df), CHUNK_SIZE):
-            end = min(start + CHUNK_SIZE, len(df))
-            chunk = df.iloc[start:end]
-            copy_chunk(conn, chunk, staging)
-            inserted += len(chunk)
-            log.info("%s inseridas %d linhas", staging, inserted)
+        conn.execute(text(f'ANALYZE public."{staging}";'))
+    log.info("⏱️  %s ANALYZE em %.2fs", staging, time.time()-t0)
 
-    log.info("Staging %s concluída (%d linhas em %.1fs).", staging, inserted, time.time()-t0)
+    if persistence == "u":
+        t0 = time.time()
+        with engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE public."{staging}" SET LOGGED;'))
+        log.info("⏱️  %s SET LOGGED em %.2fs", staging, time.time()-t0)
+
+    # 5) Camada silver do mês (flags tipadas), a partir da staging já pronta
+    if ref is not None:
+        t0 = time.time()
+        build_silver(engine, final_table, ref, unlogged=persistence == "u")
+        log.info("⏱️  %s_new (silver) em %.2fs", silver_table(final_table), time.time()-t0)
+
+    # 6) Estatísticas das correlações do mês (pendentes até o swap)
+    if ref is not None and CORR_STATS:
+        import correlacoes  # import tardio: só a carga mensal precisa
+        t0 = time.time()
+        with engine.begin() as conn:
+            correlacoes.gravar_pendente(conn, f"{silver_table(final_table)}_new", ref)
+        log.info("⏱️  %s estatísticas de correlação em %.2fs", staging, time.time()-t0)
+
+    # 7) Cubo de contagens do mês, a partir da silver _new
+    if ref is not None:
+        t0 = time.time()
+        cells = build_cube(engine, final_table, ref)
+        log.info("⏱️  %s_new (cubo, %d células) em %.2fs", cube_table(final_table), cells, time.time()-t0)
+
+def _promote(conn, staging: str, final_table: str, index_suffixes=(), parent=None, ref=None):
+    """staging -> final, final -> _old (índices junto); com parent, troca também a partição."""
+    if parent is not None:   # tira o mês atual da tabela-mãe antes do rename
+        reconcile_partition_columns(conn, staging, parent)
+        detach_partition(conn, final_table, parent)
+    conn.execute(text(f'DROP TABLE IF EXISTS public."{final_table}_old" CASCADE;'))
+    conn.execute(text(f'ALTER TABLE IF EXISTS public."{final_table}" RENAME TO "{final_table}_old";'))
+    conn.execute(text(f'ALTER TABLE public."{staging}" RENAME TO "{final_table}";'))
+    # índices seguem o nome da tabela: final -> _old, _new -> final
+    for suffix in index_suffixes:
+        conn.execute(text(f'ALTER INDEX IF EXISTS public."{_index_name(final_table, suffix)}" '
+                          f'RENAME TO "{_index_name(final_table + "_old", suffix)}";'))
+        conn.execute(text(f'ALTER INDEX IF EXISTS public."{_index_name(staging, suffix)}" '
+                          f'RENAME TO "{_index_name(final_table, suffix)}";'))
+    if parent is not None:
+        conn.execute(text(f'ALTER TABLE public."{parent}" ATTACH PARTITION '
+                          f'public."{final_table}" FOR VALUES IN (DATE \'{ref}\');'))
+
+def _swap_sql(conn, final_table: str):
+    staging = f"{final_table}_new"
+    ref = month_of(final_table)
+    _promote(conn, staging, final_table, STAGING_INDEXES,
+             parent=PARTITIONED_TABLE if ref is not None else None, ref=ref)
+    if ref is not None:
+        silver = silver_table(final_table)
+        if _table_exists(conn, f"{silver}_new"):
+            _promote(conn, f"{silver}_new", silver, parent=SILVER_TABLE, ref=ref)
+        else:
+            log.warning("%s_new não existe (staging anterior à camada silver): %s não atualizada.",
+                        silver, silver)
+        cube = cube_table(final_table)
+        if _table_exists(conn, f"{cube}_new"):
+            _promote(conn, f"{cube}_new", cube, parent=CUBE_TABLE, ref=ref)
+        if CORR_STATS:
+            import correlacoes
+            correlacoes.promover(conn, ref)
+    if _table_exists(conn, MANIFEST_TABLE):
+        conn.execute(text(f"UPDATE public.{MANIFEST_TABLE} SET status = 'ok', atualizado_em = now() "
+                          "WHERE tabela = :t"), {"t": final_table})
+
+def mark_load(final_tables):
+    """Atualiza data/.cache/ultima_carga.json: quem consome cache local sabe que os dados mudaram."""
+    agora = time.strftime("%Y-%m-%dT%H:%M:%S")
+    with _update_json(LOAD_MARKER) as marker:
+        marker.setdefault("tabelas", {}).update({t: agora for t in final_tables})
+        marker["carregado_em"] = agora
+
+def swap_staging(engine, final_table: str):
+    """Swap atômico: staging -> final, final -> _old."""
+    t0 = time.time()
+    with metricas.etapa("swap", final_table), engine.begin() as conn:
+        _swap_sql(conn, final_table)
+    mark_load([final_table])
+    log.info("⏱️  %s swap em %.2fs", final_table, time.time()-t0)
+
+def swap_all(engine, final_tables):
+    """Promove várias stagings na MESMA transação (ou todas, ou nenhuma)."""
+    t0 = time.time()
+    with metricas.etapa("swap", ",".join(final_tables)), engine.begin() as conn:
+        for final_table in final_tables:
+            _swap_sql(conn, final_table)
+    mark_load(final_tables)
+    log.info("⏱️  swap de %d tabelas em %.2fs", len(final_tables), time.time()-t0)
+
+# ============================================================
+# TABELA PARTICIONADA — pnad_covid_2020 PARTITION BY LIST (referencia)
+# ============================================================
+# Cada mês (pnad_covid_MMYYYY) é uma partição. A staging ganha a coluna
+# referencia (+ CHECK, para o ATTACH não precisar varrer a tabela) e é
+# alinhada às colunas da mãe; no swap o mês antigo sai (DETACH) e a
+# staging entra (ATTACH). Como as views leem a mãe — que nunca é
+# renomeada —, elas continuam válidas depois de qualquer swap.
+NUMERIC_RANK = {"smallint": 1, "integer": 2, "bigint": 3, "double precision": 4}
+
+def _columns(conn, table: str) -> dict:
+    """{coluna: tipo SQL} na ordem física da tabela ({} se ela não existir)."""
+    rows = conn.execute(text("""
+        SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+        FROM pg_attribute a
+        WHERE a.attrelid = to_regclass(:t) AND a.attnum > 0 AND NOT a.attisdropped
+        ORDER BY a.attnum
+    """), {"t": f'public."{table}"'}).all()
+    return dict(rows)
+
+def _common_type(a: str, b: str) -> str:
+    """Menor tipo que comporta os dois (numéricos alargam; o resto cai em text)."""
+    if a == b:
+        return a
+    if a in NUMERIC_RANK and b in NUMERIC_RANK:
+        return a if NUMERIC_RANK[a] >= NUMERIC_RANK[b] else b
+    return "text"
+
+def align_to_parent(conn, staging: str, parent_cols: dict):
+    """
+    Deixa a staging com as colunas/tipos da mãe: cria as que faltam (NULL)
+    e converte as de tipo mais estreito. Um ALTER só = no máximo 1 reescrita.
+    """
+    staging_cols = _columns(conn, staging)
+    actions = []
+    for col, ptype in parent_cols.items():
+        stype = staging_cols.get(col)
+        if stype is None:
+            actions.append(f'ADD COLUMN "{col}" {ptype}')
+        elif stype != ptype and _common_type(stype, ptype) == ptype:
+            actions.append(f'ALTER COLUMN "{col}" TYPE {ptype} USING "{col}"::{ptype}')
+    if actions:
+        conn.execute(text(f'ALTER TABLE public."{staging}" ' + ", ".join(actions) + ";"))
+
+def prepare_partition(conn, staging: str, ref: str):
+    """Coluna referencia constante + CHECK na staging; alinha com a mãe se ela já existe."""
+    conn.execute(text(f'ALTER TABLE public."{staging}" '
+                      f'ADD COLUMN IF NOT EXISTS referencia date NOT NULL DEFAULT DATE \'{ref}\';'))
+    conn.execute(text(f'ALTER TABLE public."{staging}" DROP CONSTRAINT IF EXISTS referencia_mes;'))
+    conn.execute(text(f'ALTER TABLE public."{staging}" '
+                      f'ADD CONSTRAINT referencia_mes CHECK (referencia = DATE \'{ref}\');'))
+    parent_cols = _columns(conn, PARTITIONED_TABLE)
+    if parent_cols:
+        align_to_parent(conn, staging, parent_cols)
+
+def reconcile_partition_columns(conn, staging: str, parent: str = PARTITIONED_TABLE):
+    """
+    (Dentro do swap) cria a mãe se preciso, acrescenta nela as colunas novas
+    do mês e alarga tipos incompatíveis; por fim alinha a staging à mãe.
+    """
+    parent_cols = _columns(conn, parent)
+    if not parent_cols:
+        conn.execute(text(f'CREATE TABLE public."{parent}" (LIKE public."{staging}") '
+                          'PARTITION BY LIST (referencia);'))
+        log.info("Tabela particionada %s criada a partir de %s.", parent, staging)
+        return
+
+    widen = {}
+    for col, stype in _columns(conn, staging).items():
+        ptype = parent_cols.get(col)
+        if ptype is None:
+            conn.execute(text(f'ALTER TABLE public."{parent}" ADD COLUMN "{col}" {stype};'))
+            log.info("%s: coluna nova %s (%s) — NULL nos outros meses.", parent, col, stype)
+        elif _common_type(stype, ptype) != ptype:
+            widen[col] = _common_type(stype, ptype)
+            log.warning("%s: alargando %s de %s para %s (reescreve todas as partições).",
+                        parent, col, ptype, widen[col])
+    if widen:
+        widen_parent_columns(conn, parent, widen)
+    align_to_parent(conn, staging, _columns(conn, parent))
+
+def _dependent_views(conn, table: str) -> list:
+    """
+    Views e materialized views que dependem (direta ou indiretamente) da
+    tabela ou das suas partições, na ordem em que precisam ser criadas.
+    Além da definição e dos índices, traz as opções (WITH ...) e o SQL que
+    devolve dono, GRANTs (tabela e coluna) e COMMENTs — o DROP leva tudo.
+    """
+    return conn.execute(text("""
+        WITH RECURSIVE base AS (
+            SELECT to_regclass(:t)::oid AS oid
+            UNION
+            SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(:t)
+        ), dep(oid, nivel) AS (
+            SELECT r.ev_class, 1
+            FROM pg_depend d
+            JOIN pg_rewrite r ON r.oid = d.objid
+            WHERE d.classid = 'pg_rewrite'::regclass AND d.refclassid = 'pg_class'::regclass
+              AND d.refobjid IN (SELECT oid FROM base) AND r.ev_class <> d.refobjid
+            UNION ALL
+            SELECT r.ev_class, dep.nivel + 1
+            FROM dep
+            JOIN pg_depend d ON d.refobjid = dep.oid AND d.classid = 'pg_rewrite'::regclass
+                            AND d.refclassid = 'pg_class'::regclass
+            JOIN pg_rewrite r ON r.oid = d.objid
+            WHERE r.ev_class <> dep.oid
+        ), niveis AS (
+            SELECT oid, MAX(nivel) AS nivel FROM dep GROUP BY oid
+        ), visoes AS (
+            SELECT c.oid, c.relkind, c.relowner, c.relacl, c.reloptions, v.nivel,
+                   format('%I.%I', n.nspname, c.relname) AS nome,
+                   CASE c.relkind WHEN 'm' THEN 'MATERIALIZED VIEW' ELSE 'VIEW' END AS tipo
+            FROM niveis v
+            JOIN pg_class c ON c.oid = v.oid
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+        )
+        SELECT x.nome, x.relkind, x.nivel, pg_get_viewdef(x.oid) AS definicao,
+               ARRAY(SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i
+                     WHERE i.indrelid = x.oid) AS indices,
+               COALESCE(x.reloptions, '{}') AS opcoes,
+               ARRAY(
+                   SELECT format('ALTER %s %s OWNER TO %I', x.tipo, x.nome, pg_get_userbyid(x.relowner))
+                   UNION ALL
+                   SELECT format('GRANT %s ON %s TO %s%s', a.privilege_type, x.nome,
+                                 CASE WHEN a.grantee = 0 THEN 'PUBLIC'
+                                      ELSE quote_ident(pg_get_userbyid(a.grantee)) END,
+                                 CASE WHEN a.is_grantable THEN ' WITH GRANT OPTION' ELSE '' END)
+                   FROM aclexplode(x.relacl) a WHERE a.grantee <> x.relowner
+                   UNION ALL
+                   SELECT format('GRANT %s (%I) ON %s TO %s%s', a.privilege_type, att.attname, x.nome,
+                                 CASE WHEN a.grantee = 0 THEN 'PUBLIC'
+                                      ELSE quote_ident(pg_get_userbyid(a.grantee)) END,
+                                 CASE WHEN a.is_grantable THEN ' WITH GRANT OPTION' ELSE '' END)
+                   FROM pg_attribute att, aclexplode(att.attacl) a
+                   WHERE att.attrelid = x.oid AND att.attacl IS NOT NULL AND a.grantee <> x.relowner
+                   UNION ALL
+                   SELECT format('COMMENT ON %s %s IS %L', x.tipo, x.nome, obj_description(x.oid, 'pg_class'))
+                   WHERE obj_description(x.oid, 'pg_class') IS NOT NULL
+                   UNION ALL
+                   SELECT format('COMMENT ON COLUMN %s.%I IS %L', x.nome, att.attname,
+                                 col_description(x.oid, att.attnum))
+                   FROM pg_attribute att
+                   WHERE att.attrelid = x.oid AND att.attnum > 0
+                     AND col_description(x.oid, att.attnum) IS NOT NULL
+               ) AS extras
+        FROM visoes x
+        ORDER BY x.nivel, x.nome
+    """), {"t": f'public."{table}"'}).all()
+
+def _exec_raw(conn, sql: str):
+    """SQL vindo do catálogo (definição de view) sem passar pelos binds do text()."""
+    with conn.connection.cursor() as cur:
+        cur.execute(sql)
+
+def widen_parent_columns(conn, parent: str, widen: dict):
+    """
+    ALTER COLUMN ... TYPE na mãe. Postgres recusa alterar coluna usada por
+    view, então as views dependentes (pnad_covid_2020_auto, top20, ...) saem
+    e voltam com a mesma definição e opções — tudo na transação do swap.
+    Materialized views voltam populadas (WITH DATA) e depois ganham os
+    índices; dono, GRANTs e COMMENTs são reaplicados no fim.
+    """
+    views = _dependent_views(conn, parent)
+    for nome, kind, *_ in reversed(views):
+        _exec_raw(conn, f"DROP {'MATERIALIZED VIEW' if kind == 'm' else 'VIEW'} IF EXISTS {nome};")
+    conn.execute(text(f'ALTER TABLE public."{parent}" ' + ", ".join(
+        f'ALTER COLUMN "{col}" TYPE {wider} USING "{col}"::{wider}' for col, wider in widen.items()) + ";"))
+    for nome, kind, _, definicao, indices, opcoes, _ in views:
+        definicao = definicao.strip().rstrip(";")
+        opcoes = f" WITH ({', '.join(opcoes)})" if opcoes else ""
+        if kind == "m":
+            _exec_raw(conn, f"CREATE MATERIALIZED VIEW {nome}{opcoes} AS {definicao} WITH DATA;")
+            for index_sql in indices:
+                _exec_raw(conn, index_sql + ";")
+        else:
+            _exec_raw(conn, f"CREATE VIEW {nome}{opcoes} AS {definicao};")
+    for *_, extras in views:
+        for extra_sql in extras:
+            _exec_raw(conn, extra_sql + ";")
+    if views:
+        log.info("%s: %d view(s) dependente(s) recriada(s) após alargar %s: %s", parent, len(views),
+                 ", ".join(widen), ", ".join(v[0] for v in views))
+
+def detach_partition(conn, table: str, parent: str = PARTITIONED_TABLE):
+    """DETACH da tabela, se ela for hoje uma partição da mãe."""
+    attached = conn.execute(text("""
+        SELECT 1 FROM pg_inherits
+        WHERE inhrelid = to_regclass(:t) AND inhparent = to_regclass(:p)
+    """), {"t": f'public."{table}"', "p": f'public."{parent}"'}).scalar()
+    if attached:
+        conn.execute(text(f'ALTER TABLE public."{parent}" DETACH PARTITION public."{table}";'))
+
+# ============================================================
+# CAMADA SILVER — flags tipadas calculadas UMA vez, na carga
+# ============================================================
+# As views analíticas faziam (NULLIF(col::text,'')::int = 1)::int em toda
+# linha de toda consulta. Aqui isso vira um CTAS por mês a partir da
+# staging: flags smallint 0/1 (NULL = sem resposta), códigos demográficos
+# smallint e derivadas prontas (tem_algum_sintoma, idoso, faixa, grupo de
+# escolaridade). Os painéis passam a ser agregações simples sobre a silver.
+SILVER_FLAGS = {         # flag 0/1 = (código == 1); PNAD: 1 = sim, 2 = não
+    "falta_ar": "b0014",
+    "dor_peito": "b0016",
+    "sint_0011": "b0011",
+    "sint_0012": "b0012",
+    "sint_0013": "b0013",
+    "sint_0015": "b0015",
+    "sint_0019": "b0019",
+    "sint_00110": "b00110",
+    "sint_00111": "b00111",
+    "sint_00112": "b00112",
+    "procurou": "b002",
+    "internou": "b005",
+    "plano": "b007",
+}
+SILVER_CODES = {         # códigos mantidos como smallint
+    "idade": "a002",
+    "sexo": "a003",
+    "raca_cor": "a004",
+    "escolaridade": "a005",
+    "condicao_no_domicilio": "a001a",
+    "uf": "uf",
+}
+SINTOMA_FLAGS = ["falta_ar", "dor_peito", "sint_0011", "sint_0012", "sint_0013", "sint_0015",
+                 "sint_0019", "sint_00110", "sint_00111", "sint_00112"]
+SILVER_DERIVED = {
+    "tem_algum_sintoma": "COALESCE(GREATEST({sintomas}), 0)::smallint",
+    "idoso": "(idade >= 60)::int::smallint",
+    "faixa": """CASE
+        WHEN idade < 20 THEN '<20'
+        WHEN idade BETWEEN 20 AND 39 THEN '20-39'
+        WHEN idade BETWEEN 40 AND 59 THEN '40-59'
+        WHEN idade >= 60 THEN '60+'
+        ELSE 'sem_idade'
+      END""",
+    "escolaridade_grp": """CASE
+        WHEN escolaridade BETWEEN 1 AND 2 THEN 'Fundamental'
+        WHEN escolaridade BETWEEN 3 AND 4 THEN 'Médio'
+        WHEN escolaridade >= 5 THEN 'Superior+'
+        ELSE 'Sem info'
+      END""",
+}
 
-    # 4) Swap atômico: staging -> final, final -> _old
+def silver_table(final_table: str) -> str:
+    return f"{final_table}_silver"
+
+def silver_select_sql(source: str, source_cols) -> str:
+    """SELECT da silver a partir de `source` (colunas ausentes no mês viram NULL)."""
+    inner = ["referencia"]
+    for name, col in SILVER_CODES.items():
+        expr = f"NULLIF(\"{col}\"::text,'')::int::smallint" if col in source_cols else "NULL::smallint"
+        inner.append(f"{expr} AS {name}")
+    for name, col in SILVER_FLAGS.items():
+        expr = (f"(NULLIF(\"{col}\"::text,'')::int = 1)::int::smallint"
+                if col in source_cols else "NULL::smallint")
+        inner.append(f"{expr} AS {name}")
+    derived = {name: expr.format(sintomas=", ".join(SINTOMA_FLAGS))
+               for name, expr in SILVER_DERIVED.items()}
+    outer = ["s.*"] + [f"{expr} AS {name}" for name, expr in derived.items()]
+    return (f"SELECT {', '.join(outer)}\n"
+            f"FROM (SELECT {', '.join(inner)} FROM public.\"{source}\") s")
+
+def build_silver(engine, final_table: str, ref: str, unlogged: bool = STAGING_UNLOGGED):
+    """CTAS {final}_silver_new a partir de {final}_new + CHECK do mês + ANALYZE."""
+    staging = f"{final_table}_new"
+    silver_new = f"{silver_table(final_table)}_new"
+    with engine.begin() as conn:
+        source_cols = set(_columns(conn, staging))
+        missing = sorted((set(SILVER_CODES.values()) | set(SILVER_FLAGS.values())) - source_cols)
+        if missing:
+            log.warning("%s: sem as colunas %s — ficam NULL na silver.", staging, ", ".join(missing))
+        conn.execute(text(f'DROP TABLE IF EXISTS public."{silver_new}";'))
+        conn.execute(text(f'CREATE {"UNLOGGED " if unlogged else ""}TABLE public."{silver_new}" AS\n'
+                          + silver_select_sql(staging, source_cols) + ";"))
+        conn.execute(text(f'ALTER TABLE public."{silver_new}" ALTER COLUMN referencia SET NOT NULL, '
+                          f'ADD CONSTRAINT referencia_mes CHECK (referencia = DATE \'{ref}\');'))
+    with engine.begin() as conn:
+        conn.execute(text(f'ANALYZE public."{silver_new}";'))
+        if unlogged:
+            conn.execute(text(f'ALTER TABLE public."{silver_new}" SET LOGGED;'))
+
+# ============================================================
+# CUBO OLAP — contagens pré-agregadas por mês
+# ============================================================
+# Toda pergunta dos painéis é um roll-up de contagens sobre poucos códigos.
+# O cubo guarda, por referencia x uf x faixa x sexo x escolaridade_grp, o
+# total de linhas e, para cada flag, quantas respostas não nulas (n_<flag>)
+# e quantos "sim" (s_<flag>): AVG(flag) de qualquer recorte = Σs / Σn.
+# Poucos milhares de células por mês (cubo.py responde em milissegundos).
+CUBE_DIMS = ["uf", "faixa", "sexo", "escolaridade_grp"]
+CUBE_FLAGS = ["falta_ar", "dor_peito", "tem_algum_sintoma", "procurou", "internou", "plano", "idoso"]
+
+def cube_table(final_table: str) -> str:
+    return f"{final_table}_cubo"
+
+def cube_select_sql(source: str) -> str:
+    """GROUP BY das dimensões sobre a silver `source`."""
+    dims = ", ".join(["referencia"] + CUBE_DIMS)
+    measures = ["COUNT(*)::bigint AS n"]
+    for flag in CUBE_FLAGS:
+        measures.append(f"COUNT({flag})::bigint AS n_{flag}")
+        measures.append(f"COALESCE(SUM({flag}), 0)::bigint AS s_{flag}")
+    # internou entre quem procurou atendimento (numerador de prop_internou_entre_buscou)
+    measures.append("COALESCE(SUM((procurou = 1 AND internou = 1)::int), 0)::bigint AS s_procurou_internou")
+    return (f"SELECT {dims}, {', '.join(measures)}\n"
+            f"FROM public.\"{source}\"\nGROUP BY {dims}")
+
+def build_cube(engine, final_table: str, ref: str) -> int:
+    """CTAS {final}_cubo_new a partir de {final}_silver_new + CHECK do mês; devolve nº de células."""
+    silver_new = f"{silver_table(final_table)}_new"
+    cube_new = f"{cube_table(final_table)}_new"
     with engine.begin() as conn:
-        conn.execute(text(f'DROP TABLE IF EXISTS public."{final_table}_old" CASCADE;'))
-        conn.execute(text(f'ALTER TABLE IF EXISTS public."{final_table}" RENAME TO "{final_table}_old";'))
-        conn.execute(text(f'ALTER TABLE public."{staging}" RENAME TO "{final_table}";'))
+        conn.execute(text(f'DROP TABLE IF EXISTS public."{cube_new}";'))
+        conn.execute(text(f'CREATE TABLE public."{cube_new}" AS\n' + cube_select_sql(silver_new) + ";"))
+        conn.execute(text(f'ALTER TABLE public."{cube_new}" ALTER COLUMN referencia SET NOT NULL, '
+                          f'ADD CONSTRAINT referencia_mes CHECK (referencia = DATE \'{ref}\');'))
+        conn.execute(text(f'ANALYZE public."{cube_new}";'))
+        return conn.execute(text(f'SELECT count(*) FROM public."{cube_new}"')).scalar()
+
+# ============================================================
+# PAINÉIS MATERIALIZADOS — atualizados após o swap
+# ============================================================
+def refresh_panels(engine):
+    """
+    REFRESH das materialized views pnad_covid_* (criadas pelo 02_analytics.sql).
+    CONCURRENTLY quando a view já está populada e tem índice único — leitores
+    continuam vendo a versão anterior até o fim; senão, REFRESH comum.
+    """
+    with engine.connect() as conn:
+        panels = conn.execute(text("""
+            SELECT m.matviewname, m.ispopulated,
+                   EXISTS (SELECT 1 FROM pg_index i
+                           WHERE i.indrelid = format('%I.%I', m.schemaname, m.matviewname)::regclass
+                             AND i.indisunique AND i.indpred IS NULL AND i.indexprs IS NULL) AS tem_unico
+            FROM pg_matviews m
+            WHERE m.schemaname = 'public' AND m.matviewname LIKE 'pnad\\_covid\\_%'
+            ORDER BY m.matviewname
+        """)).all()
+    if not panels:
+        log.info("Nenhum painel materializado encontrado (rode 02_analytics.sql para criá-los).")
+        return
+
+    t_total = time.time()
+    for name, populated, has_unique in panels:
+        concurrently = populated and has_unique
+        t0 = time.time()
+        with metricas.etapa("refresh_panel", name), engine.begin() as conn:
+            conn.execute(text(f'REFRESH MATERIALIZED VIEW {"CONCURRENTLY " if concurrently else ""}'
+                              f'public."{name}"'))
+        log.info("🔄 %s atualizado em %.2fs%s", name, time.time()-t0,
+                 "" if concurrently else " (sem CONCURRENTLY)")
+    log.info("Painéis materializados atualizados: %d em %.2fs", len(panels), time.time()-t_total)
+
+def _table_size(conn, table: str):
+    return conn.execute(text("SELECT pg_total_relation_size(to_regclass(:t))"),
+                        {"t": f'public."{table}"'}).scalar()
+
+def _mb(nbytes) -> str:
+    return "-" if nbytes is None else f"{nbytes / 1e6:.1f} MB"
+
+def _stage_csv(engine, csv_path: str, final_table: str, stream: bool, pipeline: bool,
+               copy_format: str, infer: str, compact: bool, plan=None,
+               copy_connections: int = COPY_CONNECTIONS, hot_cold: bool = HOT_COLD) -> int:
+    staging = f"{final_table}_new"
+    start_row = plan["linhas_ok"] if plan and plan["acao"] == "retomar" else 0
+    cache_opts = _cache_opts(infer, compact)
+    nbytes = os.path.getsize(csv_path)
+
+    def etapa(nome, **kw):
+        return metricas.etapa(nome, final_table, nbytes=nbytes, **kw)
+
+    # 1) Lê CSV (inteiro ou em streaming) e define os tipos — ou o cache Parquet
+    meta = _cache_meta(csv_path, cache_opts) if PARQUET_CACHE else None
+    if meta is not None:
+        dtypes = _sql_types_from_names(meta["tipos_sql"])
+        if stream:
+            first = next(iter_parquet_chunks(csv_path), None)
+            df_empty = first.iloc[0:0] if first is not None else pd.DataFrame(columns=list(dtypes))
+            chunks = iter_parquet_chunks(csv_path, start_row)
+        else:
+            with etapa("read_parquet_cache") as m:
+                df, _ = read_parquet_cache(csv_path, cache_opts)
+                m["linhas"] = len(df)
+            df_empty = df.iloc[0:0]
+            chunks = iter_frame_chunks(df, start_row)
+    elif infer == "sample":
+        with etapa("get_schema"):
+            schema = get_schema(csv_path)
+        if compact:
+            schema = compact_schema(schema)
+        df_empty = schema_frame(schema)
+        dtypes = schema_sql_dtypes(schema)
+        if stream:
+            chunks = iter_csv_chunks(csv_path, schema, start_row)
+        else:
+            with etapa("read_csv_with_schema") as m:
+                df = read_csv_with_schema(csv_path, schema)
+                m["linhas"] = len(df)
+            chunks = iter_frame_chunks(df, start_row)
+    elif stream and copy_connections == 1 and not hot_cold:
+        # passada única: tipos da amostra, alargados pelos chunks (sem profile_csv)
+        with etapa("get_schema"):
+            schema, db_kinds = single_pass_schema(engine, csv_path, staging, compact, bool(start_row))
+        df_empty = schema_frame(schema)
+        dtypes = schema_sql_dtypes(schema)
+        chunks = iter_csv_chunks_widening(csv_path, schema, dtypes, db_kinds, start_row, compact)
+    elif stream:
+        with etapa("profile_csv"):
+            schema = profile_csv(csv_path, with_stats=compact)
+        if compact:
+            schema = compact_schema(schema)
+        df_empty = schema_frame(schema)
+        dtypes = schema_sql_dtypes(schema)
+        chunks = iter_csv_chunks(csv_path, schema, start_row)
+    else:
+        with etapa("smart_read_csv") as m:
+            df = smart_read_csv(csv_path)
+            m["linhas"] = len(df)
+        with etapa("clean_columns", linhas=len(df)):
+            df = clean_columns(df)
+        with etapa("maybe_parse_datetimes", linhas=len(df)):
+            df = maybe_parse_datetimes(df)
+        df.replace([np.inf, -np.inf], np.nan, inplace=True)
+        if compact:
+            with etapa("compact_frame", linhas=len(df)):
+                df = compact_frame(df)
+        df_empty = df.iloc[0:0]
+        with etapa("infer_sqlalchemy_dtypes", linhas=len(df)):
+            dtypes = infer_sqlalchemy_dtypes(df)
+        chunks = iter_frame_chunks(df, start_row)
+    if stream:   # no streaming a leitura/parse acontece a cada next()
+        chunks = metricas.iterar("ler_chunk", chunks, final_table)
+
+    if PARQUET_CACHE and meta is None:
+        if not stream:
+            with etapa("write_parquet_cache", linhas=len(df)):
+                write_parquet_cache(csv_path, df, dtypes, cache_opts)
+        elif start_row == 0:   # cache parcial não serve: só grava carga completa
+            chunks = tee_parquet_cache(chunks, csv_path, dtypes, cache_opts)
+
+    # Camada quente: largura total no arquivo frio, staging só com as colunas quentes
+    if hot_cold:
+        cold = cold_archive_path(final_table)
+        if start_row == 0:
+            chunks = tee_cold_archive(chunks, cold)
+        else:   # o arquivo frio precisa do mês inteiro: uma passada extra só na retomada
+            log.info("%s: retomada — regravando %s a partir do arquivo inteiro.", final_table, cold)
+            with etapa("arquivo_frio"):
+                full = read_source_frame(csv_path, infer=infer, compact=compact)
+                for _ in tee_cold_archive(iter_frame_chunks(full), cold):
+                    pass
+                del full
+        wide = df_empty.shape[1]
+        keep = hot_columns(df_empty.columns)
+        df_empty, dtypes = df_empty[keep], {c: dtypes[c] for c in keep}
+        chunks = (chunk[keep] for chunk in chunks)
+
+    if compact:
+        mem = {"atual": 0, "largo": 0}
+        chunks = _measure_memory(chunks, mem)
+
+    # 2) Cria tabela staging vazia (ou retoma a existente)
+    if start_row:
+        log.info("Retomando %s a partir da linha %d (chunk %d).", staging, start_row, plan["chunks_ok"])
+    else:
+        with etapa("create_staging"):
+            create_staging(engine, staging, df_empty, dtypes)
+        if plan:
+            manifest_begin(engine, final_table, plan)
+
+    # 3) Insere em chunks com COPY (com manifesto: 1 transação por chunk;
+    #    com --copy-connections: 1 transação por conexão, commit no fim ou,
+    #    com manifesto, a cada COPY_CHECKPOINT_CHUNKS)
+    inserted = start_row
+    progress = {"chunks": plan["chunks_ok"] if start_row else 0}
+    t0 = time.time()
+    if copy_connections > 1:
+        if pipeline:
+            log.info("%s: --copy-connections já sobrepõe leitura e COPY; --pipeline ignorado.", staging)
+        def on_checkpoint(total_rows, n_chunks):
+            with engine.begin() as conn:
+                manifest_progress(conn, final_table, total_rows, progress["chunks"] + n_chunks)
+
+        with etapa("copy") as copy_m:
+            inserted += copy_chunks_parallel(engine, chunks, staging, copy_connections,
+                                             copy_format=copy_format, sql_types=dtypes,
+                                             start_rows=start_row,
+                                             on_checkpoint=on_checkpoint if plan else None)
+            copy_m["linhas"] = inserted - start_row
+    else:
+        with etapa("copy") as copy_m, engine.connect() as conn:
+            # transação explícita: o COPY usa o cursor cru (conn.connection) e o
+            # SQLAlchemy não abriria uma sozinho — sem manifesto, conn.commit()
+            # não faria nada e o pool desfaria o COPY ao devolver a conexão
+            trans = conn.begin()
+
+            def after_chunk(total_rows):
+                nonlocal trans
+                if plan:
+                    progress["chunks"] += 1
+                    manifest_progress(conn, final_table, total_rows, progress["chunks"])
+                    trans.commit()
+                    trans = conn.begin()
+
+            if pipeline:
+                inserted += copy_chunks_pipelined(conn, chunks, staging, copy_format=copy_format,
+                                                  sql_types=dtypes, start_rows=start_row,
+                                                  after_chunk=after_chunk)
+            else:
+                for chunk in chunks:
+                    widen_staging(conn, staging, chunk.attrs.get("alargar"))
+                    copy_chunk(conn, chunk, staging, copy_format=copy_format, sql_types=dtypes)
+                    inserted += len(chunk)
+                    after_chunk(inserted)
+                    log.info("%s inseridas %d linhas", staging, inserted)
+            trans.commit()
+            copy_m["linhas"] = inserted - start_row
+    log.info("⏱️  %s COPY de %d linhas em %.2fs", staging, inserted - start_row, time.time()-t0)
+
+    # 4) Índices + ANALYZE + SET LOGGED (ainda na staging, antes do swap)
+    with etapa("finalize_staging", linhas=inserted):
+        finalize_staging(engine, final_table)
+
+    if plan:
+        manifest_staged(engine, final_table, inserted)
+    log.info("Staging %s concluída (%d linhas em %.1fs).", staging, inserted, time.time()-t0)
+
+    if compact:
+        with engine.connect() as conn:
+            disco_antes, disco_depois = _table_size(conn, final_table), _table_size(conn, staging)
+        n_small = sum(isinstance(t, SmallInteger) for t in dtypes.values())
+        log.info("Tipos compactos %s: memória %s -> %s | disco %s (atual) -> %s (staging) | "
+                 "%d colunas SMALLINT", final_table, _mb(mem["largo"]), _mb(mem["atual"]),
+                 _mb(disco_antes), _mb(disco_depois), n_small)
+    if hot_cold:
+        with engine.connect() as conn:
+            disco_antes, disco_depois = _table_size(conn, final_table), _table_size(conn, staging)
+        log.info("Camada quente %s: %d de %d colunas no banco | disco %s (atual) -> %s (staging) | "
+                 "arquivo frio %s: %s (%s) | CSV %s", final_table, len(keep), wide, _mb(disco_antes),
+                 _mb(disco_depois), cold, _mb(os.path.getsize(cold)), COLD_COMPRESSION, _mb(nbytes))
+    return inserted
+
+def _measure_memory(chunks, acc: dict):
+    """Repassa os chunks somando memória compacta x equivalente int64/float64/object."""
+    for chunk in chunks:
+        atual, largo = memory_report(chunk)
+        acc["atual"] += atual
+        acc["largo"] += largo
+        yield chunk
+
+def stage_csv_into_table(engine, csv_path: str, final_table: str, stream: bool = STREAM_LOAD,
+                         pipeline: bool = PIPELINE, copy_format: str = COPY_FORMAT,
+                         infer: str = TYPE_INFERENCE, compact: bool = COMPACT_TYPES,
+                         plan=None, copy_connections: int = COPY_CONNECTIONS,
+                         hot_cold: bool = HOT_COLD):
+    """
+    Lê o CSV e carrega a staging ({final}_new) via COPY. Devolve o nº de linhas.
+    `plan` (de plan_load) liga o manifesto: progresso por chunk e retomada.
+    `copy_connections` > 1 divide os chunks do arquivo entre N conexões.
+    `hot_cold` deixa na staging só as colunas quentes (resto no arquivo frio).
+    """
+    try:
+        return _stage_csv(engine, csv_path, final_table, stream, pipeline, copy_format,
+                          infer, compact, plan, copy_connections, hot_cold)
+    except SchemaMismatch as exc:
+        if infer != "sample":
+            raise
+        log.warning("%s: esquema da amostra não serve (%s); refazendo com inferência completa.",
+                    csv_path, exc)
+        forget_schema(csv_path)
+        if plan:
+            plan = dict(plan, acao="carregar", linhas_ok=0, chunks_ok=0)
+        return _stage_csv(engine, csv_path, final_table, stream, pipeline, copy_format,
+                          "full", compact, plan, copy_connections, hot_cold)
+
+def prepare_job(engine, csv_path: str, final_table: str, opts: dict,
+                manifest: bool = USE_MANIFEST, force: bool = False):
+    """
+    Carrega a staging de um job respeitando o manifesto.
+    Devolve (acao, linhas): acao "pular" = nada a fazer; "swap" = staging pronta.
+    """
+    with metricas.perfil(final_table):
+        return _prepare_job(engine, csv_path, final_table, opts, manifest, force)
+
+def _prepare_job(engine, csv_path, final_table, opts, manifest, force):
+    with metricas.etapa("plan_load", final_table):
+        plan = plan_load(engine, csv_path, final_table, opts, force=force) if manifest else None
+    if plan and plan["acao"] == "pular":
+        log.info("⏭️  %s inalterado (sha256 %s…): %s mantida.", csv_path, plan["sha256"][:12], final_table)
+        return "pular", 0
+    if plan and plan["acao"] == "swap":
+        log.info("%s: staging completa de execução anterior, só falta o swap.", final_table)
+        return "swap", 0
+    rows = stage_csv_into_table(engine, csv_path, final_table, plan=plan, **opts)
+    return "swap", rows
+
+def load_csv_into_table(engine, csv_path: str, final_table: str,
+                        manifest: bool = USE_MANIFEST, force: bool = False,
+                        refresh: bool = REFRESH_PANELS, **opts):
+    """Fluxo de carga com staging + COPY + swap. Devolve True se a tabela final foi trocada."""
+    if not os.path.isfile(csv_path):
+        log.error("CSV não encontrado: %s", csv_path)
+        return False
+
+    acao, _ = prepare_job(engine, csv_path, final_table, opts, manifest=manifest, force=force)
+    if acao == "pular":
+        return False
+
+    # 5) Swap atômico: staging -> final, final -> _old
+    swap_staging(engine, final_table)
 
     log.info("Swap concluído: %s atualizado (backup em %s_old).", final_table, final_table)
+
+    # 6) Painéis materializados passam a refletir a tabela nova
+    if refresh:
+        refresh_panels(engine)
+    return True
+
+# ============================================================
+# CARGA PARALELA (um processo por CSV)
+# ============================================================
+def _stage_job(csv_path: str, final_table: str, opts: dict, manifest: bool, force: bool,
+               metrics_cfg: dict = None):
+    """
+    Executado em processo separado: engine/conexão próprias, só carrega a staging.
+    Devolve (tabela, acao, linhas, segundos, erro, métricas) — nunca propaga exceção.
+    acao: "swap" (staging pronta), "pular" (inalterado) ou "erro".
+    """
+    t0 = time.time()
+    if metrics_cfg:
+        metricas.configurar(**metrics_cfg)
+    if not os.path.isfile(csv_path):
+        return final_table, "erro", 0, 0.0, f"CSV não encontrado: {csv_path}", []
+    engine = make_engine(DB_NAME)
+    try:
+        acao, rows = prepare_job(engine, csv_path, final_table, opts, manifest=manifest, force=force)
+        return final_table, acao, rows, time.time()-t0, None, metricas.coletar()
+    except Exception as exc:
+        return final_table, "erro", 0, time.time()-t0, f"{type(exc).__name__}: {exc}", metricas.coletar()
+    finally:
+        engine.dispose()
+
+def load_jobs_parallel(jobs, workers: int, manifest: bool = USE_MANIFEST,
+                       force: bool = False, refresh: bool = REFRESH_PANELS, **opts) -> bool:
+    """
+    Carrega as stagings de todos os jobs em paralelo (ProcessPool) e só faz
+    o swap — de todas de uma vez — se TODAS tiverem sido carregadas.
+    """
+    results = {}
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = [pool.submit(_stage_job, csv_path, table, opts, manifest, force, metricas.config())
+                   for csv_path, table in jobs]
+        for fut in as_completed(futures):
+            table, acao, rows, secs, err, regs = fut.result()
+            metricas.adicionar(regs)
+            results[table] = acao
+            if acao == "swap":
+                log.info("✅ %s: staging com %d linhas em %.1fs", table, rows, secs)
+            elif acao == "pular":
+                log.info("⏭️  %s: CSV inalterado, nada a carregar", table)
+            else:
+                log.error("❌ %s: falhou após %.1fs — %s", table, secs, err)
+
+    failed = [t for t, acao in results.items() if acao == "erro"]
+    if failed:
+        log.error("Swap cancelado: %d/%d jobs falharam (%s). Tabelas oficiais intactas.",
+                  len(failed), len(jobs), ", ".join(sorted(failed)))
+        return False
+
+    to_swap = [table for _, table in jobs if results.get(table) == "swap"]
+    if not to_swap:
+        log.info("Nenhuma tabela mudou; swap não necessário.")
+        return True
+    engine = make_engine(DB_NAME)
+    try:
+        swap_all(engine, to_swap)
+        log.info("Swap concluído para %d tabelas (backups em *_old).", len(to_swap))
+        if refresh:
+            refresh_panels(engine)
+    finally:
+        engine.dispose()
     return True
 
 # ============================================================
 # MAIN
 # ============================================================
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Loader PNAD COVID (staging + COPY + swap).")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="nº de processos; >1 carrega os CSVs em paralelo e faz o swap só no fim")
+    parser.add_argument("--stream", action="store_true", default=STREAM_LOAD,
+                        help="lê/limpa/copia em chunks (memória constante)")
+    parser.add_argument("--pipeline", action="store_true", default=PIPELINE,
+                        help="sobrepõe serialização do próximo chunk com o COPY do atual")
+    parser.add_argument("--copy-connections", type=int, default=COPY_CONNECTIONS, metavar="N",
+                        help="divide os chunks de cada arquivo entre N conexões (COPY paralelo; "
+                             "commit das N juntas a cada COPY_CHECKPOINT_CHUNKS com manifesto)")
+    parser.add_argument("--copy-format", choices=("csv", "binary"), default=COPY_FORMAT,
+                        help="formato do COPY: csv (padrão) ou binary (PGCOPY)")
+    parser.add_argument("--infer", choices=("sample", "full"), default=TYPE_INFERENCE,
+                        help="tipos por amostra com cache por layout (padrão) ou varredura completa")
+    parser.add_argument("--compact-types", action="store_true", default=COMPACT_TYPES,
+                        help="Int8/Int16/category em memória e SMALLINT na staging (com relatório)")
+    parser.add_argument("--hot-cold", action="store_true", default=HOT_COLD,
+                        help="banco só com as colunas usadas pelas views; todas as colunas em "
+                             f"{COLD_DIR}/<tabela>.parquet ({COLD_COMPRESSION}). Mês já carregado: use --force")
+    parser.add_argument("--force", action="store_true",
+                        help="recarrega mesmo CSVs inalterados segundo o manifesto")
+    parser.add_argument("--data-dir", default=DATA_DIR,
+                        help="pasta com os CSVs PNAD_COVID_MMYYYY.csv (um mês = uma partição)")
+    parser.add_argument("--no-refresh", dest="refresh", action="store_false", default=REFRESH_PANELS,
+                        help="não atualiza os painéis materializados após o swap")
+    parser.add_argument("--metrics-jsonl", default=METRICS_JSONL, metavar="ARQUIVO",
+                        help="grava 1 linha JSON por etapa (tempo, CPU, linhas, bytes, pico de RSS)")
+    parser.add_argument("--metrics-prom", default=METRICS_PROM, metavar="ARQUIVO",
+                        help="textfile do Prometheus com as etapas agregadas (node_exporter)")
+    parser.add_argument("--profile", nargs="*", metavar="TABELA",
+                        help="cProfile + tracemalloc nos jobs indicados (sem nomes = todos), "
+                             f"saída em {metricas.PROFILE_DIR}/")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    check_db_env()
+    metricas.configurar(jsonl=args.metrics_jsonl, prom=args.metrics_prom, perfil=args.profile)
+    try:
+        _run(args)
+    finally:
+        metricas.escrever_prometheus()
+
+def _run(args):
+    if USE_MANIFEST or CORR_STATS:
+        engine = make_engine(DB_NAME)
+        if USE_MANIFEST:
+            ensure_manifest(engine)
+        if CORR_STATS:
+            import correlacoes  # import tardio: só a carga mensal precisa
+            with engine.begin() as conn:
+                correlacoes.garantir_tabela(conn)   # uma vez, antes dos workers
+        engine.dispose()
+    opts = {"stream": args.stream, "pipeline": args.pipeline,
+            "copy_format": args.copy_format, "infer": args.infer,
+            "compact": args.compact_types, "copy_connections": max(1, args.copy_connections),
+            "hot_cold": args.hot_cold}
+    jobs = discover_jobs(args.data_dir)
+    if not jobs:
+        log.error("Nenhum CSV PNAD_COVID_MMYYYY.csv encontrado em %s.", args.data_dir)
+        sys.exit(1)
+    log.info("Meses encontrados: %s", ", ".join(table for _, table in jobs))
+
+    if args.workers > 1:
+        ok = load_jobs_parallel(jobs, args.workers, force=args.force,
+                                refresh=args.refresh, **opts)
+        if not ok:
+            sys.exit(1)
+        log.info("Pipeline concluído com sucesso.")
+        return
+
     engine = make_engine(DB_NAME)
 
-    # Executa carga para cada CSV
-    for csv_path, table in CSV_JOBS:
-        load_csv_into_table(engine, csv_path, table)
+    # Executa carga para cada CSV (painéis atualizados uma vez só, no fim)
+    swapped = False
+    for csv_path, table in jobs:
+        swapped |= load_csv_into_table(engine, csv_path, table, force=args.force,
+                                       refresh=False, **opts)
+    if swapped and args.refresh:
+        refresh_panels(engine)
 
     engine.dispose()
     log.info("Pipeline concluído com sucesso.")
 
 if __name__ == "__main__":
     main()
-
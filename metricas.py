@@ -0,0 +1,243 @@
+# ============================================================
+# metricas.py — Instrumentação por etapa do loader (main.py)
+# ============================================================
+# Objetivo:
+# 1) etapa(nome, tabela): mede tempo de parede, CPU da thread, linhas,
+#    bytes e pico de RSS de um trecho do loader
+# 2) Saída legível por máquina: JSON lines (1 registro por etapa, append —
+#    vale para vários processos) e/ou textfile do Prometheus (agregado por
+#    etapa/tabela, gravado no fim da carga, troca atômica)
+# 3) perfil(tabela): cProfile + tracemalloc ligados só nos jobs pedidos
+#    (--profile), com .prof e top de alocações em PROFILE_DIR
+#
+# Desligado (padrão), etapa() só repassa — nada de thread nem de arquivo.
+# ============================================================
+
+import os
+import json
+import time
+import logging
+import threading
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+PROFILE_DIR = "perfil"
+RSS_INTERVALO = 0.005   # segundos entre amostras de RSS
+PROM_PREFIXO = "pnad_loader"
+
+_cfg = {"jsonl": None, "prom": None, "perfil": None, "perfil_dir": PROFILE_DIR}
+_registros = []        # registros deste processo (Prometheus / devolvidos pelos workers)
+_lock = threading.Lock()
+
+def configurar(jsonl=None, prom=None, perfil=None, perfil_dir=PROFILE_DIR):
+    """
+    jsonl/prom: caminhos de saída (None = desligado). perfil: None = sem
+    profiling, [] = todos os jobs, [tabelas] = só esses.
+    """
+    _cfg.update(jsonl=jsonl, prom=prom, perfil=None if perfil is None else list(perfil),
+                perfil_dir=perfil_dir)
+
+def config() -> dict:
+    """Configuração atual (para repassar aos processos do pool)."""
+    return dict(_cfg)
+
+def ativo() -> bool:
+    return bool(_cfg["jsonl"] or _cfg["prom"])
+
+# ------------------------------
+# Memória
+# ------------------------------
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource  # fora do Linux: só o pico do processo inteiro
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+@contextmanager
+def pico_rss(intervalo: float = RSS_INTERVALO):
+    """Amostra o RSS numa thread enquanto o bloco roda; preenche out['pico_rss_mb']."""
+    out = {}
+    pico = [rss_bytes()]
+    parar = threading.Event()
+
+    def amostrar():
+        while not parar.wait(intervalo):
+            pico[0] = max(pico[0], rss_bytes())
+
+    t = threading.Thread(target=amostrar, daemon=True)
+    t.start()
+    try:
+        yield out
+    finally:
+        parar.set()
+        t.join()
+        out["pico_rss_mb"] = round(max(pico[0], rss_bytes()) / 1e6, 1)
+
+# ------------------------------
+# Etapas
+# ------------------------------
+def _gravar(registro: dict):
+    with _lock:
+        _registros.append(registro)
+        if _cfg["jsonl"]:
+            pasta = os.path.dirname(_cfg["jsonl"])
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            with open(_cfg["jsonl"], "a", encoding="utf-8") as f:   # 1 write por linha (O_APPEND)
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+@contextmanager
+def etapa(nome: str, tabela: str = None, linhas: int = None, nbytes: int = None):
+    """
+    Mede o bloco. O dict devolvido aceita m["linhas"] / m["bytes"] (quando
+    só se sabem no fim) e m["descartar"] = True para não registrar.
+    CPU = thread_time da thread que roda o bloco (o pipeline tem duas).
+    """
+    m = {"linhas": linhas, "bytes": nbytes}
+    if not ativo():
+        yield m
+        return
+    erro = None
+    try:
+        with pico_rss() as mem:
+            t0, c0 = time.perf_counter(), time.thread_time()
+            try:
+                yield m
+            finally:
+                wall, cpu = time.perf_counter() - t0, time.thread_time() - c0
+    except BaseException as exc:
+        erro = type(exc).__name__
+        raise
+    finally:
+        if not m.get("descartar"):
+            _gravar({"ts": time.strftime("%Y-%m-%dT%H:%M:%S"), "pid": os.getpid(), "etapa": nome,
+                     "tabela": tabela, "wall_s": round(wall, 6), "cpu_s": round(cpu, 6),
+                     "linhas": m["linhas"], "bytes": m["bytes"], "pico_rss_mb": mem["pico_rss_mb"],
+                     "erro": erro})
+
+def iterar(nome: str, chunks, tabela: str = None):
+    """Repassa os chunks medindo cada next() (leitura/parse no modo streaming)."""
+    it = iter(chunks)
+    while True:
+        with etapa(nome, tabela) as m:
+            chunk = next(it, None)
+            if chunk is None:
+                m["descartar"] = True
+            else:
+                m["linhas"] = len(chunk)
+        if chunk is None:
+            return
+        yield chunk
+
+def registros() -> list:
+    with _lock:
+        return list(_registros)
+
+def coletar() -> list:
+    """Registros deste processo, esvaziando a lista (worker reaproveitado pelo pool)."""
+    with _lock:
+        regs = list(_registros)
+        _registros.clear()
+        return regs
+
+def adicionar(regs):
+    """Registros vindos dos workers (já estão no JSONL; entram só no agregado)."""
+    with _lock:
+        _registros.extend(regs)
+
+# ------------------------------
+# Prometheus (textfile collector)
+# ------------------------------
+def _label(v) -> str:
+    return str(v or "").replace("\\", "\\\\").replace('"', '\\"')
+
+def _num(v) -> str:
+    return str(v) if isinstance(v, int) else f"{v:.9g}"
+
+def escrever_prometheus(path: str = None):
+    """Agrega os registros por (etapa, tabela) e grava o textfile de forma atômica."""
+    path = path or _cfg["prom"]
+    if not path:
+        return
+    agg = {}
+    for r in registros():
+        a = agg.setdefault((r["etapa"], r["tabela"]),
+                           {"n": 0, "wall": 0.0, "cpu": 0.0, "linhas": 0, "bytes": 0, "rss": 0.0, "erros": 0})
+        a["n"] += 1
+        a["wall"] += r["wall_s"]
+        a["cpu"] += r["cpu_s"]
+        a["linhas"] += r["linhas"] or 0
+        a["bytes"] += r["bytes"] or 0
+        a["rss"] = max(a["rss"], r["pico_rss_mb"] or 0.0)
+        a["erros"] += r["erro"] is not None
+
+    series = [
+        ("stage_runs_total", "counter", "execuções da etapa", "n", 1),
+        ("stage_errors_total", "counter", "execuções da etapa que terminaram em exceção", "erros", 1),
+        ("stage_wall_seconds_total", "counter", "tempo de parede somado", "wall", 1),
+        ("stage_cpu_seconds_total", "counter", "CPU (da thread) somada", "cpu", 1),
+        ("stage_rows_total", "counter", "linhas processadas", "linhas", 1),
+        ("stage_bytes_total", "counter", "bytes processados", "bytes", 1),
+        ("stage_peak_rss_bytes", "gauge", "maior pico de RSS observado na etapa", "rss", 1e6),
+    ]
+    linhas = []
+    for nome, tipo, ajuda, campo, escala in series:
+        linhas.append(f"# HELP {PROM_PREFIXO}_{nome} {ajuda}")
+        linhas.append(f"# TYPE {PROM_PREFIXO}_{nome} {tipo}")
+        for (et, tab), a in sorted(agg.items(), key=lambda kv: (kv[0][0], kv[0][1] or "")):
+            linhas.append(f'{PROM_PREFIXO}_{nome}{{etapa="{_label(et)}",tabela="{_label(tab)}"}} '
+                          f"{_num(a[campo] * escala)}")
+    linhas.append(f"# TYPE {PROM_PREFIXO}_last_run_timestamp_seconds gauge")
+    linhas.append(f"{PROM_PREFIXO}_last_run_timestamp_seconds {time.time():.0f}")
+
+    pasta = os.path.dirname(path)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(linhas) + "\n")
+    os.replace(tmp, path)
+    log.info("Métricas Prometheus gravadas em %s (%d séries).", path, len(agg))
+
+# ------------------------------
+# Profiling por job
+# ------------------------------
+@contextmanager
+def perfil(tabela: str):
+    """
+    cProfile (thread atual) + tracemalloc (todas as threads) enquanto o job
+    roda, se `tabela` foi pedida em --profile. Grava <tabela>.prof
+    (abrir com pstats/snakeviz) e <tabela>_memoria.txt.
+    """
+    alvo = _cfg["perfil"]
+    if alvo is None or (alvo and tabela not in alvo):
+        yield
+        return
+    pasta = _cfg["perfil_dir"]
+    os.makedirs(pasta, exist_ok=True)
+    prof = cProfile.Profile()
+    ja_rastreando = tracemalloc.is_tracing()
+    if not ja_rastreando:
+        tracemalloc.start(10)
+    prof.enable()
+    try:
+        yield
+    finally:
+        prof.disable()
+        snap = tracemalloc.take_snapshot()
+        _, pico = tracemalloc.get_traced_memory()
+        if not ja_rastreando:
+            tracemalloc.stop()
+        prof_path = os.path.join(pasta, f"{tabela}.prof")
+        prof.dump_stats(prof_path)
+        mem_path = os.path.join(pasta, f"{tabela}_memoria.txt")
+        with open(mem_path, "w", encoding="utf-8") as f:
+            f.write(f"pico tracemalloc: {pico/1e6:.1f} MB\n\n")
+            for stat in snap.statistics("lineno")[:25]:
+                f.write(f"{stat}\n")
+        log.info("🔬 Perfil de %s: %s | alocações: %s (pico %.1f MB)", tabela, prof_path, mem_path, pico/1e6)
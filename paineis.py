@@ -0,0 +1,173 @@
+# ============================================================
+# paineis.py — Camada de dados dos gráficos (1 varredura + cache local)
+# ============================================================
+# Objetivo:
+# 1) Buscar TODOS os agregados que o graficos.py usa em UMA consulta
+#    (UNION ALL das materialized views pnad_covid_painel_* do
+#    02_analytics.sql: mês, mês×UF, mês×faixa, mês×sexo, mês×escolaridade)
+#    — poucas linhas prontas, a silver não é varrida
+# 2) Guardar o resultado em data/.cache/paineis_<chave>.parquet
+# 3) Chave = última carga registrada no manifesto do banco
+#    (max(atualizado_em) com status ok) + consulta + meses: vale para
+#    qualquer máquina; sem acesso ao manifesto cai para o
+#    data/.cache/ultima_carga.json local
+# 4) Engine criada só quando for preciso (nada de conexão no import)
+# ============================================================
+
+import os
+import glob
+import hashlib
+import logging
+
+import pandas as pd
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+try:  # opcional: sem pyarrow não há cache (consulta sempre o banco)
+    import pyarrow  # noqa: F401
+    HAS_PARQUET = True
+except ImportError:
+    HAS_PARQUET = False
+
+CACHE_DIR = os.path.join("data", ".cache")
+LOAD_MARKER = os.path.join(CACHE_DIR, "ultima_carga.json")  # mesmo arquivo que o main.py grava
+MANIFEST_TABLE = "pnad_load_manifest"
+
+log = logging.getLogger(__name__)
+
+# ------------------------------
+# Acesso ao banco (.env) — lazy
+# ------------------------------
+load_dotenv()
+DB_HOST = os.getenv("DB_HOST")
+DB_PORT = int(os.getenv("DB_PORT", "5432"))
+DB_NAME = os.getenv("DB_NAME", "bd_relacional")
+DB_USER = os.getenv("DB_USER", "postgres")
+DB_PASS = os.getenv("DB_PASS")
+
+def make_engine():
+    url = f"postgresql+psycopg2://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}?sslmode=require"
+    return create_engine(url, pool_pre_ping=True)
+
+_engine = None
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        _engine = make_engine()
+    return _engine
+
+# ------------------------------
+# Consulta única (UNION ALL das views de painel)
+# ------------------------------
+# grupo = o mesmo GROUPING(uf, faixa, sexo, escolaridade_grp) da consulta
+# antiga sobre a silver (bit = 1 quando a coluna NÃO faz parte do grupo):
+# painel_offline e cubo produzem esse mesmo formato longo.
+_MESES = "WHERE referencia = ANY(CAST(:meses AS date[]))"
+SQL_PAINEIS = f"""
+SELECT 15 AS grupo, referencia, NULL::smallint AS uf, NULL::text AS faixa,
+       NULL::smallint AS sexo, NULL::text AS escolaridade_grp, n,
+       prop_falta_ar, prop_dor_peito, prop_algum_sintoma, prop_plano_saude, prop_60mais,
+       NULL::float AS prop_buscou, prop_internou_entre_buscou
+FROM public.pnad_covid_painel_mensal {_MESES}
+UNION ALL
+SELECT 7, referencia, uf, NULL, NULL, NULL, n,
+       prop_falta_ar, NULL, prop_algum_sintoma, NULL, NULL, NULL, prop_internou_entre_buscou
+FROM public.pnad_covid_painel_uf {_MESES}
+UNION ALL
+SELECT 11, referencia, NULL, faixa, NULL, NULL, n,
+       prop_falta_ar, prop_dor_peito, NULL, NULL, NULL, NULL, prop_internou_entre_buscou
+FROM public.pnad_covid_painel_faixa {_MESES}
+UNION ALL
+SELECT 13, referencia, NULL, NULL, sexo, NULL, n,
+       NULL, NULL, prop_algum_sintoma, NULL, NULL, NULL, NULL
+FROM public.pnad_covid_painel_sexo {_MESES}
+UNION ALL
+SELECT 14, referencia, NULL, NULL, NULL, escolaridade_grp, n,
+       NULL, NULL, NULL, prop_plano_saude, NULL, prop_buscou, NULL
+FROM public.pnad_covid_painel_escolaridade {_MESES}
+"""
+
+# painel -> (valor de GROUPING, chave, colunas {origem: destino})
+PAINEIS = {
+    "mensal": (0b1111, [], {
+        "prop_falta_ar": "prop_falta_ar", "prop_dor_peito": "prop_dor_peito",
+        "prop_algum_sintoma": "prop_algum_sintoma", "prop_plano_saude": "prop_plano_saude",
+        "prop_60mais": "prop_60mais", "prop_internou_entre_buscou": "prop_internou_entre_buscou"}),
+    "uf": (0b0111, ["uf"], {
+        "prop_falta_ar": "prop_falta_ar", "prop_algum_sintoma": "prop_algum_sintoma",
+        "prop_internou_entre_buscou": "prop_internou_entre_buscou"}),
+    "faixa": (0b1011, ["faixa"], {
+        "prop_falta_ar": "prop_falta_ar", "prop_dor_peito": "prop_dor_peito",
+        "prop_internou_entre_buscou": "prop_internou_entre_buscou"}),
+    "sexo": (0b1101, ["sexo"], {
+        "prop_algum_sintoma": "prop_algum_sintoma"}),
+    "escolar": (0b1110, ["escolaridade_grp"], {
+        "prop_plano_saude": "prop_plano", "prop_buscou": "prop_buscou"}),
+}
+
+SEXO_LABEL = {1: "Homem", 2: "Mulher"}
+
+def fetch_paineis(meses) -> pd.DataFrame:
+    """Roda a consulta única no banco e devolve o resultado 'longo' (todas as linhas)."""
+    with get_engine().connect() as conn:
+        return pd.read_sql(text(SQL_PAINEIS), conn, params={"meses": list(meses)})
+
+def split_paineis(df: pd.DataFrame) -> dict:
+    """Separa o resultado longo nos DataFrames que o graficos.py espera."""
+    out = {}
+    for nome, (grupo, chave, colunas) in PAINEIS.items():
+        parte = df[df["grupo"] == grupo]
+        parte = parte[["referencia"] + chave + list(colunas)].rename(columns=colunas)
+        if nome == "sexo":
+            parte = parte.assign(sexo=parte["sexo"].map(SEXO_LABEL).fillna("Sem info"))
+        out[nome] = parte.sort_values(["referencia"] + chave).reset_index(drop=True)
+    return out
+
+# ------------------------------
+# Cache local
+# ------------------------------
+def load_marker():
+    """
+    Marcador da última carga: max(atualizado_em) das cargas com status ok
+    no manifesto do banco (muda a cada swap, seja qual for a máquina que
+    carregou). Sem acesso ao manifesto, usa o ultima_carga.json local.
+    None = sem cache.
+    """
+    try:
+        with get_engine().connect() as conn:
+            ultimo = conn.execute(text(f"SELECT max(atualizado_em) FROM public.{MANIFEST_TABLE} "
+                                       "WHERE status = 'ok'")).scalar()
+        if ultimo is not None:
+            return str(ultimo)
+    except Exception as exc:
+        log.warning("Manifesto %s indisponível (%s); usando %s.", MANIFEST_TABLE, exc, LOAD_MARKER)
+    if os.path.isfile(LOAD_MARKER):
+        with open(LOAD_MARKER, encoding="utf-8") as f:
+            return f.read()
+    return None
+
+def cache_path(marker: str, meses) -> str:
+    chave = hashlib.sha256("\n".join([marker, SQL_PAINEIS, *meses]).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, f"paineis_{chave}.parquet")
+
+def carregar_paineis(meses, usar_cache: bool = True) -> dict:
+    """Dict {mensal, uf, faixa, sexo, escolar} -> DataFrame; do cache quando ainda vale."""
+    meses = [str(m) for m in meses]
+    marker = load_marker() if usar_cache and HAS_PARQUET else None
+    path = cache_path(marker, meses) if marker is not None else None
+
+    if path and os.path.isfile(path):
+        log.info("Painéis lidos de %s (sem consulta às views de painel)", path)
+        return split_paineis(pd.read_parquet(path))
+
+    df = fetch_paineis(meses)
+    if path:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        for antigo in glob.glob(os.path.join(CACHE_DIR, "paineis_*.parquet")):
+            os.remove(antigo)   # marcador mudou: caches antigos não valem mais
+        tmp = path + ".tmp"
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        log.info("Painéis consultados no banco e salvos em %s", path)
+    return split_paineis(df)
@@ -0,0 +1,251 @@
+# ============================================================
+# painel_offline.py — Painéis sem banco (NumPy direto dos CSVs)
+# ============================================================
+# Objetivo:
+# 1) Calcular os mesmos painéis de pnad_covid_painel_* (e os de sexo /
+#    escolaridade do paineis.py) sem Postgres: lê cada mês com
+#    main.read_source_frame (cache Parquet, só as colunas usadas)
+# 2) Reproduzir a silver em arrays (mesmas regras de SILVER_FLAGS /
+#    SILVER_CODES / SILVER_DERIVED do main.py; NULL = NaN)
+# 3) Agregar com chaves inteiras + np.bincount (sem groupby): COUNT(*),
+#    AVG ignorando NULL e SUM(procurou=1 AND internou=1) / SUM(procurou)
+# 4) Devolver o resultado "longo" no mesmo formato da consulta do
+#    paineis.py (coluna grupo = GROUPING(...)) -> split_paineis serve igual
+#
+# Uso:
+#   python painel_offline.py                        # resumo dos painéis de data/
+#   python painel_offline.py --meses 2020-11-01 --saida paineis.parquet
+#   python painel_offline.py --verificar            # compara com o banco (.env)
+#   python graficos.py --offline                    # gráficos sem banco
+# ============================================================
+
+import sys
+import time
+import argparse
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+
+import main
+from paineis import PAINEIS, split_paineis
+
+FAIXAS = ["<20", "20-39", "40-59", "60+", "sem_idade"]
+ESCOLARIDADE_GRP = ["Fundamental", "Médio", "Superior+", "Sem info"]
+
+# colunas de origem usadas pelos painéis (nomes já limpos, como na staging)
+CODIGOS = list(main.SILVER_CODES)   # idade, sexo, escolaridade, uf (+ os usados em correlacoes.py)
+COLUNAS_ORIGEM = list(main.SILVER_FLAGS.values()) + [main.SILVER_CODES[c] for c in CODIGOS]
+
+# métrica do painel -> coluna da silver (AVG)
+MEDIAS = {
+    "prop_falta_ar": "falta_ar",
+    "prop_dor_peito": "dor_peito",
+    "prop_algum_sintoma": "tem_algum_sintoma",
+    "prop_plano_saude": "plano",
+    "prop_60mais": "idoso",
+    "prop_buscou": "procurou",
+}
+
+# ------------------------------
+# Leitura e "silver" em arrays
+# ------------------------------
+def ler_mes(csv_path: str) -> pd.DataFrame:
+    """Só as COLUNAS_ORIGEM que existem no mês (do cache Parquet quando válido)."""
+    opts = main._cache_opts(main.TYPE_INFERENCE, main.COMPACT_TYPES)
+    meta = main._cache_meta(csv_path, opts)
+    if meta is not None:
+        return main.read_source_frame(csv_path, columns=[c for c in COLUNAS_ORIGEM if c in meta["tipos_sql"]])
+    df = main.read_source_frame(csv_path)   # 1ª leitura: parseia tudo e grava o cache
+    return df[[c for c in COLUNAS_ORIGEM if c in df.columns]]
+
+def _numero(df: pd.DataFrame, col: str) -> np.ndarray:
+    """NULLIF(col::text,'')::int como float64 (NULL / coluna ausente = NaN)."""
+    if col not in df.columns:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+def _flag(x: np.ndarray) -> np.ndarray:
+    """(código = 1)::int mantendo NULL."""
+    return np.where(np.isnan(x), np.nan, (x == 1).astype("float64"))
+
+def silver_arrays(df: pd.DataFrame) -> dict:
+    """Colunas da silver usadas nos painéis, como arrays float64 (NaN = NULL)."""
+    s = {name: _flag(_numero(df, col)) for name, col in main.SILVER_FLAGS.items()}
+    s.update({name: _numero(df, main.SILVER_CODES[name]) for name in CODIGOS})
+
+    # GREATEST ignora NULL; COALESCE(..., 0) -> nunca nulo
+    s["tem_algum_sintoma"] = np.any(np.stack([s[f] == 1 for f in main.SINTOMA_FLAGS]), axis=0).astype("float64")
+    idade = s["idade"]
+    s["idoso"] = np.where(np.isnan(idade), np.nan, (idade >= 60).astype("float64"))
+    # faixa / escolaridade_grp como índices em FAIXAS / ESCOLARIDADE_GRP (o CASE cai no ELSE com NULL)
+    s["faixa"] = np.select([idade < 20, idade <= 39, idade <= 59, idade >= 60], [0, 1, 2, 3], default=4)
+    esc = s["escolaridade"]
+    s["escolaridade_grp"] = np.select([(esc >= 1) & (esc <= 2), (esc >= 3) & (esc <= 4), esc >= 5],
+                                      [0, 1, 2], default=3)
+    return s
+
+# ------------------------------
+# Agregação (bincount)
+# ------------------------------
+def _chave_codigo(x: np.ndarray):
+    """Código com NULL -> (chave inteira por linha, rótulo de cada chave)."""
+    nulo = np.isnan(x)
+    rotulos, chave = np.unique(np.where(nulo, -1, x), return_inverse=True)
+    rotulos = np.where(rotulos == -1, np.nan, rotulos) if nulo.any() else rotulos
+    return chave, rotulos
+
+def _chave(s: dict, coluna):
+    if coluna is None:
+        return np.zeros(len(s["idade"]), dtype=np.intp), np.array([None], dtype=object)
+    if coluna == "faixa":
+        return s["faixa"], np.array(FAIXAS, dtype=object)
+    if coluna == "escolaridade_grp":
+        return s["escolaridade_grp"], np.array(ESCOLARIDADE_GRP, dtype=object)
+    return _chave_codigo(s[coluna])
+
+def _media(chave, n_grupos, x):
+    """AVG(x) por grupo ignorando NULL (NaN quando o grupo só tem NULL)."""
+    ok = ~np.isnan(x)
+    soma = np.bincount(chave[ok], weights=x[ok], minlength=n_grupos)
+    cont = np.bincount(chave[ok], minlength=n_grupos)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(cont > 0, soma / cont, np.nan)
+
+def agregar(s: dict, chave: np.ndarray, n_grupos: int) -> dict:
+    """Métricas do painel para cada grupo de `chave` (0..n_grupos-1)."""
+    out = {"n": np.bincount(chave, minlength=n_grupos)}
+    for metrica, col in MEDIAS.items():
+        out[metrica] = _media(chave, n_grupos, s[col])
+    internou = (s["procurou"] == 1) & (s["internou"] == 1)
+    num = np.bincount(chave, weights=internou, minlength=n_grupos)
+    den = np.bincount(chave, weights=np.nan_to_num(s["procurou"]), minlength=n_grupos)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out["prop_internou_entre_buscou"] = np.where(den > 0, num / den, np.nan)
+    return out
+
+def paineis_mes(df: pd.DataFrame, ref: str) -> pd.DataFrame:
+    """Linhas de todos os painéis de um mês, no formato longo do paineis.SQL_PAINEIS."""
+    s = silver_arrays(df)
+    partes = []
+    for grupo, chave_cols, _ in PAINEIS.values():
+        coluna = chave_cols[0] if chave_cols else None
+        chave, rotulos = _chave(s, coluna)
+        m = agregar(s, chave, len(rotulos))
+        presentes = m["n"] > 0            # GROUP BY só devolve grupos que existem
+        parte = pd.DataFrame({k: v[presentes] for k, v in m.items()})
+        parte.insert(0, "grupo", grupo)
+        parte.insert(1, "referencia", dt.date.fromisoformat(ref))
+        for col in ("uf", "faixa", "sexo", "escolaridade_grp"):
+            vazio = np.nan if col in ("uf", "sexo") else None
+            parte.insert(parte.columns.get_loc("n"), col,
+                         rotulos[presentes] if col == coluna else vazio)
+        partes.append(parte)
+    return pd.concat(partes, ignore_index=True)
+
+def calcular_paineis(meses=None, data_dir: str = main.DATA_DIR) -> pd.DataFrame:
+    """Resultado longo (como paineis.fetch_paineis) a partir dos CSVs de data_dir."""
+    meses = None if meses is None else [str(m) for m in meses]
+    jobs = [(csv, main.month_of(t)) for csv, t in main.discover_jobs(data_dir)]
+    jobs = [(csv, ref) for csv, ref in jobs if ref and (meses is None or ref in meses)]
+    faltando = sorted(set(meses or []) - {ref for _, ref in jobs})
+    if faltando:
+        print(f"[offline] Sem CSV em {data_dir} para: {', '.join(faltando)}")
+
+    partes = []
+    for csv, ref in jobs:
+        t0 = time.perf_counter()
+        df = ler_mes(csv)
+        t1 = time.perf_counter()
+        partes.append(paineis_mes(df, ref))
+        print(f"[offline] {ref}: {len(df):,} linhas — leitura {t1-t0:.2f}s, agregação {time.perf_counter()-t1:.3f}s")
+    if not partes:
+        raise SystemExit(f"Nenhum CSV PNAD_COVID_MMYYYY.csv em {data_dir} para os meses pedidos.")
+    return pd.concat(partes, ignore_index=True)
+
+def carregar_paineis_offline(meses, data_dir: str = main.DATA_DIR) -> dict:
+    """Mesmo retorno de paineis.carregar_paineis, sem banco."""
+    return split_paineis(calcular_paineis(meses, data_dir))
+
+# ------------------------------
+# Verificação contra o banco
+# ------------------------------
+VIEWS = {
+    "mensal": "pnad_covid_painel_mensal",
+    "uf": "pnad_covid_painel_uf",
+    "faixa": "pnad_covid_painel_faixa",
+}
+
+def comparar(nome: str, local: pd.DataFrame, banco: pd.DataFrame, chave) -> list:
+    """Diferenças entre os dois painéis (lista vazia = idênticos)."""
+    local = local.assign(referencia=pd.to_datetime(local["referencia"]))
+    banco = banco.assign(referencia=pd.to_datetime(banco["referencia"]))
+    j = local.merge(banco, on=chave, how="outer", suffixes=("", "_db"), indicator=True)
+    problemas = []
+    sobra = j[j["_merge"] != "both"]
+    if len(sobra):
+        problemas.append(f"{nome}: {len(sobra)} grupo(s) só de um lado")
+    for col in [c for c in banco.columns if c not in chave and c in local.columns]:
+        a, b = j[col].to_numpy(dtype="float64"), j[col + "_db"].to_numpy(dtype="float64")
+        difere = ~((a == b) | (np.isnan(a) & np.isnan(b)))
+        if difere.any():
+            problemas.append(f"{nome}.{col}: {int(difere.sum())} valor(es) diferentes "
+                             f"(máx |Δ| = {np.nanmax(np.abs(a - b)):.3g})")
+    return problemas
+
+def verificar(meses=None, data_dir: str = main.DATA_DIR) -> bool:
+    """Compara o cálculo offline com as views pnad_covid_painel_* e com a consulta do paineis.py."""
+    from sqlalchemy import text
+    from paineis import get_engine, fetch_paineis
+
+    longo = calcular_paineis(meses, data_dir)
+    meses = sorted({str(r) for r in longo["referencia"]})
+    local = split_paineis(longo)
+    problemas = []
+    with get_engine().connect() as conn:
+        for nome, view in VIEWS.items():
+            banco = pd.read_sql(text(f"SELECT * FROM public.{view} WHERE referencia = ANY(CAST(:meses AS date[]))"),
+                                conn, params={"meses": meses})
+            problemas += comparar(view, local[nome], banco, ["referencia"] + PAINEIS[nome][1])
+    remoto = split_paineis(fetch_paineis(meses))
+    for nome, (_, chave, _) in PAINEIS.items():
+        problemas += comparar(f"paineis.{nome}", local[nome], remoto[nome], ["referencia"] + chave)
+
+    for p in problemas:
+        print(f"[DIFERENTE] {p}")
+    if not problemas:
+        print(f"[ok] Painéis offline idênticos ao banco ({', '.join(meses)})")
+    return not problemas
+
+# ============================================================
+# CLI
+# ============================================================
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Painéis da PNAD COVID sem banco (NumPy)")
+    parser.add_argument("--data-dir", default=main.DATA_DIR, help="pasta com os PNAD_COVID_MMYYYY.csv")
+    parser.add_argument("--meses", nargs="+", metavar="AAAA-MM-01",
+                        help="meses de referência (padrão: todos os CSVs encontrados)")
+    parser.add_argument("--saida", help="grava o resultado longo em Parquet (ou .csv)")
+    parser.add_argument("--verificar", action="store_true",
+                        help="compara com pnad_covid_painel_* no Postgres do .env")
+    return parser.parse_args(argv)
+
+def run(argv=None):
+    args = parse_args(argv)
+    if args.verificar:
+        return 0 if verificar(args.meses, args.data_dir) else 1
+
+    longo = calcular_paineis(args.meses, args.data_dir)
+    if args.saida:
+        if args.saida.endswith(".csv"):
+            longo.to_csv(args.saida, index=False)
+        else:
+            longo.to_parquet(args.saida, index=False)
+        print(f"[offline] Resultado salvo em {args.saida}")
+    for nome, df in split_paineis(longo).items():
+        print(f"\n== {nome} ({len(df)} linhas)")
+        print(df.to_string(index=False, max_rows=20))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,237 @@
+# ============================================================
+# pgcopy.py — Encoder de COPY BINARY (formato PGCOPY) com NumPy
+# ============================================================
+# Objetivo:
+# 1) Montar o buffer binário do COPY direto dos arrays NumPy do chunk
+#    (sem passar por texto CSV dos dois lados)
+# 2) NULL via máscara (pd.isna) — campo com tamanho -1
+# 3) Tipos suportados = os que infer_sqlalchemy_dtypes gera:
+#    Integer, BigInteger, Float, Boolean, DateTime, Text (+ SmallInteger)
+#
+# Layout (https://www.postgresql.org/docs/current/sql-copy.html):
+#   cabeçalho: "PGCOPY\n\377\r\n\0" + int32 flags + int32 extensão
+#   cada linha: int16 nº de campos + (int32 tamanho + bytes) por campo
+#   trailer: int16 -1
+# Todos os inteiros em big-endian (network order).
+#
+# Uso como benchmark (CSV x BINARY):
+#   python pgcopy.py --rows 200000 --cols 150 [--db]
+# ============================================================
+
+import time
+import argparse
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.types import SmallInteger, Integer, BigInteger, Float, Boolean, DateTime
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + (0).to_bytes(4, "big") + (0).to_bytes(4, "big")
+PGCOPY_TRAILER = (-1).to_bytes(2, "big", signed=True)
+
+# timestamp do Postgres = microssegundos desde 2000-01-01
+_PG_EPOCH_US = np.datetime64("2000-01-01", "us").astype(np.int64)
+
+
+BLOCK_ROWS = 16_384          # linhas montadas por vez (limita a memória da matriz temporária)
+BLOCK_BYTES = 64 * 1024**2   # teto da matriz do bloco (linhas x soma das larguras máximas)
+
+
+def _int_values(s: pd.Series, dtype: str) -> np.ndarray:
+    """
+    Inteiros conferidos contra a faixa do tipo SQL: o astype do NumPy dá a
+    volta em silêncio (40000 -> -25536 em int2) e trunca float não inteiro.
+    Levanta ValueError — serialize_chunk cai para o CSV, e o Postgres acusa.
+    """
+    info = np.iinfo(dtype)
+    if pd.api.types.is_integer_dtype(s):
+        vals = s.to_numpy(dtype="int64", na_value=0)
+        fora = len(vals) > 0 and (vals.min() < info.min or vals.max() > info.max)
+    else:
+        f = s.to_numpy(dtype="float64", na_value=0.0)
+        if not np.all(np.floor(f) == f):
+            raise ValueError(f"coluna {s.name!r}: valores não inteiros para {dtype}")
+        # -info.min = 2^(bits-1) é exato em float64 (info.max não é, no int64)
+        fora = len(f) > 0 and (f.min() < info.min or f.max() >= -float(info.min))
+        vals = f if fora else f.astype("int64")
+    if fora:
+        raise ValueError(f"coluna {s.name!r}: valores fora da faixa de {dtype} "
+                         f"({info.min}..{info.max})")
+    return vals.astype(np.dtype(dtype).newbyteorder(">"))
+
+
+def _fixed_width(s: pd.Series, sql_type):
+    """Devolve (máscara de nulos, matriz uint8 (n, largura)) para tipos de largura fixa."""
+    mask = s.isna().to_numpy()
+    if isinstance(sql_type, SmallInteger):
+        vals = _int_values(s, "int16")
+    elif isinstance(sql_type, BigInteger):
+        vals = _int_values(s, "int64")
+    elif isinstance(sql_type, Integer):
+        vals = _int_values(s, "int32")
+    elif isinstance(sql_type, Float):
+        vals = s.to_numpy(dtype="float64", na_value=np.nan).astype(">f8")
+    elif isinstance(sql_type, Boolean):
+        vals = s.to_numpy(dtype="uint8", na_value=0).astype("u1")
+    elif isinstance(sql_type, DateTime):
+        us = s.to_numpy(dtype="datetime64[us]").astype(np.int64)
+        vals = (us - _PG_EPOCH_US).astype(">i8")
+    else:
+        return None
+    width = vals.dtype.itemsize
+    return mask, vals.view(np.uint8).reshape(-1, width)
+
+
+def _text(s: pd.Series):
+    """Devolve (máscara de nulos, bytes UTF-8 por linha, tamanhos) para colunas texto."""
+    mask = s.isna().to_numpy().copy()
+    values = s.astype(object).where(~mask, "").astype(str)
+    # o caminho CSV grava '' sem aspas -> NULL; mantemos a mesma semântica
+    mask |= (values == "").to_numpy()
+    encoded = np.array([v.encode("utf-8") for v in values], dtype=object)
+    lens = np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded))
+    return mask, encoded, lens
+
+
+def _slot_width(slot, a: int, b: int) -> int:
+    """Largura do campo no bloco [a, b): fixa, ou o maior texto só deste bloco."""
+    _, data, lens = slot
+    if lens is None:
+        return data.shape[1]
+    return int(lens[a:b].max(initial=0))
+
+
+def _block_rows(slots, a: int, n: int) -> int:
+    """
+    Linhas do bloco que começa em `a`: até BLOCK_ROWS, cortando pela metade
+    enquanto linhas x largura passar de BLOCK_BYTES (um texto enorme não
+    infla a matriz do chunk inteiro). Um bloco tem pelo menos 1 linha.
+    """
+    m = min(BLOCK_ROWS, n - a)
+    while m > 1 and m * (2 + sum(4 + _slot_width(sl, a, a + m) for sl in slots)) > BLOCK_BYTES:
+        m //= 2
+    return m
+
+
+def encode_pgcopy(df: pd.DataFrame, sql_types: dict) -> bytes:
+    """
+    Codifica o DataFrame inteiro em PGCOPY. `sql_types` é o mesmo dict
+    {coluna: tipo SQLAlchemy} usado para criar a staging.
+    Levanta TypeError se a coluna não tiver tipo conhecido.
+
+    Cada bloco de linhas vira uma matriz uint8 "larga" (todo campo na
+    largura máxima do bloco) + uma máscara do que existe de fato; P[K]
+    achata linha a linha e descarta o que é nulo/padding — tudo vetorizado.
+    A matriz fica em ~BLOCK_BYTES (ver _block_rows); só uma linha sozinha
+    mais larga que isso passa do teto.
+    """
+    n = len(df)
+    slots = []
+    for col in df.columns:
+        sql_type = sql_types.get(col)
+        if sql_type is None:
+            raise TypeError(f"sem tipo SQL para a coluna {col!r}")
+        fixed = _fixed_width(df[col], sql_type)
+        if fixed is not None:
+            mask, data = fixed
+            slots.append((mask, data, None))
+        else:
+            slots.append(_text(df[col]))
+
+    ncols = np.frombuffer(len(df.columns).to_bytes(2, "big"), dtype=np.uint8)
+
+    parts = [PGCOPY_HEADER]
+    a = 0
+    while a < n:
+        m = _block_rows(slots, a, n)
+        b = a + m
+        widths = [_slot_width(sl, a, b) for sl in slots]
+        width = 2 + sum(4 + w for w in widths)
+        wide = np.empty((m, width), dtype=np.uint8)
+        keep = np.ones((m, width), dtype=bool)
+        wide[:, 0:2] = ncols
+        pos = 2
+        for (mask, data, lens), w in zip(slots, widths):
+            blk_mask = mask[a:b]
+            field_len = np.full(m, w, dtype=np.int64) if lens is None else lens[a:b].copy()
+            field_len[blk_mask] = -1
+            wide[:, pos:pos+4] = field_len.astype(">i4").view(np.uint8).reshape(-1, 4)
+            if lens is None:
+                wide[:, pos+4:pos+4+w] = data[a:b]
+                keep[:, pos+4:pos+4+w] = ~blk_mask[:, None]
+            elif w:
+                texto = np.array(data[a:b].tolist(), dtype=f"S{w}")
+                wide[:, pos+4:pos+4+w] = texto.view(np.uint8).reshape(-1, w)
+                keep[:, pos+4:pos+4+w] = np.arange(w) < np.maximum(field_len, 0)[:, None]
+            pos += 4 + w
+        parts.append(wide[keep].tobytes())
+        a = b
+    parts.append(PGCOPY_TRAILER)
+    return b"".join(parts)
+
+
+def encode_pgcopy_buffer(df: pd.DataFrame, sql_types: dict) -> BytesIO:
+    """encode_pgcopy embrulhado em BytesIO (pronto para copy_expert)."""
+    return BytesIO(encode_pgcopy(df, sql_types))
+
+
+# ============================================================
+# BENCHMARK — CSV (StringIO) x BINARY (PGCOPY)
+# ============================================================
+def _synthetic_frame(rows: int, cols: int, seed: int = 0) -> pd.DataFrame:
+    """Frame com cara de PNAD: códigos pequenos, alguns nulos, uma coluna float e uma texto."""
+    rng = np.random.default_rng(seed)
+    data = {f"c{i:03d}": rng.choice([1, 2, 9], rows) for i in range(max(cols - 2, 0))}
+    peso = rng.gamma(2.0, 150.0, rows)
+    peso[rng.random(rows) < 0.05] = np.nan
+    data["peso"] = peso
+    data["obs"] = rng.choice(["sim", "nao", ""], rows)
+    return pd.DataFrame(data)
+
+
+def benchmark(rows: int, cols: int, use_db: bool = False, repeat: int = 3):
+    import main  # import tardio: só o benchmark depende do loader
+
+    df = _synthetic_frame(rows, cols)
+    sql_types = main.infer_sqlalchemy_dtypes(df)
+    results = {}
+    for fmt in ("csv", "binary"):
+        best = float("inf")
+        for _ in range(repeat):
+            t = time.perf_counter()
+            buf = main.serialize_chunk(df, copy_format=fmt, sql_types=sql_types)
+            best = min(best, time.perf_counter() - t)
+        size = len(buf.getvalue())
+        results[fmt] = {"serializacao_s": best, "bytes": size}
+
+    if use_db:
+        main.check_db_env()
+        engine = main.make_engine(main.DB_NAME)
+        table = "pgcopy_benchmark"
+        try:
+            for fmt in ("csv", "binary"):
+                main.create_staging(engine, table, df.iloc[0:0], sql_types)
+                t = time.perf_counter()
+                with engine.begin() as conn:
+                    main.copy_chunk(conn, df, table, copy_format=fmt, sql_types=sql_types)
+                results[fmt]["copy_total_s"] = time.perf_counter() - t
+        finally:
+            with engine.begin() as conn:
+                conn.exec_driver_sql(f'DROP TABLE IF EXISTS public."{table}"')
+            engine.dispose()
+
+    print(f"{rows} linhas x {cols} colunas")
+    for fmt, r in results.items():
+        extra = f" | COPY total {r['copy_total_s']:.3f}s" if "copy_total_s" in r else ""
+        print(f"  {fmt:6s} serialização {r['serializacao_s']:.3f}s | {r['bytes']/1e6:.1f} MB "
+              f"| {rows / r['serializacao_s']:,.0f} linhas/s{extra}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark COPY CSV x BINARY")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--cols", type=int, default=150)
+    parser.add_argument("--db", action="store_true", help="também mede o COPY no Postgres do .env")
+    args = parser.parse_args()
+    benchmark(args.rows, args.cols, use_db=args.db)
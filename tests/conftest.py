@@ -0,0 +1,26 @@
+# ============================================================
+# conftest.py — Testes sem banco: importa os módulos da raiz do projeto
+# ============================================================
+# O main.py lê a conexão do .env no import; aqui bastam valores de mentira
+# (nenhum teste abre conexão com o Postgres). Cada teste roda numa pasta
+# temporária: os caches relativos (data/.cache) não tocam no projeto.
+#
+# Uso:
+#   python -m pytest -q
+# ============================================================
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for var, valor in {"DB_HOST": "localhost", "DB_PORT": "5432", "DB_NAME": "teste",
+                   "DB_USER": "teste", "DB_PASS": "teste"}.items():
+    os.environ.setdefault(var, valor)
+
+@pytest.fixture(autouse=True)
+def pasta_temporaria(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
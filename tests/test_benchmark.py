@@ -0,0 +1,17 @@
+# ============================================================
+# test_benchmark.py — Argumentos do benchmark
+# ============================================================
+
+import pytest
+
+import benchmark
+
+@pytest.mark.parametrize("repeat", ["0", "-1"])
+def test_repeat_precisa_de_ao_menos_uma_execucao(repeat, capsys):
+    with pytest.raises(SystemExit) as exc:
+        benchmark.parse_args(["--repeat", repeat])
+    assert exc.value.code == 2
+    assert "--repeat" in capsys.readouterr().err
+
+def test_repeat_padrao():
+    assert benchmark.parse_args([]).repeat == 1
@@ -0,0 +1,39 @@
+# ============================================================
+# test_cache_json.py — Caches JSON compartilhados pelos processos do --workers
+# ============================================================
+
+import os
+import json
+import multiprocessing
+
+import pytest
+
+import main
+
+def _gravar(path: str, processo: int, n: int):
+    for i in range(n):
+        with main._update_json(path) as cache:
+            cache[f"{processo}-{i}"] = i
+
+@pytest.mark.skipif(main.fcntl is None, reason="flock indisponível (Windows)")
+def test_update_json_concorrente_nao_perde_entradas(tmp_path):
+    path = str(tmp_path / "cache" / "dialetos.json")
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_gravar, args=(path, p, 50)) for p in range(3)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+    with open(path, encoding="utf-8") as f:
+        cache = json.load(f)
+    assert len(cache) == 150
+    assert not [n for n in os.listdir(os.path.dirname(path)) if n.endswith(".tmp")]
+
+def test_save_json_com_erro_nao_deixa_temporario(tmp_path):
+    path = str(tmp_path / "cache" / "x.json")
+    main._save_json(path, {"a": 1})
+    with pytest.raises(TypeError):
+        main._save_json(path, {"b": object()})   # não serializável
+    assert main._load_json(path) == {"a": 1}
+    assert os.listdir(os.path.dirname(path)) == ["x.json"]
@@ -0,0 +1,69 @@
+# ============================================================
+# test_cache_parquet.py — Cache Parquet dos CSVs já parseados
+# ============================================================
+
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy.types import SmallInteger, Float, Text
+
+import main
+
+pq = pytest.importorskip("pyarrow.parquet")
+pa = pytest.importorskip("pyarrow")
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "PNAD_COVID_112020.csv"
+    path.write_text("UF;A002\n35;40\n", encoding="utf-8")
+    return str(path)
+
+TIPOS = {"uf": SmallInteger(), "peso": Float(asdecimal=False), "obs": Text()}
+
+def _frame(n: int = 5) -> pd.DataFrame:
+    return pd.DataFrame({"uf": pd.array(range(n), dtype="Int16"),
+                         "peso": [0.5 * i for i in range(n)],
+                         "obs": ["x"] * n})
+
+def test_cache_ida_e_volta_com_tipos(csv_path):
+    opts = main._cache_opts("sample", True)
+    main.write_parquet_cache(csv_path, _frame(), TIPOS, opts)
+
+    df, tipos = main.read_parquet_cache(csv_path, opts)
+    pd.testing.assert_frame_equal(df, _frame())
+    assert {c: type(t) for c, t in tipos.items()} == {c: type(t) for c, t in TIPOS.items()}
+
+def test_cache_invalido_se_csv_ou_opcoes_mudam(csv_path):
+    opts = main._cache_opts("sample", False)
+    main.write_parquet_cache(csv_path, _frame(), TIPOS, opts)
+    assert main.read_parquet_cache(csv_path, main._cache_opts("full", False)) is None
+
+    with open(csv_path, "a", encoding="utf-8") as f:
+        f.write("53;20\n")
+    assert main.read_parquet_cache(csv_path, opts) is None
+
+def test_tee_publica_so_se_todos_os_chunks_passam(csv_path):
+    opts = main._cache_opts("sample", False)
+    chunks = [_frame(3), _frame(3).assign(uf=pd.array([7, 8, 9], dtype="Int16"))]
+    assert len(list(main.tee_parquet_cache(iter(chunks), csv_path, TIPOS, opts))) == 2
+    df, _ = main.read_parquet_cache(csv_path, opts)
+    assert df["uf"].tolist() == [0, 1, 2, 7, 8, 9]
+
+    os.remove(main.parquet_cache_path(csv_path))
+    ruim = [_frame(3), _frame(3).assign(uf=["a", "b", "c"])]   # não cabe no esquema do 1º chunk
+    assert len(list(main.tee_parquet_cache(iter(ruim), csv_path, TIPOS, opts))) == 2
+    assert not os.path.exists(main.parquet_cache_path(csv_path))
+
+@pytest.mark.parametrize("start_row", [0, 1, 69, 70, 99, 100, 101, 130, 199, 249, 250])
+def test_parquet_retoma_pelo_numero_de_linhas(monkeypatch, csv_path, start_row):
+    monkeypatch.setattr(main, "CHUNK_SIZE", 70)   # lotes cruzam os row groups de 100 linhas
+    os.makedirs(main.CACHE_DIR, exist_ok=True)
+    tabela = pa.table({"linha": list(range(250))})
+    pq.write_table(tabela, main.parquet_cache_path(csv_path), row_group_size=100)
+
+    chunks = list(main.iter_parquet_chunks(csv_path, start_row=start_row))
+    linhas = pd.concat(chunks)["linha"].tolist() if chunks else []
+    assert linhas == list(range(start_row, 250))
+    assert all(0 < len(c) <= 70 for c in chunks)
@@ -0,0 +1,78 @@
+# ============================================================
+# test_compacto.py — Modo --compact-types: faixas, tipos estreitos e memória
+# ============================================================
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.types import SmallInteger, Integer, BigInteger, Text
+
+import main
+
+@pytest.mark.parametrize("mn, mx, esperado", [
+    (0, 127, "int8"),
+    (-128, 5, "int8"),
+    (0, 128, "int16"),
+    (-2**15, 2**15 - 1, "int16"),
+    (0, 2**15, "int32"),
+    (0, 2**31, "int64"),
+])
+def test_faixa_escolhe_o_menor_inteiro(mn, mx, esperado):
+    assert main._narrow_int_kind(mn, mx) == esperado
+
+def test_compact_schema_usa_as_faixas():
+    schema = {
+        "colunas": ["UF", "A002", "Peso", "Grande", "Sexo", "Obs"],
+        "tipos": {"UF": "int32", "A002": "float", "Peso": "float", "Grande": "int64",
+                  "Sexo": "text", "Obs": "text"},
+        "stats": {
+            "UF": {"min": 11, "max": 53, "inteira": True},
+            "A002": {"min": 0.0, "max": 110.0, "inteira": True},     # float só por causa de NaN
+            "Peso": {"min": 0.5, "max": 900.2, "inteira": False},
+            "Grande": {"min": 0, "max": 2**40, "inteira": True},
+            "Sexo": {"distintos": ["1", "2"]},
+            "Obs": {"distintos": None},                              # muitos valores
+        },
+    }
+    tipos = main.compact_schema(schema)["tipos"]
+    assert tipos == {"UF": "int8", "A002": "int8", "Peso": "float", "Grande": "int64",
+                     "Sexo": "category", "Obs": "text"}
+
+    sql = main.schema_sql_dtypes(dict(schema, tipos=tipos))
+    assert isinstance(sql["uf"], SmallInteger)
+    assert isinstance(sql["grande"], BigInteger)
+    assert isinstance(sql["sexo"], Text)
+    assert schema["tipos"]["UF"] == "int32"        # não altera o esquema original
+
+def test_merge_stats_de_dois_chunks():
+    a = {"min": 1, "max": 10, "inteira": True}
+    b = {"min": -3, "max": 4.5, "inteira": False}
+    assert main._merge_stats(a, b) == {"min": -3, "max": 10, "inteira": False}
+    assert main._merge_stats({"distintos": ["1"]}, {"distintos": ["2"]}) == {"distintos": ["1", "2"]}
+
+def test_valor_fora_da_faixa_compacta_e_recusado():
+    schema = {"colunas": ["UF"], "tipos": {"UF": "int8"}}
+    df = pd.DataFrame({"UF": pd.array([11, 300], dtype="Int64")})
+    with pytest.raises(main.SchemaMismatch, match="int8"):
+        main.apply_schema(df, schema)
+
+def test_compact_frame_e_relatorio_de_memoria():
+    n = 1000
+    df = pd.DataFrame({
+        "uf": np.tile([11, 35, 53, 29], n // 4).astype("int64"),
+        "idade": np.where(np.arange(n) % 10 == 0, np.nan, np.arange(n) % 90),
+        "sexo": np.tile(["Homem", "Mulher"], n // 2).astype(object),
+        "peso": np.linspace(0.5, 10.5, n),
+    })
+    antes, _ = main.memory_report(df)
+
+    df = main.compact_frame(df)
+    assert str(df["uf"].dtype) == "Int8"
+    assert str(df["idade"].dtype) == "Int8"
+    assert isinstance(df["sexo"].dtype, pd.CategoricalDtype)
+    assert df["peso"].dtype == np.float64
+    assert df["idade"].isna().sum() == n // 10
+
+    atual, largo = main.memory_report(df)
+    assert atual < largo
+    assert atual < antes
@@ -0,0 +1,145 @@
+# ============================================================
+# test_copy_paralelo.py — COPY de um arquivo em N conexões (sem banco)
+# ============================================================
+
+import threading
+
+import pandas as pd
+import pytest
+
+import main
+
+class _Transacao:
+    def __init__(self, conn):
+        self.conn = conn
+        self.estado = "aberta"
+        self.inicio = len(conn.copiadas)   # linhas da conexão antes desta transação
+
+    def commit(self):
+        if self.conn.engine.falha_commit == self.conn.i:
+            raise RuntimeError("commit falhou")
+        self.estado = "commit"
+        self.linhas = len(self.conn.copiadas) - self.inicio
+
+    def rollback(self):
+        self.estado = "rollback"
+
+class _Conexao:
+    def __init__(self, engine, i):
+        self.engine, self.i = engine, i
+        self.copiadas = []
+        self.fechada = False
+
+    def begin(self):
+        trans = _Transacao(self)
+        self.engine.transacoes.append(trans)
+        return trans
+
+    def execute(self, sql, params=None):
+        self.engine.sql.append(str(sql))
+
+    def close(self):
+        self.fechada = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class _Engine:
+    def __init__(self, falha_commit=None):
+        self.conexoes, self.transacoes, self.sql = [], [], []
+        self.falha_commit = falha_commit
+        self.lock = threading.Lock()
+
+    def connect(self):
+        with self.lock:
+            conn = _Conexao(self, len(self.conexoes))
+            self.conexoes.append(conn)
+            return conn
+
+    begin = connect
+
+    def confirmadas(self) -> int:
+        return sum(t.linhas for t in self.transacoes if t.estado == "commit")
+
+def _chunks(n: int, linhas: int = 10):
+    for c in range(n):
+        yield pd.DataFrame({"id": range(c * linhas, (c + 1) * linhas)})
+
+@pytest.fixture
+def copia(monkeypatch):
+    """copy_chunk falso: guarda os ids na conexão; falha no chunk que começa em `falhar_em`."""
+    estado = {"falhar_em": None}
+
+    def falso_copy(conn, chunk, table_name, **kw):
+        if chunk["id"].iloc[0] == estado["falhar_em"]:
+            raise RuntimeError("COPY falhou")
+        conn.copiadas.extend(chunk["id"].tolist())
+
+    monkeypatch.setattr(main, "copy_chunk", falso_copy)
+    return estado
+
+def test_todas_as_linhas_uma_vez_e_commit_em_todas(copia):
+    engine = _Engine()
+    assert main.copy_chunks_parallel(engine, _chunks(25), "t_new", connections=3) == 250
+
+    ids = sorted(i for c in engine.conexoes for i in c.copiadas)
+    assert ids == list(range(250))
+    assert len(engine.conexoes) == 3 and all(c.fechada for c in engine.conexoes)
+    assert [t.estado for t in engine.transacoes] == ["commit"] * 3
+
+def test_erro_num_worker_desfaz_todas(copia):
+    copia["falhar_em"] = 120
+    engine = _Engine()
+    with pytest.raises(RuntimeError, match="COPY falhou"):
+        main.copy_chunks_parallel(engine, _chunks(25), "t_new", connections=3)
+    assert [t.estado for t in engine.transacoes] == ["rollback"] * 3
+    assert all(c.fechada for c in engine.conexoes)
+
+def test_erro_na_leitura_desfaz_todas(copia):
+    def quebra():
+        yield from _chunks(4)
+        raise main.SchemaMismatch("linha ruim")
+
+    engine = _Engine()
+    with pytest.raises(main.SchemaMismatch):
+        main.copy_chunks_parallel(engine, quebra(), "t_new", connections=2)
+    assert [t.estado for t in engine.transacoes] == ["rollback"] * 2
+
+def test_checkpoint_confirma_tudo_que_foi_enviado(copia):
+    engine = _Engine()
+    registros = []
+
+    def on_checkpoint(linhas, chunks):
+        assert engine.confirmadas() == linhas - 1000   # tudo o que saiu já está confirmado
+        registros.append((linhas, chunks))
+
+    total = main.copy_chunks_parallel(engine, _chunks(25), "t_new", connections=3, start_rows=1000,
+                                      on_checkpoint=on_checkpoint, checkpoint_chunks=4)
+    assert total == 250
+    assert registros == [(1000 + 40 * k, 4 * k) for k in range(1, 7)] + [(1250, 25)]
+    assert sorted(i for c in engine.conexoes for i in c.copiadas) == list(range(250))
+
+def test_erro_depois_do_checkpoint_so_desfaz_o_que_esta_aberto(copia):
+    copia["falhar_em"] = 120
+    engine = _Engine()
+    registros = []
+    with pytest.raises(RuntimeError, match="COPY falhou"):
+        main.copy_chunks_parallel(engine, _chunks(25), "t_new", connections=3,
+                                  on_checkpoint=lambda l, c: registros.append(l), checkpoint_chunks=4)
+    assert registros == [40, 80, 120]   # o chunk 120 só sai depois do 3º
+    # o progresso registrado continua válido; um worker pode ter confirmado a
+    # marca seguinte antes de ver o erro (linhas a mais -> plan_load recarrega)
+    assert engine.confirmadas() >= 120
+    ultimas = {t.conn.i: t for t in engine.transacoes}
+    assert [t.estado for t in ultimas.values()] == ["rollback"] * 3
+    assert not any("TRUNCATE" in sql for sql in engine.sql)
+
+def test_commit_parcial_nao_trunca_a_staging(copia):
+    engine = _Engine(falha_commit=1)
+    with pytest.raises(RuntimeError, match="commit falhou"):
+        main.copy_chunks_parallel(engine, _chunks(6), "t_new", connections=3)
+    assert [t.estado for t in engine.transacoes] == ["commit", "aberta", "rollback"]
+    assert not any("TRUNCATE" in sql for sql in engine.sql)   # count(*) x manifesto recarrega
@@ -0,0 +1,90 @@
+# ============================================================
+# test_correlacoes.py — Correlações a partir de N / S / P (sem banco)
+# ============================================================
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import correlacoes
+
+def _indicadores(n: int, seed: int, variaveis=None) -> np.ndarray:
+    """Bloco 0/1 com NULLs (NaN) e alguma correlação entre as colunas."""
+    rng = np.random.default_rng(seed)
+    k = len(variaveis or correlacoes.INDICADORES)
+    base = rng.random(n)
+    X = (rng.random((n, k)) * 0.7 + base[:, None] * 0.5 > 0.6).astype("float64")
+    X[rng.random((n, k)) < 0.15] = np.nan
+    return X
+
+def _mesmo(a: dict, b: dict):
+    assert a["variaveis"] == b["variaveis"] and a["linhas"] == b["linhas"]
+    for m in ("n", "soma", "produto"):
+        np.testing.assert_allclose(a[m], b[m])
+
+def test_acumular_em_blocos_igual_a_uma_passada():
+    X = _indicadores(1000, 1)
+    inteiro = correlacoes.acumular(correlacoes.vazio(), X)
+    blocos = correlacoes.vazio()
+    for a in range(0, len(X), 137):
+        correlacoes.acumular(blocos, X[a:a + 137])
+    _mesmo(blocos, inteiro)
+
+def test_combinar_meses_igual_a_acumular_tudo():
+    maio, nov = _indicadores(400, 2), _indicadores(700, 3)
+    por_mes = {"2020-05-01": correlacoes.acumular(correlacoes.vazio(), maio),
+               "2020-11-01": correlacoes.acumular(correlacoes.vazio(), nov)}
+    tudo = correlacoes.acumular(correlacoes.vazio(), np.vstack([maio, nov]))
+    _mesmo(correlacoes.combinar(por_mes.values()), tudo)
+
+def test_combinar_alinha_variaveis_diferentes():
+    a = correlacoes.acumular(correlacoes.vazio(["x", "y"]), np.array([[1.0, 0.0], [1.0, 1.0]]))
+    b = correlacoes.acumular(correlacoes.vazio(["y", "z"]), np.array([[1.0, 1.0]]))
+    total = correlacoes.combinar([a, b])
+    assert total["variaveis"] == ["x", "y", "z"] and total["linhas"] == 3
+    n = pd.DataFrame(total["n"], index=total["variaveis"], columns=total["variaveis"])
+    assert n.loc["y", "y"] == 3 and n.loc["x", "z"] == 0 and n.loc["y", "z"] == 1
+
+def test_matriz_igual_ao_corr_par_a_par_do_pandas():
+    X = _indicadores(800, 4)
+    X[:, 2] = np.where(np.isnan(X[:, 2]), np.nan, 1.0)   # constante -> corr NULL
+    st = correlacoes.acumular(correlacoes.vazio(), X)
+    esperado = pd.DataFrame(X, columns=list(correlacoes.INDICADORES)).corr()
+    obtido = correlacoes.matriz(st)
+    # a diagonal de uma coluna não constante é 1 nos dois; a constante é NaN nos dois
+    pd.testing.assert_frame_equal(obtido, esperado, check_exact=False, atol=1e-12)
+
+def test_correlacoes_alvo_por_mes_e_todos():
+    por_mes = {"2020-11-01": correlacoes.acumular(correlacoes.vazio(), _indicadores(300, 5)),
+               "2020-05-01": correlacoes.acumular(correlacoes.vazio(), _indicadores(300, 6))}
+    tabela = correlacoes.correlacoes_alvo(por_mes, "internou")
+    assert tabela["escopo"].tolist() == ["2020-05-01", "2020-11-01", "todos"]
+    assert tabela["linhas"].tolist() == [300, 300, 600]
+    assert "corr_falta_ar" in tabela.columns and "corr_internou" not in tabela.columns
+    todos = correlacoes.matriz(correlacoes.combinar(por_mes.values()))
+    assert tabela.iloc[-1]["corr_falta_ar"] == pytest.approx(todos.loc["falta_ar", "internou"])
+
+class _Conexao:
+    """Guarda o SQL executado; to_regclass responde conforme `existe`."""
+    def __init__(self, existe: bool):
+        self.existe, self.sql = existe, []
+
+    def execute(self, sql, params=None):
+        self.sql.append(" ".join(str(sql).split()))
+        return self
+
+    def scalar(self):
+        return "public.pnad_covid_corr_stats" if self.existe else None
+
+@pytest.mark.parametrize("existe", [False, True])
+def test_gravar_so_cria_a_tabela_sob_advisory_lock(existe):
+    conn = _Conexao(existe)
+    st = correlacoes.vazio()
+    correlacoes.gravar(conn, "2020-11-01", st, pendente=True)
+    ddl = [i for i, sql in enumerate(conn.sql) if sql.startswith("CREATE TABLE")]
+    lock = [i for i, sql in enumerate(conn.sql) if "pg_advisory_xact_lock" in sql]
+    if existe:
+        assert ddl == [] and lock == []
+    else:
+        assert len(ddl) == 1 and lock == [ddl[0] - 1]
+    assert conn.sql[-1].startswith(f"INSERT INTO public.{correlacoes.STATS_TABLE}")
@@ -0,0 +1,100 @@
+# ============================================================
+# test_cubo.py — Roll-up do cubo x agregação direta da silver (sem banco)
+# ============================================================
+
+import datetime as dt
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+import cubo
+import painel_offline
+from paineis import split_paineis
+
+MESES = ["2020-05-01", "2020-11-01"]
+
+def _origem(seed: int, n: int = 600) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({col: rng.choice([1.0, 2.0, np.nan], n, p=[0.3, 0.6, 0.1])
+                       for col in main.SILVER_FLAGS.values()})
+    df["a002"] = rng.integers(0, 95, n).astype("float64")
+    df.loc[rng.random(n) < 0.05, "a002"] = np.nan
+    df["a003"] = rng.choice([1.0, 2.0, np.nan], n, p=[0.48, 0.48, 0.04])
+    df["a005"] = rng.choice([1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, np.nan], n)
+    df["uf"] = rng.choice([11, 29, 35, 53], n).astype("float64")
+    return df
+
+@pytest.fixture(scope="module")
+def silver() -> pd.DataFrame:
+    """Silver dos dois meses (regras de painel_offline.silver_arrays), com rótulos."""
+    partes = []
+    for i, ref in enumerate(MESES):
+        s = painel_offline.silver_arrays(_origem(i))
+        df = pd.DataFrame({k: s[k] for k in main.CUBE_FLAGS + ["uf", "sexo"]})
+        df["faixa"] = np.array(painel_offline.FAIXAS, dtype=object)[s["faixa"]]
+        df["escolaridade_grp"] = np.array(painel_offline.ESCOLARIDADE_GRP, dtype=object)[s["escolaridade_grp"]]
+        df.insert(0, "referencia", dt.date.fromisoformat(ref))
+        partes.append(df)
+    return pd.concat(partes, ignore_index=True)
+
+@pytest.fixture(scope="module")
+def cubo_df(silver) -> pd.DataFrame:
+    """Equivalente em pandas de main.cube_select_sql (GROUP BY com NULL como grupo)."""
+    s = silver.assign(procurou_internou=((silver["procurou"] == 1) & (silver["internou"] == 1)).astype(int))
+    agg = {"n": ("procurou_internou", "size")}
+    for flag in main.CUBE_FLAGS:
+        agg[f"n_{flag}"] = (flag, "count")
+        agg[f"s_{flag}"] = (flag, "sum")
+    agg["s_procurou_internou"] = ("procurou_internou", "sum")
+    return s.groupby(["referencia"] + main.CUBE_DIMS, dropna=False).agg(**agg).reset_index()
+
+def _direto(silver: pd.DataFrame, por) -> pd.DataFrame:
+    """As mesmas proporções calculadas linha a linha, sem o cubo."""
+    def metricas(g):
+        out = {"n": len(g), "prop_falta_ar": g["falta_ar"].mean(),
+               "prop_algum_sintoma": g["tem_algum_sintoma"].mean(),
+               "prop_60mais": g["idoso"].mean()}
+        den = g["procurou"].sum()
+        num = ((g["procurou"] == 1) & (g["internou"] == 1)).sum()
+        out["prop_internou_entre_buscou"] = num / den if den > 0 else np.nan
+        return pd.Series(out)
+    return silver.groupby(por, dropna=False).apply(metricas, include_groups=False).reset_index()
+
+METRICAS = ["prop_falta_ar", "prop_algum_sintoma", "prop_60mais", "prop_internou_entre_buscou"]
+
+def test_cubo_e_bem_menor_que_a_silver(silver, cubo_df):
+    assert len(cubo_df) < len(silver)
+    assert cubo_df["n"].sum() == len(silver)
+
+@pytest.mark.parametrize("por", [
+    ["referencia"],
+    ["referencia", "uf"],
+    ["referencia", "sexo"],
+    ["uf", "sexo"],
+    ["faixa", "escolaridade_grp"],
+    ["sexo", "faixa", "escolaridade_grp"],
+])
+def test_rollup_igual_a_agregacao_direta(silver, cubo_df, por):
+    obtido = cubo.consultar(cubo_df, por, metricas=METRICAS)
+    esperado = _direto(silver, por)
+    pd.testing.assert_frame_equal(obtido, esperado, check_dtype=False, check_exact=False, rtol=1e-12)
+
+def test_filtro(silver, cubo_df):
+    obtido = cubo.consultar(cubo_df, ["uf"], {"faixa": "60+", "sexo": [1, 2]}, METRICAS)
+    recorte = silver[(silver["faixa"] == "60+") & silver["sexo"].isin([1, 2])]
+    pd.testing.assert_frame_equal(obtido, _direto(recorte, ["uf"]), check_dtype=False,
+                                  check_exact=False, rtol=1e-12)
+
+def test_sem_dimensao_e_o_total(silver, cubo_df):
+    total = cubo.consultar(cubo_df, [], metricas=METRICAS)
+    assert len(total) == 1 and total["n"].iloc[0] == len(silver)
+    assert total["prop_falta_ar"].iloc[0] == pytest.approx(silver["falta_ar"].mean())
+
+def test_painel_mensal_igual_ao_painel_offline(cubo_df):
+    offline = pd.concat([painel_offline.paineis_mes(_origem(i), ref) for i, ref in enumerate(MESES)])
+    mensal = split_paineis(offline)["mensal"]
+    obtido = cubo.consultar(cubo_df, ["referencia"], metricas=list(mensal.columns[1:]))
+    pd.testing.assert_frame_equal(obtido.drop(columns="n"), mensal, check_dtype=False,
+                                  check_exact=False, rtol=1e-12)
@@ -0,0 +1,68 @@
+# ============================================================
+# test_dialeto.py — Sniff do dialeto (1x por arquivo) e fallback de encoding
+# ============================================================
+
+import json
+
+import pytest
+
+import main
+
+def _gravar(path, linhas, encoding="utf-8"):
+    with open(path, "w", encoding=encoding, newline="") as f:
+        f.write("\n".join(linhas) + "\n")
+    return str(path)
+
+def test_sniff_ponto_e_virgula_com_cabecalho(tmp_path):
+    path = _gravar(tmp_path / "a.csv", ["UF;A002;Obs"] + [f"{i};{i * 3};texto {i}" for i in range(50)])
+    d = main.sniff_dialect(path)
+    assert (d["sep"], d["encoding"], d["header"]) == (";", "utf-8", 0)
+
+def test_dialeto_fica_em_cache_ate_o_arquivo_mudar(tmp_path, monkeypatch):
+    path = _gravar(tmp_path / "a.csv", ["UF,A002"] + [f"{i},{i}" for i in range(20)])
+    primeiro = main.get_dialect(path)
+    monkeypatch.setattr(main, "sniff_dialect", lambda p: pytest.fail("sniff repetido"))
+    assert main.get_dialect(path) == primeiro
+
+    _gravar(path, ["UF;A002"] + [f"{i};{i}" for i in range(30)])
+    monkeypatch.setattr(main, "sniff_dialect", lambda p: {"sep": ";", "quotechar": '"',
+                                                          "encoding": "utf-8", "header": 0})
+    assert main.get_dialect(path)["sep"] == ";"
+
+def test_latin1_fora_da_amostra_cai_para_latin1(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "SNIFF_BYTES", 256)
+    linhas = ["UF;Municipio"] + [f"{i};Natal" for i in range(100)] + ["35;São Paulo"]
+    path = _gravar(tmp_path / "a.csv", linhas, encoding="latin1")
+    assert main.sniff_dialect(path)["encoding"] == "utf-8"   # a amostra é só ASCII
+
+    df = main.smart_read_csv(path)
+    assert len(df) == 101 and df["Municipio"].iloc[-1] == "São Paulo"
+    with open(main.DIALECT_CACHE, encoding="utf-8") as f:
+        cache = json.load(f)
+    assert cache[str(tmp_path / "a.csv")]["dialeto"]["encoding"] == "latin1"
+
+def _dtypes_em_cache(path):
+    with open(main.DIALECT_CACHE, encoding="utf-8") as f:
+        return dict(json.load(f)[str(path)]["dtypes"])
+
+def test_dtypes_numericos_fixados_e_em_cache(tmp_path, monkeypatch):
+    path = _gravar(tmp_path / "a.csv", ["UF,Peso,Obs"] + [f"{i},{i / 2},t{i}" for i in range(30)])
+    df = main.smart_read_csv(path)
+    dtypes = _dtypes_em_cache(path)
+    assert dtypes["UF"] == "int64" and dtypes["Peso"] == "float64" and "Obs" in dtypes
+    assert df.dtypes.astype(str).to_dict() == dtypes
+
+    leitura = main.pd.read_csv
+    def sem_amostra(*args, **kwargs):
+        assert "nrows" not in kwargs, "amostra relida com o cache válido"
+        return leitura(*args, **kwargs)
+    monkeypatch.setattr(main.pd, "read_csv", sem_amostra)
+    assert main.smart_read_csv(path).equals(df)
+
+def test_amostra_enganosa_volta_a_fixar_so_texto(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "SNIFF_ROWS", 10)
+    linhas = ["UF,A002,Obs"] + [f"{i},{i},t{i}" for i in range(30)] + ["35,,fim", "x,1,fim"]
+    path = _gravar(tmp_path / "a.csv", linhas)
+    df = main.smart_read_csv(path)
+    assert df.equals(main.pd.read_csv(path))
+    assert set(_dtypes_em_cache(path)) == {"Obs"}
@@ -0,0 +1,68 @@
+# ============================================================
+# test_esquema_amostra.py — Esquema por amostra e recuo para inferência completa
+# ============================================================
+
+import os
+
+import pytest
+
+import main
+
+def _csv(path, linhas_int: int, cauda: str) -> str:
+    """CSV cuja coluna A002 é inteira nas primeiras linhas e muda depois."""
+    corpo = "".join(f"35;{i};ok\n" for i in range(linhas_int))
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("UF;A002;Obs\n" + corpo + cauda)
+    return str(path)
+
+@pytest.fixture
+def amostra_curta(monkeypatch):
+    monkeypatch.setattr(main, "INFER_SAMPLE_ROWS", 20)
+    monkeypatch.setattr(main, "CHUNK_SIZE", 25)
+
+def test_esquema_da_amostra_vai_para_o_cache(tmp_path, amostra_curta):
+    path = _csv(tmp_path / "a.csv", 30, "")
+    schema = main.get_schema(path)
+    assert schema["tipos"] == {"UF": "int32", "A002": "int32", "Obs": "text"}
+
+    key = main.layout_key(schema["dialeto"], schema["colunas"])
+    assert key in main._load_json(main.SCHEMA_CACHE)
+    main.forget_schema(path)
+    assert key not in main._load_json(main.SCHEMA_CACHE)
+
+def test_valor_fora_da_amostra_gera_schema_mismatch(tmp_path, amostra_curta):
+    path = _csv(tmp_path / "b.csv", 30, "35;abc;ok\n")
+    schema = main.get_schema(path)
+    with pytest.raises(main.SchemaMismatch):
+        list(main.iter_csv_chunks(path, schema))
+    with pytest.raises(main.SchemaMismatch):
+        main.read_csv_with_schema(path, schema)
+
+def test_inteiro_grande_fora_da_amostra(tmp_path, amostra_curta):
+    path = _csv(tmp_path / "c.csv", 30, f"35;{2**40};ok\n")
+    schema = main.get_schema(path)
+    with pytest.raises(main.SchemaMismatch, match="A002"):
+        list(main.iter_csv_chunks(path, schema))
+
+def test_stage_refaz_com_inferencia_completa(tmp_path, monkeypatch):
+    chamadas, esquecidos = [], []
+
+    def falso_stage(engine, csv_path, final_table, stream, pipeline, copy_format, infer, *resto):
+        chamadas.append(infer)
+        if infer == "sample":
+            raise main.SchemaMismatch("A002 não é inteiro")
+        return 7
+
+    monkeypatch.setattr(main, "_stage_csv", falso_stage)
+    monkeypatch.setattr(main, "forget_schema", esquecidos.append)
+    assert main.stage_csv_into_table(None, "x.csv", "t", infer="sample") == 7
+    assert chamadas == ["sample", "full"]
+    assert esquecidos == ["x.csv"]
+
+def test_modo_full_nao_mascara_erro(monkeypatch):
+    def falso_stage(*args):
+        raise main.SchemaMismatch("x")
+
+    monkeypatch.setattr(main, "_stage_csv", falso_stage)
+    with pytest.raises(main.SchemaMismatch):
+        main.stage_csv_into_table(None, "x.csv", "t", infer="full")
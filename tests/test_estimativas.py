@@ -0,0 +1,104 @@
+# ============================================================
+# test_estimativas.py — Pesos e réplicas de Rao-Wu (sem banco)
+# ============================================================
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+import estimativas
+
+@pytest.fixture
+def desenho():
+    """3 estratos: com 4 UPAs, com 2 UPAs e com 1 UPA; 2–3 linhas por UPA."""
+    estrato = np.array([1, 1, 1, 1, 1, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3], dtype="float64")
+    upa = np.array([10, 10, 11, 11, 12, 12, 13, 13, 13, 20, 20, 21, 21, 30, 30], dtype="float64")
+    return estrato, upa
+
+def test_uma_unidade_por_upa(desenho):
+    estrato, upa = desenho
+    unidade, M = estimativas.replicas_bootstrap(estrato, upa, replicas=50)
+    assert M.shape == (51, 7)
+    assert np.all(M[0] == 1)                       # linha 0 = estimativa principal
+    for e, u in set(zip(estrato, upa)):
+        ids = unidade[(estrato == e) & (upa == u)]
+        assert len(set(ids)) == 1
+    assert len(set(unidade)) == 7
+
+def test_fatores_de_rao_wu(desenho):
+    estrato, upa = desenho
+    unidade, M = estimativas.replicas_bootstrap(estrato, upa, replicas=300, semente=1)
+    F = M[1:]
+    por_upa = {(e, u): unidade[(estrato == e) & (upa == u)][0] for e, u in set(zip(estrato, upa))}
+    e1 = [por_upa[(1, u)] for u in (10, 11, 12, 13)]
+    e2 = [por_upa[(2, u)] for u in (20, 21)]
+    e3 = por_upa[(3, 30)]
+
+    # n_h − 1 sorteios com reposição, cada um vale n_h / (n_h − 1)
+    np.testing.assert_allclose(F[:, e1] % (4 / 3), 0, atol=1e-12)
+    np.testing.assert_allclose(F[:, e1].sum(axis=1), 4 * np.ones(300))
+    assert set(np.unique(F[:, e2])) <= {0.0, 2.0}
+    np.testing.assert_allclose(F[:, e2].sum(axis=1), 2 * np.ones(300))
+    # estrato com uma UPA só não varia
+    assert np.all(F[:, e3] == 1)
+    # em média, cada UPA mantém o peso
+    np.testing.assert_allclose(F.mean(axis=0), 1, atol=0.2)
+
+def test_semente_reproduz_as_replicas(desenho):
+    a = estimativas.replicas_bootstrap(*desenho, replicas=20, semente=7)[1]
+    b = estimativas.replicas_bootstrap(*desenho, replicas=20, semente=7)[1]
+    c = estimativas.replicas_bootstrap(*desenho, replicas=20, semente=8)[1]
+    assert np.array_equal(a, b) and not np.array_equal(a, c)
+
+def test_somar_igual_ao_laco_ingenuo(desenho):
+    estrato, upa = desenho
+    unidade, M = estimativas.replicas_bootstrap(estrato, upa, replicas=10)
+    rng = np.random.default_rng(3)
+    chave = rng.integers(0, 3, len(upa))
+    Bw = rng.random((len(upa), 2))
+    tot = estimativas.somar(chave, 3, unidade, M, Bw)
+    for g in range(3):
+        for r in range(M.shape[0]):
+            esperado = (Bw[chave == g] * M[r, unidade[chave == g]][:, None]).sum(axis=0)
+            np.testing.assert_allclose(tot[g, :, r], esperado)
+
+def test_estimar_erro_padrao():
+    num = np.array([[2.0, 2.0, 3.0, 1.0]])   # principal 0,5; réplicas 0,5 / 0,75 / 0,25
+    den = np.array([[4.0, 4.0, 4.0, 4.0]])
+    theta, ep = estimativas.estimar(num, den)
+    assert theta[0] == 0.5
+    assert ep[0] == pytest.approx(np.sqrt((0 + 0.25**2 + 0.25**2) / 3))
+
+def _mes(n: int = 200, replicas_arquivo: bool = False) -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    df = pd.DataFrame({col: rng.choice([1.0, 2.0, np.nan], n, p=[0.3, 0.6, 0.1])
+                       for col in main.SILVER_FLAGS.values()})
+    df["a002"] = rng.integers(0, 95, n).astype("float64")
+    df["a003"] = rng.choice([1.0, 2.0], n)
+    df["a005"] = rng.choice([1.0, 3.0, 5.0], n)
+    df["uf"] = rng.choice([11, 35], n).astype("float64")
+    df["estrato"] = rng.choice([1.0, 2.0, 3.0], n)
+    df["upa"] = df["estrato"] * 100 + rng.integers(0, 6, n)
+    df["v1032"] = rng.gamma(2.0, 150.0, n)
+    if replicas_arquivo:
+        for r in range(1, 5):
+            df[f"v1032{r:03d}"] = df["v1032"]
+    return df
+
+def test_proporcao_ponderada_pelo_v1032():
+    df = _mes()
+    longo, _ = estimativas.estimativas_mes(df, "2020-11-01", replicas=20)
+    mensal = estimativas.split_estimativas(longo)["mensal"]
+    flag = (df["b0014"] == 1).astype(float).where(df["b0014"].notna())
+    ok = flag.notna()
+    esperado = np.average(flag[ok], weights=df.loc[ok, "v1032"])
+    assert mensal["prop_falta_ar"].iloc[0] == pytest.approx(esperado)
+    assert mensal["populacao"].iloc[0] == pytest.approx(df["v1032"].sum())
+    assert mensal["prop_falta_ar_ep"].iloc[0] > 0
+
+def test_replicas_do_arquivo_tem_prioridade():
+    longo, origem = estimativas.estimativas_mes(_mes(replicas_arquivo=True), "2020-11-01")
+    assert origem.startswith("4 pesos replicados")
+    # réplicas iguais ao peso principal -> erro padrão zero
+    np.testing.assert_allclose(longo["prop_falta_ar_ep"].dropna(), 0, atol=1e-12)
@@ -0,0 +1,205 @@
+# ============================================================
+# test_manifesto.py — plan_load: pular / swap / retomar / carregar (sem banco)
+# ============================================================
+
+import pytest
+
+import main
+
+# ------------------------------
+# Manifesto e engine falsos
+# ------------------------------
+class _Resultado:
+    def __init__(self, valor):
+        self.valor = valor
+
+    def scalar(self):
+        return self.valor
+
+class _Conexao:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.engine.sql.append(str(sql))
+        return _Resultado(self.engine.linhas_staging)
+
+class _Engine:
+    """Só o que plan_load usa: connect()/begin() e o count(*) da staging."""
+    def __init__(self, linhas_staging=0):
+        self.linhas_staging = linhas_staging
+        self.sql = []
+
+    def connect(self):
+        return _Conexao(self)
+
+    begin = connect
+
+OPTS = {"infer": "sample", "compact": False, "stream": False}
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "PNAD_COVID_112020.csv"
+    path.write_text("a;b\n1;2\n", encoding="utf-8")
+    return str(path)
+
+def _entrada(csv_path, **kw):
+    fp = main.file_fingerprint(csv_path)
+    entry = {"tamanho": fp["size"], "mtime_ns": fp["mtime_ns"], "sha256": "abc", "status": "ok",
+             "chunks_ok": 0, "linhas_ok": 0, "chunk_size": main.CHUNK_SIZE,
+             "opcoes": main._manifest_opts(OPTS)}
+    entry.update(kw)
+    return entry
+
+def _plano(monkeypatch, csv_path, entry, final=True, staging=False, linhas_staging=0, sha="abc",
+           force=False):
+    existe = {"pnad_covid_112020": final, "pnad_covid_112020_new": staging}
+    hashes = []
+    monkeypatch.setattr(main, "manifest_get", lambda conn, t: entry)
+    monkeypatch.setattr(main, "_table_exists", lambda conn, t: existe[t])
+    monkeypatch.setattr(main, "file_sha256", lambda p: hashes.append(p) or sha)
+    engine = _Engine(linhas_staging)
+    plan = main.plan_load(engine, csv_path, "pnad_covid_112020", OPTS, force=force)
+    return plan, engine, hashes
+
+def test_sem_manifesto_carrega(monkeypatch, csv_path):
+    plan, _, _ = _plano(monkeypatch, csv_path, None)
+    assert plan["acao"] == "carregar" and plan["linhas_ok"] == 0
+
+def test_mesmo_tamanho_e_mtime_pula_sem_hash(monkeypatch, csv_path):
+    plan, _, hashes = _plano(monkeypatch, csv_path, _entrada(csv_path))
+    assert plan["acao"] == "pular" and hashes == []
+
+def test_so_mtime_mudou_pula_e_atualiza_mtime(monkeypatch, csv_path):
+    entry = _entrada(csv_path, mtime_ns=1)
+    plan, engine, hashes = _plano(monkeypatch, csv_path, entry)
+    assert plan["acao"] == "pular" and hashes == [csv_path]
+    assert any("UPDATE" in sql and "mtime_ns" in sql for sql in engine.sql)
+
+def test_conteudo_mudou_carrega(monkeypatch, csv_path):
+    plan, _, _ = _plano(monkeypatch, csv_path, _entrada(csv_path, mtime_ns=1), sha="outro")
+    assert plan["acao"] == "carregar" and plan["sha256"] == "outro"
+
+def test_tabela_oficial_sumiu_carrega(monkeypatch, csv_path):
+    plan, _, _ = _plano(monkeypatch, csv_path, _entrada(csv_path), final=False)
+    assert plan["acao"] == "carregar"
+
+def test_force_ignora_manifesto(monkeypatch, csv_path):
+    plan, _, _ = _plano(monkeypatch, csv_path, _entrada(csv_path), force=True)
+    assert plan["acao"] == "carregar"
+
+def test_staging_completa_faz_swap(monkeypatch, csv_path):
+    plan, _, _ = _plano(monkeypatch, csv_path, _entrada(csv_path, status="staging_ok"), staging=True)
+    assert plan["acao"] == "swap"
+
+def test_staging_interrompida_retoma(monkeypatch, csv_path):
+    entry = _entrada(csv_path, status="carregando", chunks_ok=3, linhas_ok=600_000)
+    plan, _, _ = _plano(monkeypatch, csv_path, entry, staging=True, linhas_staging=600_000)
+    assert plan["acao"] == "retomar"
+    assert (plan["linhas_ok"], plan["chunks_ok"]) == (600_000, 3)
+
+def test_staging_esvaziada_por_crash_carrega_do_zero(monkeypatch, csv_path):
+    entry = _entrada(csv_path, status="carregando", chunks_ok=3, linhas_ok=600_000)
+    plan, _, _ = _plano(monkeypatch, csv_path, entry, staging=True, linhas_staging=0)
+    assert plan["acao"] == "carregar" and plan["linhas_ok"] == 0
+
+@pytest.mark.parametrize("mudanca", [{"chunk_size": 1}, {"opcoes": "{}"}, {"chunks_ok": 0}])
+def test_staging_interrompida_incompativel_carrega(monkeypatch, csv_path, mudanca):
+    entry = _entrada(csv_path, status="carregando", chunks_ok=3, linhas_ok=600_000)
+    entry.update(mudanca)
+    plan, _, _ = _plano(monkeypatch, csv_path, entry, staging=True, linhas_staging=600_000)
+    assert plan["acao"] == "carregar"
+
+# ------------------------------
+# COPY serial: uma transação por chunk quando há manifesto
+# ------------------------------
+class _Transacao:
+    def __init__(self, log):
+        self.log = log
+        self.log.append("begin")
+
+    def commit(self):
+        self.log.append("commit")
+
+class _ConexaoCopy:
+    def __init__(self, log):
+        self.log = log
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.log.append("fecha")
+        return False
+
+    def begin(self):
+        return _Transacao(self.log)
+
+class _EngineCopy:
+    def __init__(self):
+        self.log = []
+
+    def connect(self):
+        return _ConexaoCopy(self.log)
+
+@pytest.fixture
+def carga_falsa(monkeypatch, tmp_path):
+    """_stage_csv com leitura real e COPY/manifesto trocados por registros em engine.log."""
+    path = tmp_path / "PNAD_COVID_112020.csv"
+    path.write_text("UF;A002\n" + "".join(f"35;{i}\n" for i in range(25)), encoding="utf-8")
+    engine = _EngineCopy()
+    monkeypatch.setattr(main, "CHUNK_SIZE", 10)
+    monkeypatch.setattr(main, "create_staging", lambda *a: engine.log.append("cria"))
+    monkeypatch.setattr(main, "finalize_staging", lambda *a: engine.log.append("finaliza"))
+    monkeypatch.setattr(main, "manifest_begin", lambda *a: None)
+    monkeypatch.setattr(main, "manifest_staged", lambda *a: None)
+    monkeypatch.setattr(main, "manifest_progress",
+                        lambda conn, t, linhas, chunks: engine.log.append(f"progresso {linhas}"))
+    monkeypatch.setattr(main, "copy_chunk",
+                        lambda conn, chunk, *a, **kw: engine.log.append(f"copy {len(chunk)}"))
+    return engine, str(path)
+
+def test_copy_serial_sem_manifesto_confirma_a_transacao(carga_falsa):
+    engine, path = carga_falsa
+    n = main._stage_csv(engine, path, "t", False, False, "csv", "full", False)
+    assert n == 25
+    assert engine.log == ["cria", "begin", "copy 10", "copy 10", "copy 5", "commit", "fecha", "finaliza"]
+
+def test_copy_serial_com_manifesto_confirma_cada_chunk(carga_falsa):
+    engine, path = carga_falsa
+    plan = {"acao": "carregar", "linhas_ok": 0, "chunks_ok": 0}
+    main._stage_csv(engine, path, "t", False, False, "csv", "full", False, plan)
+    assert engine.log == ["cria", "begin",
+                          "copy 10", "progresso 10", "commit", "begin",
+                          "copy 10", "progresso 20", "commit", "begin",
+                          "copy 5", "progresso 25", "commit", "begin",
+                          "commit", "fecha", "finaliza"]
+
+def test_retomada_pula_as_linhas_ja_copiadas(carga_falsa):
+    engine, path = carga_falsa
+    plan = {"acao": "retomar", "linhas_ok": 20, "chunks_ok": 2}
+    assert main._stage_csv(engine, path, "t", False, False, "csv", "full", False, plan) == 25
+    assert "cria" not in engine.log
+    assert [e for e in engine.log if e.startswith("copy")] == ["copy 5"]
+
+@pytest.mark.parametrize("pipeline", [False, True])
+def test_stream_passada_unica_alarga_a_staging_antes_do_copy(carga_falsa, monkeypatch, pipeline):
+    engine, path = carga_falsa
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("35;5000000000\n")   # linha 26: a002 deixa de caber em integer
+    monkeypatch.setattr(main, "INFER_SAMPLE_ROWS", 10)
+    monkeypatch.setattr(main, "profile_csv", lambda *a, **kw: pytest.fail("passada extra de perfil"))
+    monkeypatch.setattr(main, "widen_staging",
+                        lambda conn, t, alargar: alargar and engine.log.append(f"alarga {alargar}"))
+    monkeypatch.setattr(main, "copy_buffer", lambda conn, buf, cols, t: engine.log.append("copy"))
+
+    assert main._stage_csv(engine, path, "t", True, pipeline, "csv", "full", False) == 26
+    copias = [e.split()[0] if e.startswith("copy") else e for e in engine.log]
+    assert copias == ["cria", "begin", "copy", "copy", "alarga {'a002': 'bigint'}", "copy",
+                      "commit", "fecha", "finaliza"]
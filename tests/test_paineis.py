@@ -0,0 +1,84 @@
+# ============================================================
+# test_paineis.py — Marcador do cache e consulta dos painéis (sem banco)
+# ============================================================
+
+import os
+
+import pandas as pd
+import pytest
+
+import paineis
+
+class _Conexao:
+    def __init__(self, valor):
+        self.valor, self.sql = valor, []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.sql.append(str(sql))
+        return self
+
+    def scalar(self):
+        if isinstance(self.valor, Exception):
+            raise self.valor
+        return self.valor
+
+class _Engine:
+    def __init__(self, valor):
+        self.conexao = _Conexao(valor)
+
+    def connect(self):
+        return self.conexao
+
+def _marcador_local(texto):
+    os.makedirs(paineis.CACHE_DIR, exist_ok=True)
+    with open(paineis.LOAD_MARKER, "w", encoding="utf-8") as f:
+        f.write(texto)
+
+def test_marcador_vem_do_manifesto_do_banco(monkeypatch):
+    _marcador_local('{"carregado_em": "local"}')   # arquivo de outra máquina: ignorado
+    engine = _Engine("2020-12-01 10:00:00+00")
+    monkeypatch.setattr(paineis, "get_engine", lambda: engine)
+    assert paineis.load_marker() == "2020-12-01 10:00:00+00"
+    assert "status = 'ok'" in engine.conexao.sql[0]
+
+@pytest.mark.parametrize("valor", [RuntimeError("sem banco"), None])
+def test_sem_manifesto_cai_para_o_arquivo_local(monkeypatch, valor):
+    monkeypatch.setattr(paineis, "get_engine", lambda: _Engine(valor))
+    assert paineis.load_marker() is None
+    _marcador_local('{"carregado_em": "local"}')
+    assert paineis.load_marker() == '{"carregado_em": "local"}'
+
+def test_consulta_le_so_as_views_de_painel():
+    sql = paineis.SQL_PAINEIS
+    assert "pnad_covid_2020_silver" not in sql
+    for view in ("mensal", "uf", "faixa", "sexo", "escolaridade"):
+        assert f"public.pnad_covid_painel_{view} " in sql
+    grupos = [int(linha.split()[1].rstrip(",")) for linha in sql.splitlines()
+              if linha.startswith("SELECT")]
+    assert sorted(grupos) == sorted(g for g, _, _ in paineis.PAINEIS.values())
+
+@pytest.mark.skipif(not paineis.HAS_PARQUET, reason="cache precisa de pyarrow")
+def test_cache_so_consulta_o_banco_quando_o_marcador_muda(monkeypatch):
+    marcador = ["m1"]
+    consultas = []
+    longo = pd.DataFrame({"grupo": [15], "referencia": ["2020-11-01"], "uf": [None], "faixa": [None],
+                          "sexo": [None], "escolaridade_grp": [None], "n": [10],
+                          **{c: [0.5] for c in ("prop_falta_ar", "prop_dor_peito", "prop_algum_sintoma",
+                                                "prop_plano_saude", "prop_60mais", "prop_buscou",
+                                                "prop_internou_entre_buscou")}})
+    monkeypatch.setattr(paineis, "load_marker", lambda: marcador[0])
+    monkeypatch.setattr(paineis, "fetch_paineis", lambda meses: consultas.append(meses) or longo)
+
+    primeiro = paineis.carregar_paineis(["2020-11-01"])
+    segundo = paineis.carregar_paineis(["2020-11-01"])
+    assert len(consultas) == 1
+    pd.testing.assert_frame_equal(primeiro["mensal"], segundo["mensal"])
+    marcador[0] = "m2"
+    paineis.carregar_paineis(["2020-11-01"])
+    assert len(consultas) == 2
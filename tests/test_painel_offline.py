@@ -0,0 +1,99 @@
+# ============================================================
+# test_painel_offline.py — painel_offline x semântica da consulta do paineis.py
+# ============================================================
+# Referência em pandas escrita a partir do SQL (silver + GROUPING SETS):
+# AVG ignora NULL, GREATEST ignora NULL, CASE cai no ELSE com NULL.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+import painel_offline
+from paineis import PAINEIS, split_paineis
+
+REF = "2020-11-01"
+
+@pytest.fixture
+def origem() -> pd.DataFrame:
+    """Mês fictício com as colunas de origem (nomes limpos), NULLs e uma coluna ausente."""
+    rng = np.random.default_rng(7)
+    n = 500
+    df = pd.DataFrame({col: rng.choice([1.0, 2.0, np.nan], n, p=[0.3, 0.6, 0.1])
+                       for col in main.SILVER_FLAGS.values()})
+    df["a002"] = rng.integers(0, 95, n).astype("float64")
+    df.loc[rng.random(n) < 0.05, "a002"] = np.nan
+    df["a003"] = rng.choice([1.0, 2.0, np.nan], n, p=[0.48, 0.48, 0.04])
+    df["a005"] = rng.choice([1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, np.nan], n)
+    df["uf"] = rng.choice([11, 29, 35, 53], n)
+    return df.drop(columns=["b0019"])   # coluna que não existe neste mês -> NULL na silver
+
+def _silver_pandas(df: pd.DataFrame) -> pd.DataFrame:
+    def coluna(col):   # coluna ausente no mês = NULL
+        return df[col] if col in df.columns else pd.Series(np.nan, index=df.index)
+
+    s = pd.DataFrame(index=df.index)
+    for nome, col in main.SILVER_FLAGS.items():
+        x = coluna(col)
+        s[nome] = (x == 1).astype("float64").where(x.notna())
+    for nome in painel_offline.CODIGOS:
+        s[nome] = coluna(main.SILVER_CODES[nome])
+    s["tem_algum_sintoma"] = s[main.SINTOMA_FLAGS].max(axis=1).fillna(0)
+    s["idoso"] = (s["idade"] >= 60).astype("float64").where(s["idade"].notna())
+
+    def faixa(i):
+        if i < 20: return "<20"
+        if 20 <= i <= 39: return "20-39"
+        if 40 <= i <= 59: return "40-59"
+        if i >= 60: return "60+"
+        return "sem_idade"
+
+    def escolaridade(e):
+        if 1 <= e <= 2: return "Fundamental"
+        if 3 <= e <= 4: return "Médio"
+        if e >= 5: return "Superior+"
+        return "Sem info"
+
+    s["faixa"] = s["idade"].map(faixa)
+    s["escolaridade_grp"] = s["escolaridade"].map(escolaridade)
+    return s
+
+def _metricas(g: pd.DataFrame) -> pd.Series:
+    out = {"n": len(g)}
+    out.update({m: g[c].mean() for m, c in painel_offline.MEDIAS.items()})
+    den = g["procurou"].sum()
+    num = ((g["procurou"] == 1) & (g["internou"] == 1)).sum()
+    out["prop_internou_entre_buscou"] = num / den if den > 0 else np.nan
+    return pd.Series(out)
+
+def _referencia(df: pd.DataFrame) -> pd.DataFrame:
+    """Resultado longo 'do banco', calculado com groupby."""
+    s = _silver_pandas(df)
+    partes = []
+    for grupo, chave, _ in PAINEIS.values():
+        if chave:
+            parte = s.groupby(chave, dropna=False).apply(_metricas, include_groups=False).reset_index()
+        else:
+            parte = _metricas(s).to_frame().T
+        parte["grupo"] = grupo
+        parte["referencia"] = pd.Timestamp(REF).date()
+        partes.append(parte)
+    return pd.concat(partes, ignore_index=True)
+
+def test_paineis_iguais_a_referencia(origem):
+    local = split_paineis(painel_offline.paineis_mes(origem, REF))
+    esperado = split_paineis(_referencia(origem))
+    assert set(local) == set(PAINEIS)
+    for nome in PAINEIS:
+        pd.testing.assert_frame_equal(local[nome], esperado[nome], check_dtype=False,
+                                      obj=f"painel {nome}")
+
+def test_sexo_nulo_vira_sem_info(origem):
+    sexo = split_paineis(painel_offline.paineis_mes(origem, REF))["sexo"]
+    assert sorted(sexo["sexo"]) == ["Homem", "Mulher", "Sem info"]
+
+def test_calcular_paineis_a_partir_do_csv(tmp_path, origem):
+    csv = tmp_path / "PNAD_COVID_112020.csv"
+    origem.rename(columns=str.upper).to_csv(csv, index=False, sep=";")
+    longo = painel_offline.calcular_paineis(data_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(longo, painel_offline.paineis_mes(origem, REF), check_dtype=False)
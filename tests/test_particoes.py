@@ -0,0 +1,93 @@
+# ============================================================
+# test_particoes.py — Tabela particionada: meses, tipos e views (sem banco)
+# ============================================================
+
+import pytest
+
+import main
+
+class _Conexao:
+    """Guarda o SQL executado; as consultas de catálogo ficam nos monkeypatch."""
+    def __init__(self):
+        self.sql = []
+
+    def execute(self, sql, params=None):
+        self.sql.append(" ".join(str(sql).split()))
+
+@pytest.fixture
+def conn():
+    return _Conexao()
+
+def test_discover_jobs_em_ordem_cronologica(tmp_path):
+    for nome in ("PNAD_COVID_112020.csv", "PNAD_COVID_052020.csv", "PNAD_COVID_012021.csv",
+                 "PNAD_COVID_082020.csv", "outro.csv"):
+        (tmp_path / nome).write_text("x\n", encoding="utf-8")
+    tabelas = [t for _, t in main.discover_jobs(str(tmp_path))]
+    assert tabelas == ["pnad_covid_052020", "pnad_covid_082020", "pnad_covid_112020",
+                       "pnad_covid_012021"]
+
+def test_month_of():
+    assert main.month_of("pnad_covid_052020") == "2020-05-01"
+    assert main.month_of("pnad_covid_2020") is None
+
+@pytest.mark.parametrize("a, b, esperado", [
+    ("smallint", "integer", "integer"),
+    ("bigint", "integer", "bigint"),
+    ("integer", "double precision", "double precision"),
+    ("text", "text", "text"),
+    ("integer", "text", "text"),
+    ("timestamp without time zone", "bigint", "text"),
+])
+def test_common_type(a, b, esperado):
+    assert main._common_type(a, b) == esperado
+    assert main._common_type(b, a) == esperado
+
+def test_align_to_parent_num_alter_so(monkeypatch, conn):
+    monkeypatch.setattr(main, "_columns", lambda c, t: {"uf": "smallint", "a002": "bigint"})
+    mae = {"uf": "integer", "a002": "integer", "c001": "smallint"}
+    main.align_to_parent(conn, "pnad_covid_112020_new", mae)
+
+    assert len(conn.sql) == 1
+    sql = conn.sql[0]
+    assert 'ADD COLUMN "c001" smallint' in sql
+    assert 'ALTER COLUMN "uf" TYPE integer' in sql
+    assert '"a002"' not in sql          # staging mais larga: quem alarga é a mãe
+
+def test_reconcile_alarga_a_mae_e_acrescenta_colunas(monkeypatch, conn):
+    colunas = {main.PARTITIONED_TABLE: {"uf": "smallint", "a002": "integer"},
+               "pnad_covid_112020_new": {"uf": "smallint", "a002": "bigint", "c001": "text"}}
+    alargadas = []
+    monkeypatch.setattr(main, "_columns", lambda c, t: colunas[t])
+    monkeypatch.setattr(main, "widen_parent_columns", lambda c, p, w: alargadas.append((p, w)))
+    monkeypatch.setattr(main, "align_to_parent", lambda *a: None)
+
+    main.reconcile_partition_columns(conn, "pnad_covid_112020_new")
+    assert alargadas == [(main.PARTITIONED_TABLE, {"a002": "bigint"})]
+    assert any('ADD COLUMN "c001" text' in sql for sql in conn.sql)
+
+def test_widen_recria_views_na_ordem_de_dependencia(monkeypatch, conn):
+    views = [
+        ("public.pnad_covid_2020_auto", "v", 1, " SELECT uf FROM pnad_covid_2020;", [],
+         ["security_barrier=true"],
+         ["ALTER VIEW public.pnad_covid_2020_auto OWNER TO carga",
+          "GRANT SELECT ON public.pnad_covid_2020_auto TO leitura"]),
+        ("public.painel_uf", "m", 2, " SELECT uf FROM pnad_covid_2020_auto;",
+         ["CREATE INDEX painel_uf_idx ON public.painel_uf USING btree (uf)"], [],
+         ["COMMENT ON MATERIALIZED VIEW public.painel_uf IS 'painel por UF'"]),
+    ]
+    raw = []
+    monkeypatch.setattr(main, "_dependent_views", lambda c, t: views)
+    monkeypatch.setattr(main, "_exec_raw", lambda c, sql: raw.append(sql))
+
+    main.widen_parent_columns(conn, main.PARTITIONED_TABLE, {"uf": "integer"})
+    assert raw[:2] == ["DROP MATERIALIZED VIEW IF EXISTS public.painel_uf;",
+                       "DROP VIEW IF EXISTS public.pnad_covid_2020_auto;"]
+    assert raw[2].startswith("CREATE VIEW public.pnad_covid_2020_auto WITH (security_barrier=true) AS")
+    assert raw[3].startswith("CREATE MATERIALIZED VIEW public.painel_uf AS")
+    assert raw[3].endswith("WITH DATA;")          # nunca volta vazia
+    assert raw[4] == "CREATE INDEX painel_uf_idx ON public.painel_uf USING btree (uf);"
+    assert raw[5:] == ["ALTER VIEW public.pnad_covid_2020_auto OWNER TO carga;",
+                       "GRANT SELECT ON public.pnad_covid_2020_auto TO leitura;",
+                       "COMMENT ON MATERIALIZED VIEW public.painel_uf IS 'painel por UF';"]
+    assert conn.sql == [f'ALTER TABLE public."{main.PARTITIONED_TABLE}" '
+                        'ALTER COLUMN "uf" TYPE integer USING "uf"::integer;']
@@ -0,0 +1,138 @@
+# ============================================================
+# test_pgcopy.py — Ida e volta do encoder PGCOPY (sem Postgres)
+# ============================================================
+
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.types import SmallInteger, Integer, BigInteger, Float, Text, Boolean, DateTime
+
+import pgcopy
+
+# ------------------------------
+# Decoder mínimo (só para o teste)
+# ------------------------------
+_FORMATOS = {SmallInteger: ">h", Integer: ">i", BigInteger: ">q", Float: ">d", Boolean: ">?"}
+
+def _valor(campo: bytes, sql_type):
+    if isinstance(sql_type, DateTime):
+        us = struct.unpack(">q", campo)[0]
+        return pd.Timestamp("2000-01-01") + pd.Timedelta(microseconds=us)
+    for tipo, fmt in _FORMATOS.items():
+        if type(sql_type) is tipo:
+            return struct.unpack(fmt, campo)[0]
+    return campo.decode("utf-8")
+
+def decode_pgcopy(buf: bytes, tipos: list) -> list:
+    """Linhas (listas, None = NULL) de um buffer PGCOPY."""
+    assert buf.startswith(pgcopy.PGCOPY_HEADER)
+    pos, linhas = len(pgcopy.PGCOPY_HEADER), []
+    while True:
+        (ncampos,) = struct.unpack_from(">h", buf, pos)
+        pos += 2
+        if ncampos == -1:
+            assert pos == len(buf)
+            return linhas
+        assert ncampos == len(tipos)
+        linha = []
+        for sql_type in tipos:
+            (tam,) = struct.unpack_from(">i", buf, pos)
+            pos += 4
+            if tam == -1:
+                linha.append(None)
+                continue
+            linha.append(_valor(buf[pos:pos+tam], sql_type))
+            pos += tam
+        linhas.append(linha)
+
+# ------------------------------
+# Testes
+# ------------------------------
+def _frame(n: int) -> tuple:
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "uf": pd.array(rng.choice([11, 35, 53], n), dtype="Int16"),
+        "upa": pd.array(rng.integers(0, 2**31 - 1, n), dtype="Int64"),
+        "grande": pd.array(rng.integers(-2**62, 2**62, n), dtype="Int64"),
+        "peso": rng.gamma(2.0, 150.0, n),
+        "flag": pd.array(rng.random(n) < 0.5, dtype="boolean"),
+        "data": pd.Timestamp("2020-11-01") + pd.to_timedelta(rng.integers(0, 10**9, n), unit="us"),
+        "obs": rng.choice(np.array(["sim", "não", "", "São Paulo"], dtype=object), n),
+    })
+    for col in ("uf", "upa", "grande", "flag"):
+        df.loc[rng.random(n) < 0.2, col] = pd.NA
+    df.loc[rng.random(n) < 0.2, "peso"] = np.nan
+    df.loc[rng.random(n) < 0.2, "data"] = pd.NaT
+    tipos = {"uf": SmallInteger(), "upa": Integer(), "grande": BigInteger(), "peso": Float(),
+             "flag": Boolean(), "data": DateTime(), "obs": Text()}
+    return df, tipos
+
+def _esperado(df: pd.DataFrame) -> list:
+    linhas = []
+    for row in df.itertuples(index=False):
+        linha = []
+        for v in row:
+            if pd.isna(v) or v == "":   # texto vazio vira NULL, como no caminho CSV
+                linha.append(None)
+            elif isinstance(v, (np.integer, np.bool_, np.floating)):
+                linha.append(v.item())
+            else:
+                linha.append(v)
+        linhas.append(linha)
+    return linhas
+
+def test_ida_e_volta_todos_os_tipos():
+    # mais linhas que BLOCK_ROWS: cobre a emenda entre blocos
+    df, tipos = _frame(pgcopy.BLOCK_ROWS + 123)
+    buf = pgcopy.encode_pgcopy_buffer(df, tipos).getvalue()
+    assert decode_pgcopy(buf, list(tipos.values())) == _esperado(df)
+
+def test_frame_vazio_so_cabecalho_e_trailer():
+    df, tipos = _frame(0)
+    assert pgcopy.encode_pgcopy(df, tipos) == pgcopy.PGCOPY_HEADER + pgcopy.PGCOPY_TRAILER
+
+def test_coluna_sem_tipo():
+    df, tipos = _frame(3)
+    del tipos["obs"]
+    with pytest.raises(TypeError, match="obs"):
+        pgcopy.encode_pgcopy(df, tipos)
+
+@pytest.mark.parametrize("valores, tipo", [
+    ([1, 40000], SmallInteger()),       # astype(">i2") daria -25536
+    ([1.0, 2.0**31], Integer()),
+    ([1.0, 2.0**63], BigInteger()),
+])
+def test_inteiro_fora_da_faixa_levanta(valores, tipo):
+    df = pd.DataFrame({"v": valores})
+    with pytest.raises(ValueError, match="fora da faixa"):
+        pgcopy.encode_pgcopy(df, {"v": tipo})
+
+def test_float_nao_inteiro_em_coluna_inteira_levanta():
+    df = pd.DataFrame({"v": [1.0, 2.5, np.nan]})
+    with pytest.raises(ValueError, match="não inteiros"):
+        pgcopy.encode_pgcopy(df, {"v": Integer()})
+
+def test_float_inteiro_com_nulo_passa():
+    df = pd.DataFrame({"v": [1.0, -32768.0, np.nan]})
+    buf = pgcopy.encode_pgcopy(df, {"v": SmallInteger()})
+    assert decode_pgcopy(buf, [SmallInteger()]) == [[1], [-32768], [None]]
+
+def test_texto_longo_respeita_block_bytes(monkeypatch):
+    monkeypatch.setattr(pgcopy, "BLOCK_BYTES", 4096)
+    larguras = []
+    empty = np.empty
+    def espia(shape, dtype=float):
+        if dtype is np.uint8:
+            larguras.append(shape[0] * shape[1])
+        return empty(shape, dtype=dtype)
+    monkeypatch.setattr(pgcopy.np, "empty", espia)
+    obs = ["curto"] * 500
+    obs[250] = "x" * 10_000                 # uma linha só, mais larga que o teto
+    df = pd.DataFrame({"uf": pd.array(range(500), dtype="Int16"), "obs": obs})
+    tipos = {"uf": SmallInteger(), "obs": Text()}
+    buf = pgcopy.encode_pgcopy(df, tipos)
+    assert decode_pgcopy(buf, list(tipos.values())) == _esperado(df)
+    assert max(larguras) < 10_100           # nunca 500 x 10000
+    assert sum(1 for t in larguras if t > 4096) == 1
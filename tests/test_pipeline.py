@@ -0,0 +1,54 @@
+# ============================================================
+# test_pipeline.py — Serialização em paralelo com o COPY (sem banco)
+# ============================================================
+
+import threading
+
+import pandas as pd
+import pytest
+
+import main
+
+@pytest.fixture
+def copias(monkeypatch):
+    """Substitui o COPY por uma lista que guarda o CSV recebido."""
+    recebidos = []
+
+    def falso_copy(conn, buf, columns, table_name):
+        recebidos.append((list(columns), buf.getvalue()))
+
+    monkeypatch.setattr(main, "copy_buffer", falso_copy)
+    return recebidos
+
+def _chunks(n_chunks: int, linhas: int = 5):
+    for c in range(n_chunks):
+        yield pd.DataFrame({"id": range(c * linhas, (c + 1) * linhas), "uf": "SP"})
+
+def test_pipeline_preserva_ordem_e_contagem(copias):
+    total = main.copy_chunks_pipelined(None, _chunks(7), "t", depth=2)
+
+    assert total == 35
+    assert len(copias) == 7
+    ids = [int(l.split(",")[0]) for _, csv in copias for l in csv.splitlines()]
+    assert ids == list(range(35))
+    assert all(cols == ["id", "uf"] for cols, _ in copias)
+
+def test_erro_na_leitura_chega_ao_consumidor(copias):
+    def quebra():
+        yield from _chunks(2)
+        raise ValueError("arquivo truncado")
+
+    with pytest.raises(ValueError, match="truncado"):
+        main.copy_chunks_pipelined(None, quebra(), "t")
+    assert len(copias) == 2
+
+def test_erro_no_copy_para_o_produtor(monkeypatch):
+    def falha(conn, buf, columns, table_name):
+        raise RuntimeError("COPY falhou")
+
+    monkeypatch.setattr(main, "copy_buffer", falha)
+    antes = threading.active_count()
+    with pytest.raises(RuntimeError, match="COPY falhou"):
+        main.copy_chunks_pipelined(None, _chunks(50), "t", depth=1)
+    # a thread produtora não fica presa na fila cheia
+    assert threading.active_count() == antes
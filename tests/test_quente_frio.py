@@ -0,0 +1,54 @@
+# ============================================================
+# test_quente_frio.py — Colunas quentes e arquivo frio (--hot-cold)
+# ============================================================
+
+import os
+
+import pandas as pd
+import pytest
+
+import main
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+def test_colunas_quentes_na_ordem_do_arquivo(monkeypatch):
+    monkeypatch.setattr(main, "HOT_EXTRA_COLUMNS", ["v1022"])
+    colunas = ["v1012", "uf", "c007", "a002", "b0014", "v1022", "d0051"]
+    assert main.hot_columns(colunas) == ["uf", "a002", "b0014", "v1022"]
+    # tudo o que a silver e os índices leem fica no banco
+    quentes = main.hot_column_set()
+    assert set(main.SILVER_FLAGS.values()) <= quentes
+    for cols in main.STAGING_INDEXES.values():
+        assert set(cols) <= quentes
+
+def _chunks():
+    yield pd.DataFrame({"uf": [35, 11], "c007": pd.Series([None, None], dtype=object), "obs": ["a", "b"]})
+    yield pd.DataFrame({"uf": [53], "c007": ["texto"], "obs": ["c"]})
+
+def test_arquivo_frio_tem_a_largura_total(tmp_path):
+    path = str(tmp_path / "frio" / "pnad_covid_112020.parquet")
+    repassados = list(main.tee_cold_archive(_chunks(), path))
+    assert [len(c) for c in repassados] == [2, 1]
+
+    frio = pq.read_table(path).to_pandas()
+    assert list(frio.columns) == ["uf", "c007", "obs"]
+    assert frio["uf"].tolist() == [35, 11, 53]
+    assert frio["c007"].tolist()[2] == "texto"   # coluna vazia no 1º chunk virou texto
+    assert pq.ParquetFile(path).metadata.row_group(0).column(0).compression == "ZSTD"
+
+def test_erro_no_meio_nao_publica_o_arquivo(tmp_path):
+    path = str(tmp_path / "pnad_covid_112020.parquet")
+
+    def quebra():
+        yield from _chunks()
+        raise main.SchemaMismatch("linha ruim")
+
+    with pytest.raises(main.SchemaMismatch):
+        list(main.tee_cold_archive(quebra(), path))
+    assert not os.path.exists(path)
+
+def test_manifesto_antigo_continua_retomavel():
+    opts = {"infer": "sample", "compact": False, "stream": True}
+    assert "hot_cold" not in main._manifest_opts(opts)
+    assert main._manifest_opts(dict(opts, hot_cold=False)) == main._manifest_opts(opts)
+    assert main._manifest_opts(dict(opts, hot_cold=True)) != main._manifest_opts(opts)
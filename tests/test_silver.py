@@ -0,0 +1,42 @@
+# ============================================================
+# test_silver.py — SQL da camada silver (sem banco)
+# ============================================================
+
+import re
+
+import main
+
+TODAS = set(main.SILVER_CODES.values()) | set(main.SILVER_FLAGS.values())
+
+def _expressoes(sql: str) -> dict:
+    """{alias: expressão} das colunas do SELECT interno."""
+    inner = sql[sql.index("FROM (SELECT ") + len("FROM (SELECT "):sql.rindex(" FROM public.")]
+    pares = (item.rsplit(" AS ", 1) for item in inner.split(", ")[1:])   # [0] = referencia
+    return {alias: expr for expr, alias in pares}
+
+def test_mes_completo_le_todas_as_colunas():
+    exprs = _expressoes(main.silver_select_sql("pnad_covid_112020_new", TODAS))
+    assert set(exprs) == set(main.SILVER_CODES) | set(main.SILVER_FLAGS)
+    assert "NULL::smallint" not in exprs.values()
+    assert exprs["falta_ar"].strip() == "(NULLIF(\"b0014\"::text,'')::int = 1)::int::smallint"
+    assert exprs["idade"].strip() == "NULLIF(\"a002\"::text,'')::int::smallint"
+
+def test_coluna_ausente_no_mes_vira_null():
+    colunas = TODAS - {"b0014", "a005"}
+    sql = main.silver_select_sql("pnad_covid_052020_new", colunas)
+    exprs = _expressoes(sql)
+    assert exprs["falta_ar"].strip() == "NULL::smallint"
+    assert exprs["escolaridade"].strip() == "NULL::smallint"
+    assert '"b0014"' not in sql and '"a005"' not in sql
+    # as derivadas continuam valendo (tem_algum_sintoma ignora o NULL via GREATEST)
+    for nome in main.SILVER_DERIVED:
+        assert f" AS {nome}" in sql
+
+def test_derivadas_usam_todas_as_flags_de_sintoma():
+    sql = main.silver_select_sql("t", TODAS)
+    greatest = re.search(r"GREATEST\(([^)]*)\)", sql).group(1)
+    assert [c.strip() for c in greatest.split(",")] == main.SINTOMA_FLAGS
+    assert set(main.SINTOMA_FLAGS) <= set(main.SILVER_FLAGS)
+
+def test_nome_da_silver():
+    assert main.silver_table("pnad_covid_112020") == "pnad_covid_112020_silver"
@@ -0,0 +1,112 @@
+# ============================================================
+# test_streaming.py — Modo streaming: limites dos chunks e mesmo resultado
+#                     da leitura completa
+# ============================================================
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+
+LINHAS = 30
+
+@pytest.fixture
+def csv_path(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "UF": rng.integers(11, 54, LINHAS),
+        "Peso Amostral": np.round(rng.gamma(2.0, 150.0, LINHAS), 3),
+        "A002": rng.integers(0, 100, LINHAS).astype(float),
+        "Grande": rng.integers(2**31, 2**40, LINHAS),
+        "Data": [f"{d:02d}/11/2020" for d in rng.integers(1, 29, LINHAS)],
+        "Obs": rng.choice(["sim", "nao", "talvez"], LINHAS),
+    })
+    df.loc[[3, 17], "A002"] = np.nan      # branco no meio: a coluna vira float
+    path = tmp_path / "PNAD_COVID_112020.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+def _leitura_completa(path):
+    df = main.maybe_parse_datetimes(main.clean_columns(main.smart_read_csv(path)))
+    df.replace([np.inf, -np.inf], np.nan, inplace=True)
+    return df
+
+@pytest.mark.parametrize("chunk_size", [7, 10, LINHAS, 1000])
+def test_chunks_respeitam_chunk_size(monkeypatch, csv_path, chunk_size):
+    monkeypatch.setattr(main, "CHUNK_SIZE", chunk_size)
+    schema = main.profile_csv(csv_path)
+    tamanhos = [len(c) for c in main.iter_csv_chunks(csv_path, schema)]
+    assert sum(tamanhos) == LINHAS
+    assert all(0 < t <= chunk_size for t in tamanhos)
+    assert tamanhos[:-1] == [chunk_size] * (len(tamanhos) - 1)
+
+def test_streaming_igual_a_leitura_completa(monkeypatch, csv_path):
+    monkeypatch.setattr(main, "CHUNK_SIZE", 7)
+    completo = _leitura_completa(csv_path)
+    schema = main.profile_csv(csv_path)
+    streaming = pd.concat(list(main.iter_csv_chunks(csv_path, schema)), ignore_index=True)
+
+    assert list(streaming.columns) == list(completo.columns)
+    pd.testing.assert_frame_equal(streaming, completo, check_dtype=False)
+    tipos = {c: type(t) for c, t in main.schema_sql_dtypes(schema).items()}
+    assert tipos == {c: type(t) for c, t in main.infer_sqlalchemy_dtypes(completo).items()}
+
+def test_schema_frame_vazio_com_nomes_limpos(csv_path):
+    vazio = main.schema_frame(main.profile_csv(csv_path))
+    assert len(vazio) == 0
+    assert list(vazio.columns) == ["uf", "peso_amostral", "a002", "grande", "data", "obs"]
+
+@pytest.fixture
+def csv_alarga(tmp_path):
+    """Amostra (5 linhas) mais estreita que o arquivo: cada coluna alarga num chunk diferente."""
+    linhas = ["UF,A002,Grande,Codigo"]
+    for i in range(LINHAS):
+        a002 = "" if i == 12 else str(i)                 # branco no chunk 2: integer -> float
+        grande = str(2**40 + i) if i >= 20 else str(i)   # chunk 3: integer -> bigint
+        codigo = "X9" if i == 25 else str(i % 3)         # chunk 4: integer -> text
+        linhas.append(f"{11 + i % 5},{a002},{grande},{codigo}")
+    path = tmp_path / "PNAD_COVID_112020.csv"
+    path.write_text("\n".join(linhas) + "\n", encoding="utf-8")
+    return str(path)
+
+def test_passada_unica_alarga_sem_perfil(monkeypatch, csv_alarga):
+    monkeypatch.setattr(main, "CHUNK_SIZE", 7)
+    monkeypatch.setattr(main, "INFER_SAMPLE_ROWS", 5)
+    schema, db_kinds = main.single_pass_schema(None, csv_alarga, "t_new", compact=False, resume=False)
+    dtypes = main.schema_sql_dtypes(schema)
+    chunks = list(main.iter_csv_chunks_widening(csv_alarga, schema, dtypes, db_kinds))
+
+    assert [c.attrs.get("alargar") for c in chunks] == [
+        None, {"a002": "double precision"}, {"grande": "bigint"}, {"codigo": "text"}, None]
+    perfil = main.schema_sql_dtypes(main.profile_csv(csv_alarga))
+    assert {c: type(t) for c, t in dtypes.items()} == {c: type(t) for c, t in perfil.items()}
+
+    unico = pd.concat(chunks, ignore_index=True)
+    completo = _leitura_completa(csv_alarga)
+    for col in ("uf", "a002", "grande"):   # chunks com dtypes diferentes: compara os valores
+        np.testing.assert_array_equal(unico[col].to_numpy(dtype="float64", na_value=np.nan),
+                                      completo[col].to_numpy(dtype="float64", na_value=np.nan))
+    # linhas anteriores de uma coluna que virou texto: mesmo valor, formato do número
+    assert unico["codigo"].astype(str).tolist() == completo["codigo"].astype(str).tolist()
+
+def test_passada_unica_retomada_parte_dos_tipos_da_staging(monkeypatch, csv_alarga):
+    monkeypatch.setattr(main, "CHUNK_SIZE", 7)
+    monkeypatch.setattr(main, "INFER_SAMPLE_ROWS", 5)
+    monkeypatch.setattr(main, "_columns", lambda conn, t: {
+        "uf": "integer", "a002": "double precision", "grande": "integer", "codigo": "integer"})
+
+    class _Engine:
+        def connect(self):
+            return self
+        def __enter__(self):
+            return self
+        def __exit__(self, *exc):
+            return False
+
+    schema, db_kinds = main.single_pass_schema(_Engine(), csv_alarga, "t_new", compact=False, resume=True)
+    assert schema["tipos"]["A002"] == "float"
+    dtypes = main.schema_sql_dtypes(schema)
+    chunks = list(main.iter_csv_chunks_widening(csv_alarga, schema, dtypes, db_kinds, start_row=14))
+    assert sum(len(c) for c in chunks) == LINHAS - 14
+    assert [c.attrs.get("alargar") for c in chunks] == [{"grande": "bigint"}, {"codigo": "text"}, None]
@@ -1,94 +1,75 @@
 /* ===========================================================================
    01_views.sql
    objetivo: criar visões (views) para:
-     unificar os 3 meses da PNAD COVID em 1 visão só
+     unificar os meses da PNAD COVID em 1 visão só
     projetar as 20+ variáveis-chave em uma visão “top20” para análises
 
    ideia principal:
-     descobrir quais colunas são IGUAIS nas 3 tabelas
-     criar a VIEW unificada usando SÓ as colunas comuns
-       (e ainda adiciono uma coluna “referencia” com a data do mês).
+     o main.py mantém a tabela public.pnad_covid_2020 PARTICIONADA por
+       referencia (uma partição por mês: pnad_covid_MMYYYY)
+     cada CSV novo em data/PNAD_COVID_MMYYYY.csv vira partição sozinho —
+       nada para editar aqui quando entra um mês novo
+     filtros por referencia (WHERE referencia IN (...)) descartam as
+       partições que não interessam (partition pruning)
    ========================================================================== */
 /* ---------------------------------------------------------------------------
- ver a “interseção” de colunas existentes nas 3 tabelas
- gero uma string “col1, col2, col3, …” já formatada
-   - OBS: a ordem segue a do mês 05/2020 (padronizo por ele)
+ conferir as partições existentes (uma linha por mês carregado)
 --------------------------------------------------------------------------- */
-WITH cols_0520 AS (
-  SELECT column_name, ordinal_position
-  FROM information_schema.columns
-  WHERE table_schema='public' AND table_name='pnad_covid_052020'
-),
-cols_0820 AS (
-  SELECT column_name
-  FROM information_schema.columns
-  WHERE table_schema='public' AND table_name='pnad_covid_082020'
-),
-cols_1120 AS (
-  SELECT column_name
-  FROM information_schema.columns
-  WHERE table_schema='public' AND table_name='pnad_covid_112020'
-),
-cols_comuns AS (
-  SELECT c.column_name, c.ordinal_position
-  FROM cols_0520 c
-  WHERE c.column_name IN (SELECT column_name FROM cols_0820)
-    AND c.column_name IN (SELECT column_name FROM cols_1120)
-)
-SELECT string_agg(format('%I', column_name), ', ' ORDER BY ordinal_position) AS lista_colunas_comuns
-FROM cols_comuns;
-/* dica: essa consulta retorna 1 linha com o texto:
-   ano, uf, capital, … (uso para auditar se está tudo ok) */
+DO $$
+BEGIN
+  IF to_regclass('public.pnad_covid_2020') IS NULL THEN
+    RAISE EXCEPTION 'tabela particionada public.pnad_covid_2020 não existe — rode o main.py primeiro.';
+  END IF;
+END $$;
+
+SELECT c.relname AS particao,
+       pg_get_expr(c.relpartbound, c.oid) AS faixa
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+WHERE i.inhparent = 'public.pnad_covid_2020'::regclass
+ORDER BY 2;
 
 
 /* ---------------------------------------------------------------------------
- criar/atualizar a VIEW unificada usando SQL dinâmica
-  deixo o banco montar a lista de colunas e criar a view
-   - nome da view: public.pnad_covid_2020_auto
-   - se amanhã eu recarregar as tabelas com colunas diferentes,
-     basta executar de novo e a view se ajusta às colunas comuns.
+ criar/atualizar a VIEW unificada sobre a tabela particionada
+   - nome da view: public.pnad_covid_2020_auto (mantido para não quebrar
+     quem já consulta por ele)
+   - a versão antiga era um UNION ALL sobre as 3 tabelas mensais; se ela
+     ainda existir, sai com CASCADE (top20 é recriada logo abaixo e os
+     painéis voltam rodando o 02_analytics.sql de novo)
+   - colunas que um mês não tem ficam NULL naquele mês
+   - colunas EXPLÍCITAS (as usadas pela top20), não SELECT *: o * só é
+     expandido quando este arquivo roda, e a view ficaria presa às colunas
+     daquele momento. A largura total continua em public.pnad_covid_2020
+   - quando um mês novo obriga o main.py a alargar o tipo de uma coluna da
+     mãe, ele derruba e recria estas views na mesma transação do swap
 --------------------------------------------------------------------------- */
 DO $$
-DECLARE
-  collist text;   -- onde vou guardar “col1, col2, col3, …”
-  sqlview text;   
 BEGIN
-  -- 2.1) montar a lista de colunas comuns NA ORDEM do 05/2020
-  SELECT string_agg(format('%I', c0520.column_name), ', ' ORDER BY c0520.ordinal_position)
-  INTO collist
-  FROM information_schema.columns c0520
-  JOIN information_schema.columns c0820
-    ON c0820.table_schema='public'
-   AND c0820.table_name='pnad_covid_082020'
-   AND c0820.column_name=c0520.column_name
-  JOIN information_schema.columns c1120
-    ON c1120.table_schema='public'
-   AND c1120.table_name='pnad_covid_112020'
-   AND c1120.column_name=c0520.column_name
-  WHERE c0520.table_schema='public'
-    AND c0520.table_name='pnad_covid_052020';
-
-  IF collist IS NULL OR collist = '' THEN
-    RAISE EXCEPTION 'não encontrei colunas comuns entre pnad_covid_052020/082020/112020.';
+  IF EXISTS (
+    SELECT 1
+    FROM information_schema.view_table_usage
+    WHERE view_schema = 'public'
+      AND view_name = 'pnad_covid_2020_auto'
+      AND table_name <> 'pnad_covid_2020'
+  ) THEN
+    DROP VIEW public.pnad_covid_2020_auto CASCADE;
+    RAISE NOTICE 'view antiga (UNION ALL) removida — rode o 02_analytics.sql depois deste arquivo.';
   END IF;
-
-  -- 2.2) montar a SQL da VIEW (sempre a MESMA lista em cada SELECT)
-  sqlview := format($f$
-    CREATE OR REPLACE VIEW public.pnad_covid_2020_auto AS
-    SELECT DATE '2020-05-01' AS referencia, %1$s FROM public.pnad_covid_052020
-    UNION ALL
-    SELECT DATE '2020-08-01' AS referencia, %1$s FROM public.pnad_covid_082020
-    UNION ALL
-    SELECT DATE '2020-11-01' AS referencia, %1$s FROM public.pnad_covid_112020;
-  $f$, collist);
-
-  -- 2.3) executar a criação/atualização da VIEW
-  EXECUTE sqlview;
-
-  RAISE NOTICE 'VIEW criada/atualizada: public.pnad_covid_2020_auto';
-  RAISE NOTICE 'colunas usadas (interseção): %', collist;
 END $$;
 
+-- a versão anterior era SELECT * (mais colunas): OR REPLACE não remove colunas
+DROP VIEW IF EXISTS public.pnad_covid_2020_auto CASCADE;
+
+CREATE VIEW public.pnad_covid_2020_auto AS
+SELECT
+  referencia,
+  uf,
+  a001a, a002, a003, a004, a005,
+  b0011, b0012, b0013, b0014, b0015, b0016, b0019, b00110, b00111, b00112,
+  b002, b005, b007
+FROM public.pnad_covid_2020;
+
 
 -- checagem rápida: ver contagem por mês
 SELECT referencia, COUNT(*) AS linhas